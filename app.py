@@ -1,12 +1,30 @@
 import streamlit as st
-import aiohttp
-import asyncio
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, urlunparse
-import re
-from collections import deque, defaultdict
 import json
-from html import unescape as html_unescape  # NEW: for decoding HTML entities
+import re
+import threading
+
+from contentas.crawler import (
+    CATEGORIES,
+    CATEGORY_COLOURS,
+    LINK_EXTRACTORS,
+    MAX_PAGE_BYTES,
+    PARSE_MODES,
+    CrawlCheckpoint,
+    CrawlLoop,
+    HttpCache,
+    PdfVerdictCache,
+    ResultStore,
+    build_sitemap_text,
+    build_tree_for_lookup,
+    categorize_url,
+    category_sort_key,
+    crawl_website,
+    make_parse_executor,
+    record_crawl,
+    resume_crawl,
+    site_key,
+)
+from contentas.downloads import download_pdfs, manifest_summary
 
 # ═══════════════════════════════════════════════════════════════
 # PAGE CONFIG
@@ -23,816 +41,283 @@ if 'results' not in st.session_state:
     st.session_state.results = None
 
 # ═══════════════════════════════════════════════════════════════
-# CATEGORY DEFINITIONS
-# ═══════════════════════════════════════════════════════════════
-CATEGORIES = [
-    (
-        "⛔ Out of Scope", [
-            r"career", r"job", r"faq", r"question",
-            r"contact.*us", r"privacy", r"sec.*filing",
-            r"term.*of.*use", r"contact", r"cookie",
-            r"stock.*price", r"legal.*term", r"term.*condition",
-            r"stock.*quote", r"linkedin", r"facebook",
-            r"twitter", r"youtube", r"forum", r"chat", r"recipe",
-        ]
-    ),
-    (
-        "Presentation", [
-            r"investor.*day", r"presentation", r"deck", r"\Wir",
-            r"slide", r"earnings", r"poster", r"supplemental",
-            r"supplementary", r"non.*gaap", r"gaap", r"ifrs",
-            r"reconciliation", r"roadshow", r"road.*show",
-        ]
-    ),
-    (
-        "Reports", [
-            r"letter.*to.*shareholder", r"shareholder.*letter",
-            r"letter.*stockholder", r"agm",
-            r"annual.*general.*meeting", r"meeting",
-            r"extra.*ordinary.*meeting", r"egm",
-            r"annual.*report", r"integrated.*report",
-            r"yearly.*report", r"interim.*report",
-            r"quarterly.*report", r"half.*year.*report",
-            r"semi.*annual.*report", r"report",
-            r"management.*report", r"management.*commentary",
-            r"mda", r"management.*discussion", r"proxy",
-            r"proxy.*statement", r"information.*circular",
-            r"agm.*notice", r"egm.*notice", r"meeting.*notice",
-            r"operating.*metric", r"profit.*loss",
-            r"financial.*result", r"operating.*result",
-            r"fixed.*income", r"bond", r"debt", r"prospectus",
-            r"ipo", r"initial.*public.*offering",
-            r"fact.*sheet", r"fact.*book", r"result",
-            r"revenue", r"sales", r"profit", r"financial",
-            r"snapshot", r"funding", r"fund.*raise",
-            r"capital.*raise", r"prescription", r"trial",
-        ]
-    ),
-    (
-        "News", [
-            r"press.*release", r"news", r"media",
-            r"press", r"announcement", r"notices",
-        ]
-    ),
-    (
-        "Filings", [
-            r"board", r"director", r"reorgani", r"restructur",
-            r"agreement", r"material.*contract", r"cancellation",
-            r"filing.*change", r"cancel.*notice", r"delisting",
-            r"suspension", r"bankruptcy", r"trading.*suspension",
-            r"disposal", r"asset.*sale", r"legal.*action",
-            r"litigation", r"lawsuit", r"material.*change",
-            r"late.*filing", r"regulato.*correspondence",
-            r"regulato.*letter", r"exemption",
-            r"securities.*registration", r"listing.*application",
-            r"withdrawal", r"termination", r"debt.*indenture",
-            r"credit.*agreement", r"pre.*ipo",
-            r"private.*offering", r"privately.*held",
-            r"institutional.*ownership", r"institutional.*holding",
-            r"officer.*ownership", r"director.*ownership",
-            r"beneficial.*ownership", r"share.*holding.*pattern",
-            r"major.*shareholder", r"stock.*option",
-            r"employee.*stock", r"esop", r"stock.*split",
-            r"reverse.*split", r"tender.*offer",
-            r"exchange.*offer", r"rights.*offer", r"rights.*issue",
-            r"share.*repurchase", r"buyback",
-            r"securities.*purchase", r"corporate.*action",
-            r"merger", r"takeover", r"m&a", r"acquisition",
-            r"dividend", r"audit", r"fund", r"etf",
-            r"prepared.*remark", r"transcript", r"speech",
-            r"executive.*commentary", r"ceo.*commentary",
-            r"business.*update",
-        ]
-    ),
-    (
-        "ESG", [
-            r"esg", r"sustainabilit", r"csr",
-            r"corporate.*social.*responsibility",
-            r"ehs", r"environmental.*health.*safety",
-            r"carbon.*disclosure", r"carbon.*report",
-            r"cdp.*report", r"green.*report", r"tcfd",
-            r"climate", r"social", r"human.*rights",
-            r"modern.*slavery", r"diversity", r"dei.*report",
-            r"inclusion.*report", r"gri.*report",
-            r"global.*reporting.*initiative", r"sasb.*report",
-            r"sasb.*index", r"cdp", r"estma", r"policy",
-            r"policies", r"charter", r"guideline", r"ethics",
-            r"code.*of.*conduct", r"governance", r"sustainable",
-        ]
-    ),
-    (
-        "Sector Specific", [
-            r"white.*paper", r"case.*stud", r"industry",
-            r"insight", r"thought.*leadership", r"product",
-            r"brochure", r"one.*pager",
-            r"integrated.*resource.*plan", r"resource",
-            r"scientific", r"research.*publication",
-            r"research", r"blog", r"customer.*stor",
-            r"client.*stor", r"success.*stor", r"project",
-            r"r&d", r"r.*and.*d", r"rd.*update",
-            r"research.*development", r"activity",
-            r"infographic", r"catalog", r"safety.*sheet",
-            r"data.*sheet", r"launch", r"specification",
-            r"clinical.*trial", r"sds.*sheet", r"feature",
-            r"service", r"solution", r"model",
-        ]
-    ),
-    (
-        "Company Info", [
-            r"interview", r"about.*us", r"about",
-            r"who.*we.*are", r"our.*company", r"overview",
-            r"company.*history", r"history", r"mission",
-            r"purpose", r"corporate.*info", r"management",
-            r"profile", r"board.*of.*director", r"board.*member",
-            r"executive.*team", r"leadership", r"team",
-            r"supplier", r"vendor", r"partner", r"alliance",
-            r"customer.*list", r"who.*we.*work.*with",
-        ]
-    ),
-]
-
-COMPILED_CATEGORIES = [
-    (label, [re.compile(p, re.IGNORECASE) for p in patterns])
-    for label, patterns in CATEGORIES
-]
-
-PDF_EXTENSION_RE = re.compile(
-    r"\.pdf($|\?)|/pdf/|download.*pdf", re.IGNORECASE
-)
-
-# NEW: Regex to find raw URLs (esp. PDFs) in decoded HTML / JS / JSON blobs
-RAW_URL_RE = re.compile(
-    r"""https?://[^\s"'<>{}\\\[\]()|^`]+""",
-    re.IGNORECASE
-)
-# NEW: Also catch protocol-relative or root-relative PDF refs in raw text
-RELATIVE_PDF_RE = re.compile(
-    r"""(?:["'\s>(])(/[^\s"'<>{}\\]+\.pdf(?:\?[^\s"'<>{}\\]*)?)""",
-    re.IGNORECASE
-)
-
-CATEGORY_COLOURS = {
-    "Presentation":     "#1f77b4",
-    "Reports":          "#2ca02c",
-    "News":             "#ff7f0e",
-    "Filings":          "#9467bd",
-    "ESG":              "#17becf",
-    "Sector Specific":  "#8c564b",
-    "Company Info":     "#e377c2",
-    "❓ Unclassified":  "#7f7f7f",
-    "⛔ Out of Scope":  "#d62728",
-}
-
-# ═══════════════════════════════════════════════════════════════
-# EXTERNAL DOMAIN FILTERS
+# CRAWL LOOP
 # ═══════════════════════════════════════════════════════════════
-JUNK_EXTERNAL_DOMAINS = {
-    "doi.org", "dx.doi.org", "ncbi.nlm.nih.gov",
-    "pubmed.ncbi.nlm.nih.gov", "iopscience.iop.org",
-    "link.springer.com", "springer.com", "sciencedirect.com",
-    "pubs.acs.org", "pubs.rsc.org", "onlinelibrary.wiley.com",
-    "nature.com", "wikipedia.org", "en.wikipedia.org",
-    "scitation.aip.org", "opticsinfobase.org",
-    "ingentaconnect.com", "mdpi.com", "jove.com",
-    "hal.inria.fr", "scripts.iucr.org",
-    "nar.oxfordjournals.org", "nass.oxfordjournals.org",
-    "uvx.edpsciences.org", "biophysj.org",
-    "medcraveonline.com", "readcube.com", "rsc.org",
-    "intechopen.com", "photonics.com",
-}
-
-EXTERNAL_KEEP_KEYWORDS = [
-    "investor", "press", "media", "news",
-    "release", "announcement", "publication", "/ir/",
-]
-
-SEC_FILING_PATTERNS = [
-    re.compile(p, re.IGNORECASE) for p in [
-        r"sec\.gov", r"edgar\.sec\.gov",
-        r"/sec[-_]filings?", r"sec[-_]filing",
-        r"secfiling", r"/edgar/",
-    ]
-]
-
-
-# ═══════════════════════════════════════════════════════════════
-# CORE HELPERS
-# ═══════════════════════════════════════════════════════════════
-
-def is_pdf_url(url: str) -> bool:
-    return bool(PDF_EXTENSION_RE.search(url))
-
-
-def categorize_url(url: str) -> str:
-    for label, compiled_patterns in COMPILED_CATEGORIES:
-        for pattern in compiled_patterns:
-            if pattern.search(url):
-                return label
-    return "❓ Unclassified"
-
-
-def categorize_all_urls(urls: list) -> dict:
-    result = defaultdict(list)
-    for url in urls:
-        result[categorize_url(url)].append(url)
-    return dict(result)
 
+MAX_CONCURRENT = 50    # top of the "Concurrent Requests" slider
 
-def normalize_url(url: str) -> str:
-    p = urlparse(url)
-    return urlunparse((
-        p.scheme, p.netloc.lower(),
-        p.path.rstrip("/"),
-        p.params, p.query, ""
-    ))
-
-
-def strip_query(url: str) -> str:
-    p = urlparse(url)
-    return urlunparse((
-        p.scheme, p.netloc.lower(),
-        p.path.rstrip("/"),
-        "", "", ""
-    ))
-
-
-def is_social_media_url(url: str) -> bool:
-    social = [
-        "instagram.com", "facebook.com", "linkedin.com",
-        "youtube.com", "twitter.com", "x.com", "tiktok.com",
-        "snapchat.com", "pinterest.com", "reddit.com",
-        "tumblr.com", "whatsapp.com", "telegram.org",
-    ]
-    domain = urlparse(url).netloc.lower().replace("www.", "")
-    return any(s in domain for s in social)
-
-
-def is_sec_filing_url(url: str) -> bool:
-    return any(pat.search(url) for pat in SEC_FILING_PATTERNS)
-
-
-def _clean_domain(netloc: str) -> str:
-    return netloc.lower().replace("www.", "").split(":")[0]
 
+@st.cache_resource
+def crawl_loop() -> CrawlLoop:
+    """
+    One event loop and connection pool for every crawl in this process.
+    The pool allows as many sockets per host as the most workers a crawl
+    can be given; each crawl's own limiter keeps it to its setting.
+    """
+    return CrawlLoop(limit_per_host=MAX_CONCURRENT)
 
-def is_same_domain_or_allowed(url: str, base_domain: str) -> bool:
-    parsed     = urlparse(url)
-    url_dom    = _clean_domain(parsed.netloc)
-    base_clean = _clean_domain(base_domain)
-    if url_dom == base_clean or url_dom.endswith("." + base_clean):
-        return True
-    for junk in JUNK_EXTERNAL_DOMAINS:
-        if url_dom == junk or url_dom.endswith("." + junk):
-            return False
-    if any(kw in url.lower() for kw in EXTERNAL_KEEP_KEYWORDS):
-        return True
-    return False
 
+@st.cache_resource
+def parse_pool(mode: str):
+    """One parse executor per ``mode``, shared by every crawl."""
+    return make_parse_executor(mode)
 
-def is_investor_or_media_page(url: str) -> bool:
-    kws = ["investor", "press", "media", "news",
-           "release", "announcement", "publication"]
-    return any(k in url.lower() for k in kws)
 
+def run_crawl(crawl, *args, status_text, use_http_cache, use_pdf_verdicts,
+              **kwargs):
+    """
+    Run ``crawl`` (``crawl_website`` or ``resume_crawl``) on the shared
+    loop and show its progress in ``status_text``. The on-disk caches
+    are opened for this crawl alone and closed when it ends.
 
-def clean_extracted_url(u: str) -> str:
-    """Trim trailing punctuation that often gets caught by regex."""
-    return u.rstrip('.,);:!?\'"')
+    Using any widget mid-crawl (the Stop button, say) makes Streamlit
+    interrupt this script; the crawl is then stopped gracefully and
+    what it found so far becomes the results of the next run.
+    """
+    progress: dict = {}
+    stop = threading.Event()
+
+    def update_progress(vis, q_len):
+        progress["text"] = f"Pages crawled: {vis} | Queue: {q_len}"
+
+    def show_progress():
+        if "text" in progress:
+            status_text.text(progress["text"])
+
+    async def run(session):
+        http_cache   = HttpCache() if use_http_cache else None
+        pdf_verdicts = PdfVerdictCache() if use_pdf_verdicts else None
+        try:
+            return await crawl(
+                *args, progress_callback=update_progress, session=session,
+                http_cache=http_cache, pdf_verdicts=pdf_verdicts,
+                stop_event=stop, **kwargs,
+            )
+        finally:
+            if http_cache:
+                http_cache.close()
+            if pdf_verdicts:
+                pdf_verdicts.close()
+
+    loop   = crawl_loop()
+    future = loop.submit(run)
+    try:
+        res = loop.wait(future, on_tick=show_progress)
+    except BaseException:
+        stop.set()
+        st.session_state.results  = future.result()
+        st.session_state.crawling = False
+        raise
+    show_progress()
+    return res
 
 
 # ═══════════════════════════════════════════════════════════════
-# DEDUPLICATION
+# SITEMAP RENDERING
 # ═══════════════════════════════════════════════════════════════
 
-def deduplicate_urls(
-    urls: list,
-    enable_sibling_flood: bool = False,
-    sibling_threshold: int = 10,
-    sibling_keep: int = 3,
-) -> list:
-    seen:  set  = set()
-    clean: list = []
-    for url in sorted(urls):
-        c = strip_query(url)
-        if c not in seen:
-            seen.add(c)
-            clean.append(c)
-
-    path_set:     set  = set()
-    parsed_cache: dict = {}
-    for u in clean:
-        p = urlparse(u)
-        parsed_cache[u] = p
-        path_set.add((p.scheme, p.netloc, p.path.rstrip("/")))
-
-    after_parent: list = []
-    for u in clean:
-        p     = parsed_cache[u]
-        parts = p.path.strip("/").split("/")
-        is_child = False
-        for depth in range(len(parts) - 1, 0, -1):
-            parent_path = "/" + "/".join(parts[:depth])
-            if (p.scheme, p.netloc, parent_path) in path_set:
-                is_child = True
-                break
-        if not is_child:
-            after_parent.append(u)
-
-    if not enable_sibling_flood:
-        after_parent.sort()
-        return after_parent
-
-    buckets: dict = defaultdict(list)
-    for u in after_parent:
-        p      = urlparse(u)
-        parts  = p.path.strip("/").split("/")
-        parent = "/" + "/".join(parts[:-1]) if len(parts) > 1 else "/"
-        buckets[(p.netloc, parent)].append(u)
-
-    result: list = []
-    for bucket_urls in buckets.values():
-        if len(bucket_urls) > sibling_threshold:
-            result.extend(bucket_urls[:sibling_keep])
-        else:
-            result.extend(bucket_urls)
+SITEMAP_PAGE_SIZE = 100    # children shown per branch at a time
+SITEMAP_MAX_ROWS  = 1500   # rows rendered per run, across all branches
 
-    result.sort()
-    return result
 
+def _sitemap_row_html(label: str, url: str, depth: int) -> str:
+    cat    = categorize_url(url) if url else ""
+    colour = CATEGORY_COLOURS.get(cat, "#7f7f7f")
+    indent = "&nbsp;" * 6 * depth
+    icon   = "🌐" if depth == 0 else "📄"
+    badge = (
+        f'<span style="background:{colour};color:white;'
+        f'padding:1px 5px;border-radius:3px;'
+        f'font-size:0.7em;margin-left:4px;">{cat}</span>'
+        if cat else ""
+    )
+    if url:
+        return (
+            f'{indent}{icon} '
+            f'<a href="{url}" target="_blank">'
+            f'<code>{label}</code></a>{badge}'
+        )
+    return f'{indent}{icon} <strong>{label}</strong>'
 
-# ═══════════════════════════════════════════════════════════════
-# SITEMAP HELPERS
-# ═══════════════════════════════════════════════════════════════
 
-def build_tree_for_lookup(urls: list) -> dict:
-    tree: dict = {}
-    for url in sorted(urls):
-        p     = urlparse(url)
-        parts = [p.netloc] + [
-            s for s in p.path.strip("/").split("/") if s
-        ]
-        node = tree
-        for part in parts:
-            if part not in node:
-                node[part] = {"__children__": {}, "__url__": ""}
-            node = node[part]["__children__"]
-
-    for url in urls:
-        p     = urlparse(url)
-        parts = [p.netloc] + [
-            s for s in p.path.strip("/").split("/") if s
-        ]
-        node = tree
-        for i, part in enumerate(parts):
-            if i == len(parts) - 1:
-                node[part]["__url__"] = url
-            node = node[part]["__children__"]
-
-    return tree
-
-
-def render_flat_sitemap(urls: list, max_depth_show: int = 99) -> list:
-    if not urls:
+def render_sitemap_tree(tree: dict, max_depth_show: int = 3,
+                        key: str = "sitemap"):
+    """
+    Sitemap as a lazily expanded tree, from ``build_tree_for_lookup``.
+
+    Only rows under expanded branches are built. Branches shallower
+    than ``max_depth_show`` start expanded, and a click toggles any
+    branch. A branch lists ``SITEMAP_PAGE_SIZE`` children at a time,
+    with a button for the next batch, and one run never renders more
+    than ``SITEMAP_MAX_ROWS`` rows.
+    """
+    if not tree:
         st.info("No pages to display.")
-        return []
-
-    tree       = build_tree_for_lookup(urls)
-    flat_rows  = []
-    dl_lines   = []
-
-    def _walk(node_dict, label, depth, path_parts):
-        url = node_dict.get("__url__", "")
-        cat = categorize_url(url) if url else ""
-        flat_rows.append((depth, label, url, cat))
-        children = node_dict.get("__children__", {})
-        for child_label in sorted(children.keys()):
-            _walk(
-                children[child_label],
-                child_label,
-                depth + 1,
-                path_parts + [child_label],
-            )
+        return
 
-    for root_label in sorted(tree.keys()):
-        _walk(tree[root_label], root_label, 0, [root_label])
+    view = st.session_state.setdefault(
+        f"{key}_view", {"toggled": set(), "shown": {}}
+    )
+    rows:   list = []
+    budget: list = [SITEMAP_MAX_ROWS]
 
-    html_rows_visible  = []
-    overflow_groups    = defaultdict(list)
+    def flush():
+        if rows:
+            st.markdown("<br>".join(rows), unsafe_allow_html=True)
+            rows.clear()
 
-    for depth, label, url, cat in flat_rows:
-        colour = CATEGORY_COLOURS.get(cat, "#7f7f7f")
-        indent = "&nbsp;" * 6 * depth
-        icon = "🌐" if depth == 0 else "📄"
+    def toggle(path):
+        view["toggled"].symmetric_difference_update({path})
 
-        badge = (
-            f'<span style="background:{colour};color:white;'
-            f'padding:1px 5px;border-radius:3px;'
-            f'font-size:0.7em;margin-left:4px;">{cat}</span>'
-            if cat else ""
+    def show_more(path):
+        view["shown"][path] = (
+            view["shown"].get(path, SITEMAP_PAGE_SIZE) + SITEMAP_PAGE_SIZE
         )
 
-        if url:
-            row_html = (
-                f'{indent}{icon} '
-                f'<a href="{url}" target="_blank">'
-                f'<code>{label}</code></a>{badge}'
+    def walk(children: dict, depth: int, path: str):
+        labels = sorted(children)
+        limit  = view["shown"].get(path, SITEMAP_PAGE_SIZE)
+        for label in labels[:limit]:
+            if budget[0] <= 0:
+                return
+            budget[0] -= 1
+            node      = children[label]
+            node_path = f"{path}/{label}"
+            if not node["__children__"]:
+                rows.append(_sitemap_row_html(label, node["__url__"], depth))
+                continue
+
+            is_open = (depth < max_depth_show) != (
+                node_path in view["toggled"]
             )
-        else:
-            row_html = f'{indent}{icon} <strong>{label}</strong>'
-
-        dl_lines.append("  " * depth + f"{label}  {url}  [{cat}]")
-
-        if depth <= max_depth_show:
-            html_rows_visible.append(row_html)
-        else:
-            ancestor = next(
-                (
-                    r[1] for r in reversed(flat_rows[
-                        :flat_rows.index((depth, label, url, cat))
-                    ])
-                    if r[0] == max_depth_show
-                ),
-                "Other"
+            flush()
+            pad, button, link = st.columns([0.01 + depth * 0.4, 4, 10])
+            button.button(
+                f"{'▾' if is_open else '▸'} {label} "
+                f"({node['__pages__']} pages)",
+                key=f"{key}:{node_path}",
+                on_click=toggle, args=(node_path,),
+            )
+            if node["__url__"]:
+                link.markdown(
+                    _sitemap_row_html(label, node["__url__"], 1)
+                    .replace("&nbsp;", ""),
+                    unsafe_allow_html=True,
+                )
+            if is_open:
+                walk(node["__children__"], depth + 1, node_path)
+
+        if len(labels) > limit and budget[0] > 0:
+            flush()
+            st.button(
+                f"⋯ show {min(SITEMAP_PAGE_SIZE, len(labels) - limit)} "
+                f"more of {len(labels) - limit} under "
+                f"{path.rsplit('/', 1)[-1] or 'the root'}",
+                key=f"{key}:more:{path}",
+                on_click=show_more, args=(path,),
             )
-            overflow_groups[ancestor].append(row_html)
-
-    if html_rows_visible:
-        st.markdown("<br>".join(html_rows_visible), unsafe_allow_html=True)
-
-    if overflow_groups:
-        st.markdown("---")
-        st.markdown(f"*Pages deeper than depth {max_depth_show}:*")
-        for ancestor_label, rows in sorted(overflow_groups.items()):
-            with st.expander(
-                f"📂 Children of '{ancestor_label}' ({len(rows)} pages)",
-                expanded=False,
-            ):
-                st.markdown("<br>".join(rows), unsafe_allow_html=True)
-
-    return dl_lines
-
-
-def build_sitemap_text(urls: list) -> str:
-    lines = ["SITEMAP", "=" * 60, ""]
-    tree  = build_tree_for_lookup(urls)
-
-    def _walk(node_dict, label, depth):
-        url    = node_dict.get("__url__", "")
-        cat    = categorize_url(url) if url else ""
-        indent = "  " * depth
-        icon   = "🌐" if depth == 0 else "📄"
-        lines.append(f"{indent}{icon} {label}")
-        if url:
-            lines.append(f"{indent}   → {url}  [{cat}]")
-        children = node_dict.get("__children__", {})
-        for child_label in sorted(children.keys()):
-            _walk(children[child_label], child_label, depth + 1)
-
-    for root_label in sorted(tree.keys()):
-        _walk(tree[root_label], root_label, 0)
 
-    return "\n".join(lines)
+    walk(tree, 0, "")
+    flush()
+    if budget[0] <= 0:
+        st.caption(
+            f"Showing the first {SITEMAP_MAX_ROWS} rows; collapse "
+            f"branches to see the rest."
+        )
 
 
 # ═══════════════════════════════════════════════════════════════
-# JSON EXTRACTION
+# RESULT VIEWS
 # ═══════════════════════════════════════════════════════════════
+# Every widget change reruns the script. These are cached by crawl ID
+# (arguments starting with "_" are not hashed), so a rerun reuses the
+# markup instead of rebuilding it from tens of thousands of URLs.
 
-async def extract_json_links(session, url, pdf_regex):
-    json_links: set = set()
-    json_pdfs:  set = set()
-    try:
-        async with session.get(
-            url, timeout=aiohttp.ClientTimeout(total=10)
-        ) as response:
-            if response.status != 200:
-                return json_links, json_pdfs
-            ct = response.headers.get("Content-Type", "").lower()
-            if "application/json" in ct:
-                try:
-                    data = await response.json()
-                    _extract_from_json(
-                        data, url, json_links, json_pdfs, pdf_regex
-                    )
-                except Exception:
-                    pass
-            else:
-                html_text = await response.text()
-                # NEW: decode HTML entities before parsing
-                decoded = html_unescape(html_text)
-                soup = BeautifulSoup(decoded, "html.parser")
-                for script in soup.find_all(
-                    "script", type="application/json"
-                ):
-                    try:
-                        if script.string:
-                            data = json.loads(script.string)
-                            _extract_from_json(
-                                data, url, json_links,
-                                json_pdfs, pdf_regex
-                            )
-                    except Exception:
-                        pass
-    except Exception:
-        pass
-    return json_links, json_pdfs
-
-
-def _extract_from_json(data, base_url, links, pdfs, pdf_regex):
-    if isinstance(data, dict):
-        for v in data.values():
-            if isinstance(v, str) and (
-                v.startswith("http") or v.startswith("/")
-            ):
-                abs_url = normalize_url(urljoin(base_url, v))
-                if abs_url.startswith("http"):
-                    links.add(abs_url)
-                    if pdf_regex.search(abs_url):
-                        pdfs.add(abs_url)
-            elif isinstance(v, (dict, list)):
-                _extract_from_json(v, base_url, links, pdfs, pdf_regex)
-    elif isinstance(data, list):
-        for item in data:
-            if isinstance(item, str) and (
-                item.startswith("http") or item.startswith("/")
-            ):
-                abs_url = normalize_url(urljoin(base_url, item))
-                if abs_url.startswith("http"):
-                    links.add(abs_url)
-                    if pdf_regex.search(abs_url):
-                        pdfs.add(abs_url)
-            elif isinstance(item, (dict, list)):
-                _extract_from_json(
-                    item, base_url, links, pdfs, pdf_regex
-                )
-
+def numbered_links(urls: list) -> str:
+    return "\n".join(f"{i}. [{u}]({u})" for i, u in enumerate(urls, 1))
 
-# ═══════════════════════════════════════════════════════════════
-# NEW: RAW-TEXT EXTRACTION FOR ENCODED URLS
-# ═══════════════════════════════════════════════════════════════
 
-def extract_urls_from_raw_text(decoded_text: str, base_url: str) -> set:
+def pages_with_pdfs_html(pages_dict: dict, index: dict) -> str:
     """
-    Extract any URLs (especially PDFs) from already-decoded HTML/JS/JSON
-    text. This catches URLs that were originally encoded with HTML
-    entities like &quot; (e.g. ${split_text:""} patterns) or wrapped in
-    JS template strings that BeautifulSoup wouldn't follow as <a href>.
+    Nested HTML ``<details>`` for each page, so users see only the URL
+    and PDF count and can expand individual pages on demand.
     """
-    found: set = set()
-
-    # Absolute URLs
-    for m in RAW_URL_RE.finditer(decoded_text):
-        candidate = clean_extracted_url(m.group(0))
-        if candidate.startswith("http"):
-            found.add(candidate)
+    html_parts = ['<div style="font-family:inherit;">']
+    for page_idx, (page_url, pdfs) in enumerate(
+        sorted(pages_dict.items()), 1
+    ):
+        n_pdfs      = len(pdfs)
+        page_colour = CATEGORY_COLOURS.get(
+            categorize_url(page_url), "#7f7f7f"
+        )
+        html_parts.append(
+            f'<details style="margin:6px 0;'
+            f'padding:6px 10px;border-left:3px '
+            f'solid {page_colour};'
+            f'background:#fafafa;border-radius:4px;">'
+            f'<summary style="cursor:pointer;'
+            f'padding:4px 0;font-weight:500;">'
+            f'<strong>{page_idx}.</strong> '
+            f'<a href="{page_url}" target="_blank" '
+            f'style="text-decoration:none;">'
+            f'{page_url}</a> '
+            f'<span style="background:#0066cc;'
+            f'color:white;padding:2px 8px;'
+            f'border-radius:10px;font-size:0.8em;'
+            f'margin-left:6px;">{n_pdfs} PDF'
+            f'{"s" if n_pdfs != 1 else ""}'
+            f'</span></summary>'
+            f'<ol style="margin:8px 0 4px 28px;'
+            f'padding-left:8px;">'
+        )
+        for pdf in pdfs:
+            pdf_cat    = index["pdf_category"][pdf]
+            pdf_colour = CATEGORY_COLOURS.get(pdf_cat, "#7f7f7f")
+            html_parts.append(
+                f'<li style="margin:3px 0;'
+                f'word-break:break-all;">'
+                f'<a href="{pdf}" target="_blank">'
+                f'{pdf}</a> '
+                f'<span style="background:'
+                f'{pdf_colour};color:white;'
+                f'padding:1px 6px;border-radius:3px;'
+                f'font-size:0.7em;'
+                f'margin-left:4px;">{pdf_cat}'
+                f'</span></li>'
+            )
+        html_parts.append('</ol></details>')
+    html_parts.append('</div>')
+    return "".join(html_parts)
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def result_markup(crawl_id: str, _res: dict) -> dict:
+    """Markdown and HTML for the list tabs of one crawl."""
+    index = _res["index"]
+    return {
+        "all_pages": numbered_links(_res["all_pages"]),
+        "categorized_pages": {
+            label: numbered_links(urls)
+            for label, urls in _res["categorized_pages"].items()
+        },
+        "categorized_pdfs": {
+            label: numbered_links(urls)
+            for label, urls in _res["categorized_pdfs"].items()
+        },
+        "pages_with_pdfs": {
+            label: pages_with_pdfs_html(pages_dict, index)
+            for label, pages_dict in _res["pages_pdfs_by_category"].items()
+        },
+    }
 
-    # Root-relative PDF references (e.g. "/uploads/file.pdf")
-    for m in RELATIVE_PDF_RE.finditer(decoded_text):
-        rel = m.group(1)
-        abs_url = urljoin(base_url, rel)
-        found.add(clean_extracted_url(abs_url))
 
-    return found
-
-
-# ═══════════════════════════════════════════════════════════════
-# MAIN CRAWLER
-# ═══════════════════════════════════════════════════════════════
-
-async def crawl_website(
-    start_url, pdf_pattern, max_depth,
-    max_concurrent, progress_callback,
-    enable_sibling_flood, sibling_threshold, sibling_keep,
-):
-    try:
-        if not start_url.startswith(("http://", "https://")):
-            start_url = "https://" + start_url
-
-        start_url   = normalize_url(start_url)
-        base_domain = urlparse(start_url).netloc
-        pdf_regex   = re.compile(pdf_pattern, re.IGNORECASE)
-
-        excluded = [
-            "javascript:", "mailto:", "tel:",
-            "sms:", "fax:", "data:", "#",
-        ]
-        skip_exts = {
-            ".jpg", ".jpeg", ".png", ".gif", ".css",
-            ".js", ".xml", ".ico", ".svg", ".zip", ".exe",
-        }
-
-        visited:         set  = set()
-        raw_pages:       set  = set()
-        raw_pdfs:        set  = set()
-        pages_with_pdfs: dict = {}
-        json_link_count: int  = 0
-        encoded_pdf_count: int = 0  # NEW: track encoded extractions
-
-        queue     = deque([(start_url, 0)])
-        semaphore = asyncio.Semaphore(max_concurrent)
-
-        async def fetch_and_parse(session, url, depth):
-            nonlocal json_link_count, encoded_pdf_count
-
-            norm = normalize_url(url)
-            if norm in visited or depth >= max_depth:
-                return []
-            visited.add(norm)
-            progress_callback(len(visited), len(queue))
-
-            new_urls:  list = []
-            page_pdfs: list = []
-
-            async with semaphore:
-                try:
-                    async with session.get(
-                        url, timeout=aiohttp.ClientTimeout(total=10)
-                    ) as resp:
-                        if resp.status != 200:
-                            return []
-                        ct = resp.headers.get("Content-Type", "").lower()
-                        if "text/html" not in ct:
-                            return []
-
-                        raw_html = await resp.text()
-
-                        # ── NEW: Decode HTML entities (&quot; etc.) ──
-                        decoded_html = html_unescape(raw_html)
-                        soup = BeautifulSoup(decoded_html, "html.parser")
-
-                        # ── 1. Standard <a href> extraction ──
-                        for a in soup.find_all("a", href=True):
-                            href = a["href"]
-                            if any(
-                                href.strip().lower().startswith(ex)
-                                for ex in excluded
-                            ):
-                                continue
-
-                            abs_url = normalize_url(urljoin(url, href))
-                            if is_social_media_url(abs_url):
-                                continue
-                            if is_sec_filing_url(abs_url):
-                                continue
-
-                            parsed = urlparse(abs_url)
-                            if parsed.scheme not in ("http", "https"):
-                                continue
-                            if any(
-                                parsed.path.lower().endswith(ext)
-                                for ext in skip_exts
-                            ):
-                                continue
-                            if not is_same_domain_or_allowed(
-                                abs_url, base_domain
-                            ):
-                                continue
-
-                            if is_pdf_url(abs_url):
-                                raw_pdfs.add(abs_url)
-                                page_pdfs.append(abs_url)
-                            else:
-                                raw_pages.add(abs_url)
-                                if (
-                                    parsed.netloc == base_domain
-                                    and depth + 1 < max_depth
-                                    and abs_url not in visited
-                                ):
-                                    new_urls.append((abs_url, depth + 1))
-
-                        # ── 2. NEW: Raw-text extraction for encoded URLs ──
-                        # Catches URLs hidden in &quot;...&quot; encoded
-                        # blocks, JS template strings, JSON blobs, etc.
-                        raw_extracted = extract_urls_from_raw_text(
-                            decoded_html, url
-                        )
-                        for cand in raw_extracted:
-                            try:
-                                abs_url = normalize_url(cand)
-                            except Exception:
-                                continue
-                            if not abs_url.startswith("http"):
-                                continue
-                            parsed = urlparse(abs_url)
-                            if parsed.scheme not in ("http", "https"):
-                                continue
-                            if is_social_media_url(abs_url):
-                                continue
-                            if is_sec_filing_url(abs_url):
-                                continue
-                            if not is_same_domain_or_allowed(
-                                abs_url, base_domain
-                            ):
-                                continue
-
-                            if is_pdf_url(abs_url):
-                                if abs_url not in raw_pdfs:
-                                    encoded_pdf_count += 1
-                                raw_pdfs.add(abs_url)
-                                if abs_url not in page_pdfs:
-                                    page_pdfs.append(abs_url)
-                            else:
-                                # only add non-PDF if it's plausibly an HTML page
-                                if not any(
-                                    parsed.path.lower().endswith(ext)
-                                    for ext in skip_exts
-                                ):
-                                    raw_pages.add(abs_url)
-
-                        # ── 3. JSON endpoint extraction ──
-                        if is_investor_or_media_page(norm):
-                            jlinks, jpdfs = await extract_json_links(
-                                session, url, pdf_regex
-                            )
-                            json_link_count += len(jlinks)
-                            for lnk in jlinks:
-                                if (
-                                    not is_social_media_url(lnk)
-                                    and is_same_domain_or_allowed(
-                                        lnk, base_domain
-                                    )
-                                ):
-                                    if is_pdf_url(lnk):
-                                        raw_pdfs.add(lnk)
-                                        page_pdfs.append(lnk)
-                                    else:
-                                        raw_pages.add(lnk)
-                            for lnk in jpdfs:
-                                if (
-                                    not is_social_media_url(lnk)
-                                    and is_same_domain_or_allowed(
-                                        lnk, base_domain
-                                    )
-                                ):
-                                    raw_pdfs.add(lnk)
-                                    page_pdfs.append(lnk)
-
-                        if page_pdfs:
-                            if norm not in pages_with_pdfs:
-                                pages_with_pdfs[norm] = set()
-                            pages_with_pdfs[norm].update(page_pdfs)
-
-                except Exception:
-                    pass
-
-            return new_urls
-
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36"
-            )
-        }
-
-        async with aiohttp.ClientSession(headers=headers) as session:
-            while queue:
-                batch = min(max_concurrent, len(queue))
-                tasks = []
-                for _ in range(batch):
-                    if queue:
-                        u, d = queue.popleft()
-                        tasks.append(fetch_and_parse(session, u, d))
-                for new_urls in await asyncio.gather(*tasks):
-                    for nu, nd in new_urls:
-                        if normalize_url(nu) not in visited:
-                            queue.append((nu, nd))
-
-        deduped_pages = deduplicate_urls(
-            sorted(raw_pages),
-            enable_sibling_flood=enable_sibling_flood,
-            sibling_threshold=sibling_threshold,
-            sibling_keep=sibling_keep,
-        )
-        all_pdfs = sorted(raw_pdfs)
-
-        pages_with_pdfs_clean = {
-            page: sorted(pdfs)
-            for page, pdfs in pages_with_pdfs.items()
-        }
-
-        categorized_pages = categorize_all_urls(deduped_pages)
-        categorized_pdfs  = categorize_all_urls(all_pdfs)
-
-        pages_pdfs_by_category: dict = defaultdict(dict)
-        for page_url, pdfs in pages_with_pdfs_clean.items():
-            page_cat = categorize_url(page_url)
-            pages_pdfs_by_category[page_cat][page_url] = pdfs
-
-        return {
-            "all_pages":               deduped_pages,
-            "raw_page_count":          len(raw_pages),
-            "all_pdfs":                all_pdfs,
-            "raw_pdf_count":           len(raw_pdfs),
-            "categorized_pages":       categorized_pages,
-            "categorized_pdfs":        categorized_pdfs,
-            "pages_pdfs_by_category":  dict(pages_pdfs_by_category),
-            "pages_crawled":           len(visited),
-            "json_links_count":        json_link_count,
-            "encoded_pdf_count":       encoded_pdf_count,  # NEW
-        }
-
-    except Exception as e:
-        return {"error": str(e)}
+@st.cache_data(max_entries=16, show_spinner=False)
+def filtered_sitemap(crawl_id: str, categories: tuple, _res: dict):
+    """Pages, tree and sitemap text for the chosen categories."""
+    page_category = _res["index"]["page_category"]
+    pages = [u for u in _res["all_pages"] if page_category[u] in categories]
+    tree  = build_tree_for_lookup(pages)
+    return pages, tree, build_sitemap_text(pages, tree)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -852,7 +337,8 @@ with st.sidebar:
     url_input = st.text_input("Website URL", value="https://")
     depth = st.slider("Crawl Depth", min_value=1, max_value=10, value=3)
     concurrent = st.slider(
-        "Concurrent Requests", min_value=5, max_value=50, value=30
+        "Concurrent Requests", min_value=5, max_value=MAX_CONCURRENT,
+        value=30,
     )
     pdf_pattern = st.text_input(
         "PDF Regex Pattern",
@@ -876,6 +362,119 @@ with st.sidebar:
         disabled=not enable_sibling_flood,
     )
 
+    st.markdown("---")
+    st.markdown("### ⚡ Performance")
+
+    link_backend = st.selectbox(
+        "Link Extractor",
+        options=list(LINK_EXTRACTORS),
+        index=0,
+        help=(
+            "`tokenizer` streams the HTML without building a tree; "
+            "`soup` is the BeautifulSoup reference."
+        ),
+    )
+    compare_backends = st.toggle(
+        "Compare Against BeautifulSoup", value=False,
+        help="Parse every page with both backends and flag differences.",
+    )
+    max_page_mb = st.slider(
+        "Max Page Size (MB)", min_value=1, max_value=100,
+        value=MAX_PAGE_BYTES // (1024 * 1024),
+        help="Only this much of each page is read and parsed.",
+    )
+    use_http_cache = st.toggle(
+        "Use HTTP Cache", value=False,
+        help=(
+            "Keep pages on disk and revalidate them with ETag / "
+            "Last-Modified, so unchanged pages are not re-parsed."
+        ),
+    )
+    parse_mode = st.selectbox(
+        "HTML Parsing",
+        options=list(PARSE_MODES),
+        index=0,
+        help=(
+            "`inline` parses on the crawler's event loop; `process` and "
+            "`thread` hand pages to a pool so fetching never stalls."
+        ),
+    )
+
+    compact_urls = st.toggle(
+        "Compact URL Store", value=False,
+        help=(
+            "Keep visited and discovered URLs as packed fingerprints "
+            "and byte blobs; for sites with millions of URLs."
+        ),
+    )
+    best_first = st.toggle(
+        "Best-First Crawl", value=False,
+        help=(
+            "Fetch report, presentation and filings pages, and links "
+            "from pages that had PDFs, before the rest of the site."
+        ),
+    )
+    use_sitemaps = st.toggle(
+        "Seed From Sitemaps", value=False,
+        help=(
+            "Read robots.txt and the site's sitemaps first, and add "
+            "the pages and PDFs they list to the crawl."
+        ),
+    )
+    verify_pdfs = st.toggle(
+        "Verify PDFs", value=False,
+        help=(
+            "Probe each PDF link (and download-style links) for the "
+            "%PDF signature; drop dead links and HTML landing pages."
+        ),
+    )
+    dedupe_pdfs = st.toggle(
+        "Merge Duplicate PDFs", value=False,
+        help=(
+            "Fingerprint PDFs by size and first 64 KB (full hash on a "
+            "match) and list each file once, with its other URLs."
+        ),
+    )
+    use_checkpoint = st.toggle(
+        "Checkpoint Crawl", value=False,
+        help=(
+            "Save crawl progress to disk as it goes, so an interrupted "
+            "crawl can be resumed without re-fetching visited pages."
+        ),
+    )
+
+    st.markdown("---")
+    st.markdown("### ⏱️ Crawl Budgets")
+    st.caption(
+        "The crawl stops at the first budget it reaches and keeps what "
+        "it found. 0 = no limit."
+    )
+
+    max_pages = st.number_input("Max Pages", min_value=0, value=0, step=100)
+    max_minutes = st.number_input(
+        "Max Minutes", min_value=0.0, value=0.0, step=1.0,
+    )
+    max_mb = st.number_input("Max MB Downloaded", min_value=0, value=0,
+                             step=50)
+    max_pdfs = st.number_input("Max PDFs Found", min_value=0, value=0,
+                               step=100)
+
+    st.markdown("---")
+    st.markdown("### 🆕 Change Tracking")
+
+    track_changes = st.toggle(
+        "Compare With Last Crawl", value=False,
+        help="Store each crawl per domain and report what changed.",
+    )
+    quick_recheck = st.toggle(
+        "Quick Re-check (PDF Pages Only)", value=False,
+        disabled=not track_changes,
+        help=(
+            "Only re-fetch the pages that yielded PDFs last time, "
+            "instead of crawling the whole site again."
+        ),
+    )
+
     st.markdown("---")
     st.markdown("### 📂 Categories")
     for label, patterns in CATEGORIES:
@@ -884,23 +483,57 @@ with st.sidebar:
                 st.code(p)
 
 
-def sort_key(cat: str) -> int:
-    order = {
-        "Presentation": 0, "Reports": 1, "News": 2,
-        "Filings": 3, "ESG": 4, "Sector Specific": 5,
-        "Company Info": 6, "❓ Unclassified": 8,
-        "⛔ Out of Scope": 9,
-    }
-    return order.get(cat, 7)
+col1, col2 = st.columns([3, 1])
 
+# Only a stat on each rerun; the checkpoint itself is built on a click.
+has_checkpoint = (
+    bool(url_input) and url_input != "https://"
+    and CrawlCheckpoint.saved_for_site(url_input)
+)
 
-col1, col2 = st.columns([3, 1])
+budgets = {
+    "max_pages":   max_pages or None,
+    "max_seconds": max_minutes * 60 or None,
+    "max_bytes":   max_mb * 1024 * 1024 or None,
+    "max_pdfs":    max_pdfs or None,
+}
 
 with col1:
-    if st.button(
+    start_clicked = st.button(
         "🚀 Start Crawling", type="primary",
         disabled=st.session_state.crawling
-    ):
+    )
+    resume_clicked = has_checkpoint and st.button(
+        "⏯️ Resume Interrupted Crawl",
+        disabled=st.session_state.crawling,
+        help="Continue the checkpointed crawl of this site.",
+    )
+    if resume_clicked:
+        st.session_state.crawling = True
+        st.session_state.results  = None
+        st.button("⏹️ Stop Crawl", key="stop_crawl")
+        status_text = st.empty()
+        with st.spinner("Resuming…"):
+            res = run_crawl(
+                resume_crawl, CrawlCheckpoint.for_site(url_input), concurrent,
+                status_text=status_text,
+                use_http_cache=use_http_cache,
+                use_pdf_verdicts=verify_pdfs or dedupe_pdfs,
+                link_backend=link_backend,
+                compare_backends=compare_backends,
+                parse_mode=parse_mode,
+                parse_executor=parse_pool(parse_mode),
+                max_page_bytes=max_page_mb * 1024 * 1024,
+                use_sitemaps=use_sitemaps,
+                verify_pdfs=verify_pdfs,
+                dedupe_pdfs=dedupe_pdfs,
+                best_first=best_first,
+                **budgets,
+            )
+        st.session_state.results  = res
+        st.session_state.crawling = False
+        st.success("✅ Crawl complete!")
+    elif start_clicked:
         if not url_input or url_input == "https://":
             st.error("Please enter a valid URL")
         else:
@@ -912,23 +545,58 @@ with col1:
                 st.session_state.crawling = True
                 st.session_state.results  = None
 
+                st.button("⏹️ Stop Crawl", key="stop_crawl")
                 progress_bar = st.progress(0)
                 status_text  = st.empty()
 
-                def update_progress(vis, q_len):
-                    status_text.text(
-                        f"Pages crawled: {vis} | Queue: {q_len}"
-                    )
-
-                with st.spinner("Crawling…"):
-                    res = asyncio.run(crawl_website(
-                        url_input, pdf_pattern,
-                        depth, concurrent,
-                        update_progress,
-                        enable_sibling_flood,
-                        sibling_threshold,
-                        sibling_keep,
-                    ))
+                store        = ResultStore() if track_changes else None
+                # run_crawl re-raises when a rerun or stop interrupts the
+                # crawl, so the store is closed on the way out either way.
+                try:
+                    domain       = site_key(url_input)
+                    previous     = store.latest(domain) if store else None
+                    quick        = bool(quick_recheck and previous)
+                    checkpoint   = None
+                    if use_checkpoint:
+                        # A fresh start replaces any older checkpoint.
+                        checkpoint = CrawlCheckpoint.for_site(url_input)
+                        checkpoint.clear()
+                    with st.spinner("Crawling…"):
+                        res = run_crawl(
+                            crawl_website, url_input, pdf_pattern,
+                            # A quick re-check fetches only the seeds.
+                            1 if quick else depth, concurrent,
+                            status_text=status_text,
+                            use_http_cache=use_http_cache,
+                            use_pdf_verdicts=verify_pdfs or dedupe_pdfs,
+                            enable_sibling_flood=enable_sibling_flood,
+                            sibling_threshold=sibling_threshold,
+                            sibling_keep=sibling_keep,
+                            link_backend=link_backend,
+                            compare_backends=compare_backends,
+                            parse_mode=parse_mode,
+                            parse_executor=parse_pool(parse_mode),
+                            max_page_bytes=max_page_mb * 1024 * 1024,
+                            seed_urls=(
+                                sorted(previous["pages_with_pdfs"])
+                                if previous else None
+                            ),
+                            checkpoint=checkpoint,
+                            use_sitemaps=use_sitemaps,
+                            compact_urls=compact_urls,
+                            verify_pdfs=verify_pdfs,
+                            dedupe_pdfs=dedupe_pdfs,
+                            best_first=best_first,
+                            **budgets,
+                        )
+                    # A partial crawl would show the rest as removed.
+                    if store and "error" not in res and not res.get("stopped"):
+                        res["delta"] = record_crawl(
+                            store, domain, previous, res, quick
+                        )
+                finally:
+                    if store:
+                        store.close()
 
                 st.session_state.results  = res
                 st.session_state.crawling = False
@@ -950,6 +618,23 @@ if st.session_state.results:
     if "error" in res:
         st.error(f"Error: {res['error']}")
     else:
+        if res.get("stopped"):
+            reason = {
+                "pages":     "page budget reached",
+                "bytes":     "download budget reached",
+                "time":      "time budget reached",
+                "pdfs":      "PDF budget reached",
+                "cancelled": "stopped by you",
+            }.get(res["stopped"], res["stopped"])
+            st.warning(
+                f"⏸️ Crawl stopped early ({reason}); the results cover "
+                f"the {res['pages_crawled']} page(s) crawled."
+            )
+        for stage, error in res.get("stage_errors", {}).items():
+            st.warning(
+                f"⚠️ The {stage} step failed ({error}); the crawl's "
+                f"results are shown without it."
+            )
         cat_pages    = res.get("categorized_pages", {})
         n_unclass    = len(cat_pages.get("❓ Unclassified", []))
         n_oos        = len(cat_pages.get("⛔ Out of Scope", []))
@@ -972,6 +657,121 @@ if st.session_state.results:
                 f"(e.g. `&quot;` patterns)."
             )
 
+        if res.get("sitemap_url_count", 0) > 0:
+            st.info(
+                f"🗺️ Sitemaps listed {res['sitemap_url_count']} URL(s), "
+                f"including {res['sitemap_pdf_count']} new PDF(s)."
+            )
+
+        if res.get("pdfs_verified"):
+            checks   = res.get("pdf_checks", {})
+            rejected = res.get("rejected_pdfs", {})
+            st.info(
+                f"🔎 Probed {len(checks)} link(s): "
+                f"{len(res.get('found_pdfs', []))} PDF(s) found behind "
+                f"download links, {len(rejected)} PDF link(s) dropped "
+                f"as HTML or missing."
+            )
+            if rejected:
+                with st.expander(f"Dropped PDF links — {len(rejected)}"):
+                    st.markdown("\n".join(
+                        f"{i}. [{u}]({u}) — {verdict}"
+                        for i, (u, verdict) in enumerate(rejected.items(), 1)
+                    ))
+
+        pdf_aliases = res.get("pdf_aliases", {})
+        if pdf_aliases:
+            n_aliases = sum(len(a) for a in pdf_aliases.values())
+            st.info(
+                f"🧬 {n_aliases} duplicate PDF URL(s) serve the same file "
+                f"as {len(pdf_aliases)} other(s); each file is listed once."
+            )
+            with st.expander(f"Duplicate PDFs — {len(pdf_aliases)}"):
+                st.markdown("\n".join(
+                    f"{i}. [{u}]({u}) — also at "
+                    + ", ".join(f"[{a}]({a})" for a in aliases)
+                    for i, (u, aliases) in enumerate(pdf_aliases.items(), 1)
+                ))
+
+        if res.get("throttled_count", 0) > 0:
+            st.warning(
+                f"🐢 Server asked to slow down {res['throttled_count']} "
+                f"time(s) (HTTP 429/503); those pages were retried."
+            )
+
+        if res.get("backends_compared"):
+            mismatches = res.get("backend_mismatches", [])
+            if mismatches:
+                st.warning(
+                    f"⚠️ Link extractor differed from BeautifulSoup on "
+                    f"{len(mismatches)} page(s): "
+                    + ", ".join(mismatches[:10])
+                )
+            else:
+                st.success(
+                    f"✅ Link extractor matched BeautifulSoup on all "
+                    f"{res['pages_crawled']} crawled page(s)."
+                )
+
+        if res.get("cache_hits", 0) > 0:
+            st.info(
+                f"♻️ {res['cache_hits']} page(s) unchanged since the last "
+                f"crawl were reused from the HTTP cache."
+            )
+
+        if res.get("truncated_pages"):
+            st.info(
+                f"✂️ {len(res['truncated_pages'])} page(s) exceeded the "
+                f"size limit; only their first part was parsed."
+            )
+
+        if res.get("url_store_bytes"):
+            store_mb = sum(res["url_store_bytes"].values()) / (1024 * 1024)
+            st.caption(f"💾 URL stores and memo caches held {store_mb:.1f} MB during the crawl.")
+
+        metrics = res.get("metrics")
+        if metrics:
+            with st.expander("⏱️ Crawl Telemetry"):
+                m1, m2, m3, m4, m5 = st.columns(5)
+                m1.metric("Requests",    metrics["requests"])
+                m2.metric("Downloaded",
+                          f"{metrics['bytes'] / (1024 * 1024):.1f} MB")
+                m3.metric("Errors",      sum(metrics["errors"].values()))
+                m4.metric("Elapsed",     f"{metrics['elapsed_s']:.1f}s")
+                m5.metric("Pages / sec", metrics["pages_per_s"])
+                if metrics["stages"]:
+                    st.caption("Parse stages (per page)")
+                    st.dataframe([
+                        {"stage": name, **summary}
+                        for name, summary in metrics["stages"].items()
+                    ], hide_index=True)
+                phase_rows = [
+                    {"host": host, "phase": phase, **summary}
+                    for host, stats in metrics["hosts"].items()
+                    for phase, summary in stats["phases"].items()
+                ]
+                if phase_rows:
+                    st.caption("Request phases (per host)")
+                    st.dataframe(phase_rows, hide_index=True)
+                if metrics["errors"]:
+                    st.caption("Errors: " + ", ".join(
+                        f"{kind} × {n}"
+                        for kind, n in metrics["errors"].items()
+                    ))
+                st.caption("Status codes: " + ", ".join(
+                    f"{code} × {n}" for code, n in metrics["statuses"].items()
+                ))
+                if metrics.get("endpoints"):
+                    st.caption(
+                        f"JSON endpoints fetched: {metrics['endpoints']}"
+                    )
+                st.download_button(
+                    "📥 Download Telemetry",
+                    json.dumps(metrics, indent=1),
+                    "crawl_metrics.json", "application/json",
+                    key="dl_metrics",
+                )
+
         raw   = res["raw_page_count"]
         dedup = len(res["all_pages"])
         if raw > 0:
@@ -981,8 +781,107 @@ if st.session_state.results:
                 f"{dedup} unique ({pct}% reduction)"
             )
 
+        delta = res.get("delta")
+        if delta:
+            st.markdown("---")
+            st.subheader("🆕 Changes Since Last Crawl")
+            d1, d2, d3, d4 = st.columns(4)
+            d1.metric("New PDFs",      len(delta["new_pdfs"]))
+            d2.metric("Removed PDFs",  len(delta["removed_pdfs"]))
+            d3.metric("New Pages",     len(delta["new_pages"]))
+            d4.metric("Removed Pages", len(delta["removed_pages"]))
+            delta_lines = []
+            for key, title in [
+                ("new_pdfs", "New PDFs"),
+                ("removed_pdfs", "Removed PDFs"),
+                ("new_pages", "New Pages"),
+                ("removed_pages", "Removed Pages"),
+            ]:
+                urls = delta[key]
+                delta_lines += [f"\n{title} ({len(urls)})"] + urls
+                if urls:
+                    with st.expander(f"{title} — {len(urls)}"):
+                        for i, u in enumerate(urls, 1):
+                            st.markdown(f"{i}. [{u}]({u})")
+            st.download_button(
+                "📥 Download Changes",
+                "\n".join(delta_lines),
+                "changes.txt", "text/plain",
+                key="dl_delta",
+            )
+
+        if res["all_pdfs"]:
+            with st.expander(f"📥 Download All {len(res['all_pdfs'])} PDFs"):
+                dl_col1, dl_col2 = st.columns([3, 1])
+                with dl_col1:
+                    download_dir = st.text_input(
+                        "Save to folder", value="downloads",
+                        help=(
+                            "PDFs go under <folder>/<host>/, with a "
+                            "manifest.json of sizes and SHA-256 hashes. "
+                            "Running it again resumes unfinished files."
+                        ),
+                    )
+                with dl_col2:
+                    download_mbps = st.number_input(
+                        "Max MB/s (0 = no limit)",
+                        min_value=0.0, value=0.0, step=1.0,
+                    )
+                if st.button("📥 Download PDFs", key="download_pdfs"):
+                    dl_bar   = st.progress(0)
+                    progress = {}
+
+                    def update_download(done, total):
+                        progress["value"] = (done, total)
+
+                    def show_download():
+                        if "value" in progress:
+                            done, total = progress["value"]
+                            dl_bar.progress(
+                                done / total,
+                                text=f"{done} of {total} PDFs",
+                            )
+
+                    with st.spinner("Downloading…"):
+                        manifest = crawl_loop().run(
+                            lambda session: download_pdfs(
+                                res["all_pdfs"], download_dir,
+                                max_concurrent=concurrent,
+                                max_bytes_per_sec=(
+                                    download_mbps * 1024 * 1024
+                                    if download_mbps else None
+                                ),
+                                progress_callback=update_download,
+                                session=session,
+                            ),
+                            on_tick=show_download,
+                        )
+                    dl_bar.progress(1.0)
+                    summary = manifest_summary(manifest, res["all_pdfs"])
+                    st.success(
+                        f"✅ {summary.get('done', 0)} PDF(s) "
+                        f"({summary['bytes'] / (1024 * 1024):.1f} MB) in "
+                        f"{download_dir}; {summary.get('failed', 0)} "
+                        f"failed, {summary.get('not_pdf', 0)} not PDFs."
+                    )
+
         st.markdown("---")
 
+        index = res["index"]
+        if index is None:
+            # The views could not be built, but the lists are intact.
+            st.download_button(
+                "📥 Download All Pages", "\n".join(res["all_pages"]),
+                "all_pages.txt", "text/plain", key="dl_pages_raw",
+            )
+            st.download_button(
+                "📥 Download All PDF Links", "\n".join(res["all_pdfs"]),
+                "all_pdfs.txt", "text/plain", key="dl_pdfs_raw",
+            )
+            st.stop()
+        exports = index["exports"]
+        markup  = result_markup(res["crawl_id"], res)
+
         tab1, tab2, tab3, tab4, tab5 = st.tabs([
             "📄 All Pages",
             "🏷️ Categorized Pages",
@@ -994,36 +893,26 @@ if st.session_state.results:
         # ── TAB 1: All Pages ──────────────────────────────────
         with tab1:
             st.subheader(f"All Pages ({len(res['all_pages'])})")
-            for i, lnk in enumerate(res["all_pages"], 1):
-                st.markdown(f"{i}. [{lnk}]({lnk})")
+            st.markdown(markup["all_pages"])
             if res["all_pages"]:
                 st.download_button(
                     "📥 Download All Pages",
-                    "\n".join(res["all_pages"]),
+                    exports["all_pages"],
                     "all_pages.txt", "text/plain",
                 )
 
         # ── TAB 2: Categorized Pages ──────────────────────────
         with tab2:
             st.subheader("🏷️ Pages by Category")
-            lines = []
-            for label in sorted(cat_pages.keys(), key=sort_key):
-                urls = cat_pages[label]
-                lines += [
-                    f"\n{'='*60}",
-                    f"{label}  ({len(urls)} pages)",
-                    f"{'='*60}",
-                ]
+            for label in sorted(cat_pages.keys(), key=category_sort_key):
                 with st.expander(
-                    f"📂 {label} — {len(urls)} page(s)",
+                    f"📂 {label} — {len(cat_pages[label])} page(s)",
                     expanded=False
                 ):
-                    for i, u in enumerate(urls, 1):
-                        st.markdown(f"{i}. [{u}]({u})")
-                        lines.append(u)
+                    st.markdown(markup["categorized_pages"][label])
             st.download_button(
                 "📥 Download Categorized Pages",
-                "\n".join(lines),
+                exports["categorized_pages"],
                 "categorized_pages.txt", "text/plain",
                 key="dl_cat_pages",
             )
@@ -1031,26 +920,17 @@ if st.session_state.results:
         # ── TAB 3: Categorized PDFs ───────────────────────────
         with tab3:
             st.subheader("📑 PDFs by Category")
-            cat_pdfs  = res.get("categorized_pdfs", {})
-            pdf_lines = []
-            for label in sorted(cat_pdfs.keys(), key=sort_key):
-                urls = cat_pdfs[label]
-                pdf_lines += [
-                    f"\n{'='*60}",
-                    f"{label}  ({len(urls)} PDFs)",
-                    f"{'='*60}",
-                ]
+            cat_pdfs = res.get("categorized_pdfs", {})
+            for label in sorted(cat_pdfs.keys(), key=category_sort_key):
                 with st.expander(
-                    f"📂 {label} — {len(urls)} PDF(s)",
+                    f"📂 {label} — {len(cat_pdfs[label])} PDF(s)",
                     expanded=False
                 ):
-                    for i, u in enumerate(urls, 1):
-                        st.markdown(f"{i}. [{u}]({u})")
-                        pdf_lines.append(u)
-            if pdf_lines:
+                    st.markdown(markup["categorized_pdfs"][label])
+            if cat_pdfs:
                 st.download_button(
                     "📥 Download Categorized PDFs",
-                    "\n".join(pdf_lines),
+                    exports["categorized_pdfs"],
                     "categorized_pdfs.txt", "text/plain",
                     key="dl_cat_pdf",
                 )
@@ -1064,19 +944,11 @@ if st.session_state.results:
             )
 
             if ppbc:
-                report_lines = []
-                for cat_label in sorted(ppbc.keys(), key=sort_key):
+                for cat_label in sorted(ppbc.keys(), key=category_sort_key):
                     pages_dict     = ppbc[cat_label]
                     total_pdfs_cat = sum(
                         len(v) for v in pages_dict.values()
                     )
-                    report_lines += [
-                        f"\n{'='*60}",
-                        f"{cat_label} ({len(pages_dict)} pages, "
-                        f"{total_pdfs_cat} PDFs)",
-                        f"{'='*60}",
-                    ]
-
                     # OUTER expander for category
                     with st.expander(
                         f"📂 {cat_label} — "
@@ -1084,78 +956,14 @@ if st.session_state.results:
                         f"{total_pdfs_cat} PDF(s)",
                         expanded=False,
                     ):
-                        # Build nested HTML <details> for each page so
-                        # users see only the URL + PDF count, and can
-                        # expand individual pages on demand.
-                        sorted_pages = sorted(pages_dict.items())
-                        html_parts = [
-                            '<div style="font-family:inherit;">'
-                        ]
-                        for page_idx, (page_url, pdfs) in enumerate(
-                            sorted_pages, 1
-                        ):
-                            n_pdfs = len(pdfs)
-                            page_cat = categorize_url(page_url)
-                            page_colour = CATEGORY_COLOURS.get(
-                                page_cat, "#7f7f7f"
-                            )
-
-                            html_parts.append(
-                                f'<details style="margin:6px 0;'
-                                f'padding:6px 10px;border-left:3px '
-                                f'solid {page_colour};'
-                                f'background:#fafafa;border-radius:4px;">'
-                                f'<summary style="cursor:pointer;'
-                                f'padding:4px 0;font-weight:500;">'
-                                f'<strong>{page_idx}.</strong> '
-                                f'<a href="{page_url}" target="_blank" '
-                                f'style="text-decoration:none;">'
-                                f'{page_url}</a> '
-                                f'<span style="background:#0066cc;'
-                                f'color:white;padding:2px 8px;'
-                                f'border-radius:10px;font-size:0.8em;'
-                                f'margin-left:6px;">{n_pdfs} PDF'
-                                f'{"s" if n_pdfs != 1 else ""}'
-                                f'</span></summary>'
-                                f'<ol style="margin:8px 0 4px 28px;'
-                                f'padding-left:8px;">'
-                            )
-                            report_lines.append(
-                                f"  PAGE {page_idx} "
-                                f"({n_pdfs} PDFs): {page_url}"
-                            )
-
-                            for pdf_idx, pdf in enumerate(pdfs, 1):
-                                pdf_cat    = categorize_url(pdf)
-                                pdf_colour = CATEGORY_COLOURS.get(
-                                    pdf_cat, "#7f7f7f"
-                                )
-                                html_parts.append(
-                                    f'<li style="margin:3px 0;'
-                                    f'word-break:break-all;">'
-                                    f'<a href="{pdf}" target="_blank">'
-                                    f'{pdf}</a> '
-                                    f'<span style="background:'
-                                    f'{pdf_colour};color:white;'
-                                    f'padding:1px 6px;border-radius:3px;'
-                                    f'font-size:0.7em;'
-                                    f'margin-left:4px;">{pdf_cat}'
-                                    f'</span></li>'
-                                )
-                                report_lines.append(
-                                    f"    {pdf_idx}. [{pdf_cat}] {pdf}"
-                                )
-                            html_parts.append('</ol></details>')
-
-                        html_parts.append('</div>')
                         st.markdown(
-                            "".join(html_parts),
+                            markup["pages_with_pdfs"][cat_label],
                             unsafe_allow_html=True,
                         )
 
                 st.download_button(
                     "📥 Download Pages with PDFs",
-                    "\n".join(report_lines),
+                    exports["pages_with_pdfs"],
                     "pages_with_pdfs.txt", "text/plain",
                     key="dl_pages_pdfs",
                 )
@@ -1187,42 +995,40 @@ if st.session_state.results:
                     min_value=1, max_value=8, value=3,
                     key="sitemap_depth",
                     help=(
-                        "Rows at this depth and shallower render "
-                        "directly. Deeper rows appear in a single "
-                        "expander per parent group."
+                        "Branches shallower than this start expanded; "
+                        "click a branch to open or close it."
                     )
                 )
             with sm_col2:
-                all_cats_sm = sorted(
-                    set(categorize_url(u) for u in res["all_pages"])
-                )
                 selected_cats = st.multiselect(
                     "Filter by category (empty = show all)",
-                    options=all_cats_sm,
+                    options=index["page_categories"],
                     default=[],
                     key="sitemap_cat_filter",
                 )
 
-            pages_to_map = res["all_pages"]
             if selected_cats:
-                pages_to_map = [
-                    u for u in pages_to_map
-                    if categorize_url(u) in selected_cats
-                ]
+                pages_to_map, sitemap_tree, sitemap_text = filtered_sitemap(
+                    res["crawl_id"], tuple(sorted(selected_cats)), res
+                )
+            else:
+                pages_to_map = res["all_pages"]
+                sitemap_tree = index["sitemap_tree"]
+                sitemap_text = exports["sitemap"]
 
             st.caption(f"Showing {len(pages_to_map)} pages")
             st.markdown("---")
 
             if pages_to_map:
-                dl_lines = render_flat_sitemap(
-                    pages_to_map,
+                render_sitemap_tree(
+                    sitemap_tree,
                     max_depth_show=max_depth_show,
                 )
 
                 st.markdown("---")
                 st.download_button(
                     "📥 Download Sitemap",
-                    build_sitemap_text(pages_to_map),
+                    sitemap_text,
                     "sitemap.txt", "text/plain",
                     key="dl_sitemap",
                 )
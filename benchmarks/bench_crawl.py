@@ -0,0 +1,223 @@
+"""
+Benchmark a full crawl and the result passes on synthetic IR sites.
+
+    python benchmarks/bench_crawl.py                     # small and medium
+    python benchmarks/bench_crawl.py --profiles large --parse-mode process
+    python benchmarks/bench_crawl.py --save baseline.json
+    python benchmarks/bench_crawl.py --compare baseline.json
+
+Each profile's site (see ``irsite.py``) is served from its own process,
+so the server's CPU is not counted, and each profile is benchmarked in
+a fresh process, so peak RSS belongs to that profile alone. The crawl
+reports pages/sec, CPU per page and peak RSS; ``deduplicate_urls``,
+``categorize_all_urls`` and the sitemap builders are then timed on the
+crawled pages plus ``--offline-urls`` synthetic URLs.
+
+``--compare`` exits non-zero if throughput, CPU per page or an offline
+pass is more than ``--tolerance`` worse than the saved run, or if the
+crawl found a different number of PDFs.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_dedup import synthetic_urls  # noqa: E402
+from irsite import PROFILES, serve_in_background, site_size  # noqa: E402
+
+from contentas.crawler import (  # noqa: E402
+    LINK_EXTRACTORS,
+    PARSE_MODES,
+    PDF_EXTENSION_RE,
+    build_sitemap_text,
+    build_tree_for_lookup,
+    categorize_all_urls,
+    crawl_website,
+    deduplicate_urls,
+)
+
+
+def cpu_seconds() -> float:
+    """CPU time of this process and its reaped children (parse pools)."""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage  = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def measure(fn, *args, **kwargs):
+    cpu     = cpu_seconds()
+    started = time.perf_counter()
+    result  = fn(*args, **kwargs)
+    return result, time.perf_counter() - started, cpu_seconds() - cpu
+
+
+def run_profile(base_url: str, depth: int, opts: dict) -> dict:
+    """Crawl the site at ``base_url``, then time the offline passes."""
+    res, wall, cpu = measure(asyncio.run, crawl_website(
+        base_url, PDF_EXTENSION_RE.pattern, depth,
+        opts["concurrency"], lambda *_: None,
+        False, 10, 3,
+        link_backend=opts["link_backend"],
+        parse_mode=opts["parse_mode"],
+        best_first=opts["best_first"],
+    ))
+    if res.get("error"):
+        raise RuntimeError(res["error"])
+    pages   = res["pages_crawled"]
+    metrics = res["metrics"]
+    crawl   = {
+        "pages":        pages,
+        "pdfs":         len(res["all_pdfs"]),
+        "errors":       sum(metrics["errors"].values()) + sum(
+            n for code, n in metrics["statuses"].items() if int(code) >= 400
+        ),
+        "wall_s":       round(wall, 2),
+        "pages_per_s":  round(pages / wall, 1),
+        "cpu_ms_page":  round(cpu / pages * 1000, 2),
+        "peak_rss_mb":  round(peak_rss_mb(), 1),
+    }
+
+    # The category and sitemap passes get every URL, not just what
+    # deduplication keeps, so they have enough work to time.
+    urls = list(dict.fromkeys(
+        res["all_pages"] + synthetic_urls(opts["offline_urls"])
+    ))
+    offline: dict = {}
+    _, offline["deduplicate_urls"], _ = measure(deduplicate_urls, urls)
+    _, offline["deduplicate_urls_flood"], _ = measure(
+        deduplicate_urls, urls, True
+    )
+    _, offline["categorize_all_urls"], _ = measure(categorize_all_urls, urls)
+    tree, offline["build_tree_for_lookup"], _ = measure(
+        build_tree_for_lookup, urls
+    )
+    _, offline["build_sitemap_text"], _ = measure(
+        build_sitemap_text, urls, tree
+    )
+    return {
+        "crawl":        crawl,
+        "offline_urls": len(urls),
+        "offline":      {k: round(v, 3) for k, v in offline.items()},
+        "peak_rss_mb":  round(peak_rss_mb(), 1),
+    }
+
+
+def bench(name: str, opts: dict) -> dict:
+    cfg  = PROFILES[name]
+    size = site_size(cfg)
+    server, base_url = serve_in_background(**cfg)
+    try:
+        with ProcessPoolExecutor(
+            1, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            result = pool.submit(
+                run_profile, base_url, size["depth"] + 2, opts
+            ).result()
+    finally:
+        server.terminate()
+        server.join()
+    result["expected_pdfs"] = size["pdfs"]
+    return result
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    found: list = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        checks = [
+            ("pages/sec", old["crawl"]["pages_per_s"],
+             new["crawl"]["pages_per_s"], False),
+            ("CPU ms/page", old["crawl"]["cpu_ms_page"],
+             new["crawl"]["cpu_ms_page"], True),
+        ] + [
+            (stage, old["offline"][stage], seconds, True)
+            for stage, seconds in new["offline"].items()
+            if stage in old["offline"]
+        ]
+        for label, before, after, lower_is_better in checks:
+            worse = (
+                after > before * (1 + tolerance) if lower_is_better
+                else after < before * (1 - tolerance)
+            )
+            if worse:
+                found.append(f"{name}: {label} {before} → {after}")
+        if new["crawl"]["pdfs"] != old["crawl"]["pdfs"]:
+            found.append(f"{name}: PDFs found {old['crawl']['pdfs']} → "
+                         f"{new['crawl']['pdfs']}")
+    return found
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES),
+                        default=["small", "medium"])
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--parse-mode", choices=list(PARSE_MODES),
+                        default="inline")
+    parser.add_argument("--link-backend", choices=list(LINK_EXTRACTORS),
+                        default="tokenizer")
+    parser.add_argument("--best-first", action="store_true",
+                        help="Crawl with the best-first frontier.")
+    parser.add_argument("--offline-urls", type=int, default=100_000,
+                        help="Synthetic URLs added to the offline passes.")
+    parser.add_argument("--save", help="Write the results to this file.")
+    parser.add_argument("--compare", help="Results file to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown before --compare fails.")
+    opts = parser.parse_args(argv)
+    bench_opts = {
+        "concurrency":  opts.concurrency,
+        "parse_mode":   opts.parse_mode,
+        "link_backend": opts.link_backend,
+        "best_first":   opts.best_first,
+        "offline_urls": opts.offline_urls,
+    }
+
+    results: dict = {}
+    print(f"{'profile':>8} {'pages':>6} {'pdfs':>11} {'errors':>6} "
+          f"{'wall':>7} {'pages/s':>8} {'cpu/page':>9} {'rss':>8}")
+    for name in opts.profiles:
+        r = results[name] = bench(name, bench_opts)
+        c = r["crawl"]
+        print(f"{name:>8} {c['pages']:>6} "
+              f"{c['pdfs']:>5}/{r['expected_pdfs']:<5} {c['errors']:>6} "
+              f"{c['wall_s']:>6.2f}s {c['pages_per_s']:>8.1f} "
+              f"{c['cpu_ms_page']:>7.2f}ms {c['peak_rss_mb']:>6.1f}MB")
+
+    for name, r in results.items():
+        print(f"\n{name}: offline passes on {r['offline_urls']} URLs "
+              f"(peak RSS {r['peak_rss_mb']:.1f} MB)")
+        for stage, seconds in r["offline"].items():
+            print(f"  {stage:<24} {seconds:>7.3f}s")
+
+    if opts.save:
+        with open(opts.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    if opts.compare:
+        with open(opts.compare, encoding="utf-8") as f:
+            found = regressions(results, json.load(f), opts.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Benchmark ``deduplicate_urls`` against the implementation it replaced.
+
+    python benchmarks/bench_dedup.py                 # 100k and 1M URLs
+    python benchmarks/bench_dedup.py --sizes 50000
+
+Both functions run on the same synthetic investor-relations URL sets,
+with and without sibling flood control, and must return identical
+lists; the script exits non-zero if they do not.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contentas.crawler import deduplicate_urls, strip_query  # noqa: E402
+
+
+def reference_deduplicate_urls(
+    urls: list,
+    enable_sibling_flood: bool = False,
+    sibling_threshold: int = 10,
+    sibling_keep: int = 3,
+) -> list:
+    """``deduplicate_urls`` as it was before the trie rewrite."""
+    seen:  set  = set()
+    clean: list = []
+    for url in sorted(urls):
+        c = strip_query(url)
+        if c not in seen:
+            seen.add(c)
+            clean.append(c)
+
+    path_set:     set  = set()
+    parsed_cache: dict = {}
+    for u in clean:
+        p = urlparse(u)
+        parsed_cache[u] = p
+        path_set.add((p.scheme, p.netloc, p.path.rstrip("/")))
+
+    after_parent: list = []
+    for u in clean:
+        p     = parsed_cache[u]
+        parts = p.path.strip("/").split("/")
+        is_child = False
+        for depth in range(len(parts) - 1, 0, -1):
+            parent_path = "/" + "/".join(parts[:depth])
+            if (p.scheme, p.netloc, parent_path) in path_set:
+                is_child = True
+                break
+        if not is_child:
+            after_parent.append(u)
+
+    if not enable_sibling_flood:
+        after_parent.sort()
+        return after_parent
+
+    buckets: dict = defaultdict(list)
+    for u in after_parent:
+        p      = urlparse(u)
+        parts  = p.path.strip("/").split("/")
+        parent = "/" + "/".join(parts[:-1]) if len(parts) > 1 else "/"
+        buckets[(p.netloc, parent)].append(u)
+
+    result: list = []
+    for bucket_urls in buckets.values():
+        if len(bucket_urls) > sibling_threshold:
+            result.extend(bucket_urls[:sibling_keep])
+        else:
+            result.extend(bucket_urls)
+
+    result.sort()
+    return result
+
+
+SECTIONS = [
+    "investors", "investors/news", "investors/reports", "media",
+    "press-releases", "about", "careers", "products", "esg",
+]
+ODD_URLS = [
+    "https://ir.example.com", "https://ir.example.com/",
+    "HTTPS://IR.Example.com/Investors/", "https://ir.example.com//x",
+    "https://ir.example.com/a;v=1", "https://ir.example.com/a;v=1/",
+    "https://ir.example.com/a//b", "http://ir.example.com/investors/x",
+    "https://ir.example.com:443/investors", "mailto:ir@example.com",
+    "https://ir.example.com/investors?page=2#top",
+]
+
+
+def synthetic_urls(n: int, seed: int = 0) -> list:
+    """
+    ``n`` crawl-style URLs: deep news archives, query and trailing-slash
+    variants of the same page, and the occasional listed parent page.
+    """
+    rng   = random.Random(seed)
+    hosts = [f"https://www.company{i}.com" for i in range(max(1, n // 20000))]
+    urls  = list(ODD_URLS)
+    while len(urls) < n:
+        host  = rng.choice(hosts)
+        parts = [rng.choice(SECTIONS)]
+        for _ in range(rng.randint(0, 3)):
+            parts.append(rng.choice([
+                str(rng.randint(2005, 2025)), f"q{rng.randint(1, 4)}",
+                "archive", "detail",
+            ]))
+        if rng.random() < 0.95:
+            parts.append(f"item-{rng.randint(1, n)}")
+        url = host + "/" + "/".join(parts)
+        roll = rng.random()
+        if roll < 0.3:
+            url += f"?page={rng.randint(1, 9)}"
+        elif roll < 0.4:
+            url += "/"
+        elif roll < 0.45:
+            url += "#section"
+        urls.append(url)
+    return urls
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result  = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100_000, 1_000_000])
+    opts = parser.parse_args(argv)
+
+    ok = True
+    print(f"{'urls':>9} {'flood':>5} {'before':>9} {'after':>9} "
+          f"{'speedup':>8} {'kept':>8}  same")
+    for n in opts.sizes:
+        urls = synthetic_urls(n)
+        for flood in (False, True):
+            old, t_old = timed(reference_deduplicate_urls, urls, flood)
+            new, t_new = timed(deduplicate_urls, urls, flood)
+            same = old == new
+            ok   = ok and same
+            print(f"{n:>9} {str(flood):>5} {t_old:>8.2f}s {t_new:>8.2f}s "
+                  f"{t_old / t_new:>7.1f}x {len(new):>8}  {same}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
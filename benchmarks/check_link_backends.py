@@ -0,0 +1,69 @@
+"""
+Check that the link extraction backends agree with BeautifulSoup.
+
+    python benchmarks/check_link_backends.py              # bundled fixtures
+    python benchmarks/check_link_backends.py saved_pages/ # plus more HTML
+
+Every ``*.html`` file under ``benchmarks/fixtures/links`` (and any
+directories given) is run through each backend and the BeautifulSoup
+reference; hrefs, anchor texts and JSON script bodies must match. The
+script prints the mismatches and exits non-zero if there are any.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contentas.crawler import (  # noqa: E402
+    LINK_EXTRACTORS, compare_link_backends,
+)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "fixtures", "links")
+
+
+def load_docs(directories) -> dict:
+    docs: dict = {}
+    for directory in directories:
+        for path in sorted(glob.glob(os.path.join(directory, "**", "*.html"),
+                                     recursive=True)):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                docs[os.path.relpath(path)] = f.read()
+    return docs
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("dirs", nargs="*",
+                        help="more directories of .html files to check")
+    opts = parser.parse_args(argv)
+
+    docs = load_docs([FIXTURES, *opts.dirs])
+    if not docs:
+        print("no HTML documents found")
+        return 1
+
+    failed = False
+    for backend in LINK_EXTRACTORS:
+        if backend == "soup":
+            continue
+        t = time.perf_counter()
+        mismatches = compare_link_backends(docs, backend)
+        elapsed = time.perf_counter() - t
+        print(f"{backend}: {len(docs)} documents, "
+              f"{len(mismatches)} mismatches ({elapsed:.2f}s with soup)")
+        for name, (only_fast, only_soup) in mismatches.items():
+            failed = True
+            print(f"  {name}")
+            for item in only_fast:
+                print(f"    only in {backend}: {item!r}")
+            for item in only_soup:
+                print(f"    only in soup:  {item!r}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+Synthetic investor-relations sites for the crawl benchmarks.
+
+    python benchmarks/irsite.py --profile medium --port 8765
+
+Every response is generated from its path and the seed, so a profile
+always serves the same site and the server keeps no state. A site has:
+
+- a news archive, ``/investors/news/<year>`` and pages
+  ``page-1 … page-N`` that each link only the next, so the articles
+  they list sit several clicks deep;
+- article pages with filler text that link one PDF directly, hide a
+  second in an entity-encoded JSON attribute (``&quot;…&quot;``, for
+  ``extract_urls_from_raw_text``) and list a third in a
+  ``<script type="application/json">`` payload;
+- ``/investors/reports/all``, one large page listing every report;
+- slow pages under ``/media/slow/`` and pages under
+  ``/investors/broken/`` that answer 500 or 404;
+- a product catalogue, ``/products/<range>/<item>``, linked first
+  from the home page and without a single PDF.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+
+from aiohttp import web
+
+PROFILES = {
+    "small": dict(
+        years=3, pages_per_year=2, articles_per_page=10, article_kb=8,
+        large_page_kb=256, slow_pages=4, slow_delay=0.2, broken_pages=4,
+        products=40,
+    ),
+    "medium": dict(
+        years=10, pages_per_year=5, articles_per_page=20, article_kb=20,
+        large_page_kb=1024, slow_pages=10, slow_delay=0.5, broken_pages=10,
+        products=400,
+    ),
+    "large": dict(
+        years=20, pages_per_year=10, articles_per_page=25, article_kb=40,
+        large_page_kb=4096, slow_pages=20, slow_delay=1.0, broken_pages=20,
+        products=2000,
+    ),
+}
+
+FIRST_YEAR = 2005
+QUARTERS   = ("q1", "q2", "q3", "q4")
+RANGES     = 10     # product ranges the catalogue is split into
+
+_WORDS = (
+    "revenue growth guidance quarter dividend shareholders board outlook "
+    "margin capital results segment operating cash flow earnings per share "
+    "annual general meeting sustainability governance strategy market "
+    "customers investment portfolio net income fiscal year"
+).split()
+_FILLER = " ".join(random.Random(0).choice(_WORDS) for _ in range(200_000))
+_PDF    = b"%PDF-1.4\n% synthetic\n" + b"0" * 2048 + b"\n%%EOF\n"
+
+
+def site_size(cfg: dict) -> dict:
+    """Pages, PDFs and click depth of the site ``cfg`` describes."""
+    articles = cfg["years"] * cfg["pages_per_year"] * cfg["articles_per_page"]
+    return {
+        "articles": articles,
+        "pdfs":     3 * articles + 5 * cfg["years"] + cfg["slow_pages"],
+        # / → news → year → page-1 … page-N → article
+        "depth":    cfg["pages_per_year"] + 3,
+    }
+
+
+def _filler(rng: random.Random, kb: int) -> str:
+    size  = kb * 1024
+    start = rng.randrange(len(_FILLER) - size) if size < len(_FILLER) else 0
+    text  = _FILLER[start:start + size]
+    return "".join(
+        f"<p>{text[i:i + 600]}</p>\n" for i in range(0, len(text), 600)
+    )
+
+
+def _page(title: str, body: str) -> web.Response:
+    return web.Response(
+        text=(
+            f"<!doctype html><html><head><title>{title}</title></head>"
+            f"<body><h1>{title}</h1>\n{body}</body></html>"
+        ),
+        content_type="text/html", charset="utf-8",
+    )
+
+
+def _links(urls) -> str:
+    return "".join(f'<li><a href="{u}">{u}</a></li>' for u in urls)
+
+
+def make_app(seed: int = 0, **cfg) -> web.Application:
+    years    = [FIRST_YEAR + i for i in range(cfg["years"])]
+    per_page = cfg["articles_per_page"]
+    n_pages  = cfg["pages_per_year"]
+
+    def article_slug(year, n):
+        return f"{year}-{n:05d}-results-update"
+
+    async def home(request):
+        return _page("Example Corp", "<ul>" + _links([
+            "/products", "/about", "/careers", "/investors",
+            "/investors/news", "/investors/reports/all", "/media",
+        ]) + "</ul>")
+
+    async def products(request):
+        return _page("Products", "<ul>" + _links(
+            f"/products/range-{r}" for r in range(RANGES)
+        ) + "</ul>")
+
+    async def product_range(request):
+        r = int(request.match_info["r"])
+        return _page(f"Range {r}", "<ul>" + _links(
+            f"/products/range-{r}/item-{i}"
+            for i in range(r, cfg["products"], RANGES)
+        ) + "</ul>")
+
+    async def product(request):
+        rng = random.Random(f"{seed}:{request.path}")
+        related = [
+            f"/products/range-{i % RANGES}/item-{i}"
+            for i in rng.sample(range(cfg["products"]),
+                                min(4, cfg["products"]))
+        ]
+        return _page("Product", _filler(rng, 4)
+                     + "<ul>" + _links(related) + "</ul>")
+
+    async def investors(request):
+        return _page("Investors", "<ul>" + _links(
+            ["/investors/news", "/investors/reports/all"]
+            + [f"/investors/broken/{i}" for i in range(cfg["broken_pages"])]
+        ) + "</ul>")
+
+    async def media(request):
+        return _page("Media", "<ul>" + _links(
+            ["/investors/news"]
+            + [f"/media/slow/{i}" for i in range(cfg["slow_pages"])]
+        ) + "</ul>")
+
+    async def plain(request):
+        rng = random.Random(f"{seed}:{request.path}")
+        return _page(request.path.strip("/").title(), _filler(rng, 4))
+
+    async def news(request):
+        return _page("News", "<ul>" + _links(
+            f"/investors/news/{y}" for y in years
+        ) + "</ul>")
+
+    async def news_year(request):
+        year = int(request.match_info["year"])
+        if year not in years:
+            raise web.HTTPNotFound()
+        return _page(f"News {year}", "<ul>" + _links(
+            [f"/investors/news/{year}/page-1"]
+        ) + "</ul>")
+
+    async def news_page(request):
+        year, page = (int(request.match_info[k]) for k in ("year", "page"))
+        if year not in years or not 1 <= page <= n_pages:
+            raise web.HTTPNotFound()
+        first = (page - 1) * per_page
+        urls  = [
+            f"/investors/news/{year}/{article_slug(year, n)}"
+            for n in range(first, first + per_page)
+        ]
+        if page < n_pages:
+            urls.append(f"/investors/news/{year}/page-{page + 1}")
+        return _page(f"News {year}, page {page}",
+                     "<ul>" + _links(urls) + "</ul>")
+
+    async def article(request):
+        year, slug = int(request.match_info["year"]), request.match_info["slug"]
+        rng   = random.Random(f"{seed}:{request.path}")
+        files = f"/files/news/{year}/{slug}"
+        props = (
+            "{&quot;attachment&quot;:&quot;"
+            f"http://{request.host}{files}-presentation.pdf"
+            "&quot;,&quot;lang&quot;:&quot;en&quot;}"
+        )
+        payload = (
+            '{"documents": [{"title": "Fact sheet", '
+            f'"url": "{files}-factsheet.pdf"}}], '
+            f'"archive": "/investors/news/{year}"}}'
+        )
+        related = [
+            f"/investors/news/{y}/"
+            f"{article_slug(y, rng.randrange(n_pages * per_page))}"
+            for y in rng.sample(years, min(3, len(years)))
+        ]
+        number = int(slug.split("-")[1])
+        extras = []
+        if number % 25 == 0 and cfg["slow_pages"]:
+            extras.append(f"/media/slow/{number % cfg['slow_pages']}")
+        if number % 25 == 1 and cfg["broken_pages"]:
+            extras.append(f"/investors/broken/{number % cfg['broken_pages']}")
+        return _page(slug, (
+            f'<p><a href="{files}.pdf">Download the release (PDF)</a></p>'
+            f'<div class="viewer" data-props="{props}"></div>'
+            f'<script type="application/json">{payload}</script>'
+            + _filler(rng, cfg["article_kb"])
+            + "<ul>" + _links(related + extras + ["/", "/investors/news"])
+            + "</ul>"
+        ))
+
+    async def reports(request):
+        rng  = random.Random(f"{seed}:{request.path}")
+        urls = []
+        for year in years:
+            urls.append(f"/files/reports/annual-report-{year}.pdf")
+            urls += [f"/files/reports/{year}-{q}-report.pdf" for q in QUARTERS]
+        body = "<ul>" + _links(urls) + "</ul>"
+        return _page("Reports", body + _filler(
+            rng, max(0, cfg["large_page_kb"] - len(body) // 1024)
+        ))
+
+    async def slow(request):
+        await asyncio.sleep(cfg["slow_delay"])
+        n = request.match_info["n"]
+        return _page(f"Press release {n}", (
+            f'<a href="/files/media/slow-{n}.pdf">Release (PDF)</a>'
+        ))
+
+    async def broken(request):
+        n = int(request.match_info["n"])
+        raise web.HTTPInternalServerError() if n % 2 else web.HTTPNotFound()
+
+    async def pdf(request):
+        return web.Response(body=_PDF, content_type="application/pdf")
+
+    app = web.Application()
+    app.router.add_get("/", home)
+    app.router.add_get("/investors", investors)
+    app.router.add_get("/media", media)
+    app.router.add_get("/products", products)
+    app.router.add_get(r"/products/range-{r:\d+}", product_range)
+    app.router.add_get(r"/products/range-{r:\d+}/item-{i:\d+}", product)
+    app.router.add_get("/about", plain)
+    app.router.add_get("/careers", plain)
+    app.router.add_get("/investors/news", news)
+    app.router.add_get(r"/investors/news/{year:\d+}", news_year)
+    app.router.add_get(r"/investors/news/{year:\d+}/page-{page:\d+}",
+                       news_page)
+    app.router.add_get(r"/investors/news/{year:\d+}/{slug}", article)
+    app.router.add_get("/investors/reports/all", reports)
+    app.router.add_get("/media/slow/{n}", slow)
+    app.router.add_get(r"/investors/broken/{n:\d+}", broken)
+    app.router.add_get("/files/{tail:.+}", pdf)
+    return app
+
+
+async def start_site(host="127.0.0.1", port=0, **cfg):
+    """Serve a site on ``host``; returns the runner and its base URL."""
+    runner = web.AppRunner(make_app(**cfg), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+def _serve(conn, cfg: dict):
+    async def main():
+        runner, base_url = await start_site(**cfg)
+        conn.send(base_url)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def serve_in_background(**cfg):
+    """
+    Serve a site from a separate process, so the server's CPU is not
+    counted against the crawler. Returns the process and base URL;
+    ``terminate()`` the process when done.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe()
+    proc = ctx.Process(target=_serve, args=(child, cfg), daemon=True)
+    proc.start()
+    return proc, parent.recv()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profile", choices=list(PROFILES),
+                        default="small")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    opts = parser.parse_args(argv)
+
+    cfg  = PROFILES[opts.profile]
+    size = site_size(cfg)
+
+    async def serve():
+        runner, base_url = await start_site(
+            port=opts.port, seed=opts.seed, **cfg
+        )
+        print(f"Serving {opts.profile} site at {base_url}: "
+              f"{size['articles']} articles, {size['pdfs']} PDFs, "
+              f"{size['depth']} clicks deep")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
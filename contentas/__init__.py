@@ -0,0 +1 @@
+"""Website & PDF link extractor: crawler core and headless CLI."""
@@ -0,0 +1,5 @@
+import sys
+
+from contentas.cli import main
+
+sys.exit(main())
@@ -0,0 +1,395 @@
+"""
+Headless batch crawler, for running many sites without Streamlit.
+
+    python -m contentas crawl --input domains.txt --out results/
+
+The input file has one site per line (a URL or a bare domain; blank
+lines and ``#`` comments are skipped). Each finished site is written to
+``<out>/<domain>.json`` and gets a line in ``<out>/summary.jsonl``.
+Sites that already have a result file are skipped unless ``--force``
+is given, so an interrupted batch can simply be started again. A site
+whose crawl failed outright (DNS, connection) only gets its summary
+line, so the next run tries it again.
+``--max-pages``, ``--max-mb``, ``--max-minutes`` and ``--max-pdfs``
+bound each site's crawl; a site that hits one is written with what was
+crawled and ``"stopped"`` set to the budget.
+
+With ``--checkpoint``, a site that was stopped early keeps its
+checkpoint and is not skipped: the next run resumes it, with a fresh
+budget, and writes the result again. ``--force`` discards checkpoints
+and crawls every site from the start.
+
+``download`` fetches the PDFs listed in crawl results, or in plain
+files of URLs, with ``contentas.downloads``:
+
+    python -m contentas download --input results/*.json --out pdfs/
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from contentas.crawler import (
+    LINK_EXTRACTORS,
+    MAX_PAGE_BYTES,
+    PARSE_MODES,
+    PDF_EXTENSION_RE,
+    CrawlCheckpoint,
+    HttpCache,
+    PdfVerdictCache,
+    crawl_website,
+    make_parse_executor,
+    make_session,
+    resume_crawl,
+    site_key,
+)
+from contentas.downloads import download_pdfs, manifest_summary
+
+
+def read_sites(path: str) -> list:
+    """Sites listed in ``path``, one per domain, in file order."""
+    sites: list = []
+    keys:  set  = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            site = line.split("#", 1)[0].strip()
+            if not site:
+                continue
+            key = site_key(site)
+            if key not in keys:
+                keys.add(key)
+                sites.append(site)
+    return sites
+
+
+def result_path(out_dir: str, site: str) -> str:
+    return os.path.join(out_dir, f"{site_key(site)}.json")
+
+
+def write_result(out_dir: str, site: str, res: dict, elapsed: float):
+    if "error" not in res:
+        # A result file marks the site done; failures are retried.
+        path = result_path(out_dir, site)
+        tmp  = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            # The index only serves the web app's views.
+            json.dump({k: v for k, v in res.items() if k != "index"}, f)
+        os.replace(tmp, path)
+    summary = {
+        "site":          site,
+        "domain":        site_key(site),
+        "seconds":       round(elapsed, 1),
+        "pages_crawled": res.get("pages_crawled", 0),
+        "pages":         len(res.get("all_pages", [])),
+        "pdfs":          len(res.get("all_pdfs", [])),
+        "stopped":       res.get("stopped"),
+        "error":         res.get("error"),
+    }
+    # One short write per line, so shards can share the file.
+    with open(os.path.join(out_dir, "summary.jsonl"), "a",
+              encoding="utf-8") as f:
+        f.write(json.dumps(summary) + "\n")
+    return summary
+
+
+async def crawl_site(site, opts, session, request_slots, http_cache,
+                     pdf_verdicts, stop_event, parse_executor) -> dict:
+    """
+    Crawl one site, resuming its checkpoint if it has one (unless
+    ``--force``, which starts over).
+    """
+    kwargs = {
+        "session":        session,
+        "link_backend":   opts.link_backend,
+        "parse_mode":     opts.parse_mode,
+        "parse_executor": parse_executor,
+        "max_page_bytes": opts.max_page_mb * 1024 * 1024,
+        "http_cache":     http_cache,
+        "request_slots":  request_slots,
+        "use_sitemaps":   opts.sitemaps,
+        "compact_urls":   opts.compact_urls,
+        "best_first":     opts.best_first,
+        "max_pages":      opts.max_pages,
+        "max_bytes":      opts.max_mb and opts.max_mb * 1024 * 1024,
+        "max_seconds":    opts.max_minutes and opts.max_minutes * 60,
+        "max_pdfs":       opts.max_pdfs,
+        "stop_event":     stop_event,
+        "verify_pdfs":    opts.verify_pdfs,
+        "dedupe_pdfs":    opts.dedupe_pdfs,
+        "pdf_verdicts":   pdf_verdicts,
+    }
+    checkpoint = CrawlCheckpoint.for_site(site) if opts.checkpoint else None
+    if checkpoint and opts.force:
+        checkpoint.clear()
+    if checkpoint and checkpoint.exists():
+        return await resume_crawl(
+            checkpoint, opts.per_site, lambda *_: None, **kwargs
+        )
+    return await crawl_website(
+        site, opts.pdf_pattern, opts.depth, opts.per_site,
+        lambda *_: None,
+        opts.sibling_flood, opts.sibling_threshold, opts.sibling_keep,
+        checkpoint=checkpoint, **kwargs,
+    )
+
+
+async def crawl_sites(sites: list, opts) -> int:
+    """
+    Crawl ``sites`` in one event loop and return how many failed.
+
+    Up to ``opts.sites_at_once`` sites run together. Their requests
+    all draw on one semaphore of ``opts.concurrency`` slots, which is
+    the global budget. Every site runs the same number of workers and
+    waiters are served in order, so a large site cannot starve the
+    others. All crawls share one connection pool, and one parse pool
+    (``--parse-mode``) with this process's share of the CPUs.
+
+    Ctrl-C stops the batch gracefully: running crawls end early and
+    write what they have, and no further sites are started. A second
+    Ctrl-C interrupts at once.
+    """
+    request_slots = asyncio.Semaphore(opts.concurrency)
+    http_cache    = HttpCache() if opts.cache else None
+    pdf_verdicts  = (
+        PdfVerdictCache() if opts.verify_pdfs or opts.dedupe_pdfs else None
+    )
+    parse_executor = make_parse_executor(
+        opts.parse_mode,
+        workers=max(1, (os.cpu_count() or 1) // max(1, opts.processes)),
+    )
+    todo: asyncio.Queue = asyncio.Queue()
+    for site in sites:
+        todo.put_nowait(site)
+    failures = 0
+
+    stop_event = threading.Event()
+    loop = asyncio.get_running_loop()
+
+    def on_interrupt():
+        print("Stopping; partial results are kept (Ctrl-C again to "
+              "abort).", file=sys.stderr)
+        stop_event.set()
+        loop.remove_signal_handler(signal.SIGINT)
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, on_interrupt)
+    except (NotImplementedError, RuntimeError):
+        pass    # e.g. Windows, or not the main thread
+
+    async def site_runner():
+        nonlocal failures
+        while not todo.empty() and not stop_event.is_set():
+            site    = todo.get_nowait()
+            started = time.monotonic()
+            res     = await crawl_site(
+                site, opts, session, request_slots, http_cache,
+                pdf_verdicts, stop_event, parse_executor,
+            )
+            summary = write_result(
+                opts.out, site, res, time.monotonic() - started
+            )
+            if summary["error"]:
+                failures += 1
+                print(f"✗ {summary['domain']}: {summary['error']}",
+                      file=sys.stderr)
+            else:
+                stopped = (
+                    f" (stopped: {summary['stopped']})"
+                    if summary["stopped"] else ""
+                )
+                print(
+                    f"✓ {summary['domain']}: {summary['pages']} pages, "
+                    f"{summary['pdfs']} PDFs in {summary['seconds']}s"
+                    f"{stopped}",
+                    file=sys.stderr,
+                )
+
+    session = make_session(
+        limit=opts.concurrency, limit_per_host=opts.per_site,
+    )
+    try:
+        await asyncio.gather(*(
+            site_runner() for _ in range(min(opts.sites_at_once, len(sites)))
+        ))
+    finally:
+        await session.close()
+        if http_cache:
+            http_cache.close()
+        if pdf_verdicts:
+            pdf_verdicts.close()
+        if parse_executor is not None:
+            parse_executor.shutdown(cancel_futures=True)
+    return failures
+
+
+def _crawl_shard(sites: list, opts) -> int:
+    return asyncio.run(crawl_sites(sites, opts))
+
+
+def run_crawl(opts) -> int:
+    sites = read_sites(opts.input)
+    os.makedirs(opts.out, exist_ok=True)
+    if not opts.force:
+        # A checkpoint left behind means the site stopped early.
+        sites = [
+            s for s in sites
+            if not os.path.exists(result_path(opts.out, s)) or (
+                opts.checkpoint and CrawlCheckpoint.saved_for_site(s)
+            )
+        ]
+    if not sites:
+        print("Nothing to crawl.", file=sys.stderr)
+        return 0
+
+    started = time.monotonic()
+    if opts.processes <= 1:
+        failures = asyncio.run(crawl_sites(sites, opts))
+    else:
+        # Deal the sites out round-robin and split both budgets so the
+        # totals stay what was asked for.
+        n      = min(opts.processes, len(sites))
+        shards = [sites[i::n] for i in range(n)]
+        shard_opts = argparse.Namespace(**vars(opts))
+        shard_opts.concurrency   = max(1, opts.concurrency // n)
+        shard_opts.sites_at_once = max(1, opts.sites_at_once // n)
+        with ProcessPoolExecutor(n) as pool:
+            failures = sum(pool.map(
+                _crawl_shard, shards, [shard_opts] * n
+            ))
+
+    print(
+        f"Crawled {len(sites)} site(s) in "
+        f"{time.monotonic() - started:.0f}s, {failures} failed.",
+        file=sys.stderr,
+    )
+    return 1 if failures else 0
+
+
+def read_pdf_urls(paths: list) -> list:
+    """PDF URLs from crawl result files (``.json``) or URL lists."""
+    urls: list = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                urls += json.load(f).get("all_pdfs", [])
+            else:
+                urls += [
+                    line.split("#", 1)[0].strip() for line in f
+                    if line.split("#", 1)[0].strip()
+                ]
+    return list(dict.fromkeys(urls))
+
+
+def run_download(opts) -> int:
+    urls = read_pdf_urls(opts.input)
+    if not urls:
+        print("No PDFs to download.", file=sys.stderr)
+        return 0
+
+    def progress(done, total):
+        if done % 50 == 0 or done == total:
+            print(f"{done}/{total} PDFs", file=sys.stderr)
+
+    started  = time.monotonic()
+    manifest = asyncio.run(download_pdfs(
+        urls, opts.out, opts.concurrency, opts.per_host,
+        opts.max_mb_per_sec * 1024 * 1024 if opts.max_mb_per_sec else None,
+        progress,
+    ))
+    summary = manifest_summary(manifest, urls)
+    print(
+        f"{summary.get('done', 0)} of {len(urls)} PDF(s) on disk "
+        f"({summary['bytes'] / (1024 * 1024):.1f} MB) in "
+        f"{time.monotonic() - started:.0f}s, "
+        f"{summary.get('failed', 0)} failed, "
+        f"{summary.get('not_pdf', 0)} not PDFs.",
+        file=sys.stderr,
+    )
+    return 1 if summary.get("failed") else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="contentas",
+        description="Website & PDF link extractor.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    crawl = commands.add_parser(
+        "crawl", help="Crawl every site listed in a file.",
+    )
+    crawl.add_argument("--input", required=True,
+                       help="File with one URL or domain per line.")
+    crawl.add_argument("--out", required=True,
+                       help="Directory for per-site results.")
+    crawl.add_argument("--depth", type=int, default=3)
+    crawl.add_argument("--pdf-pattern", default=PDF_EXTENSION_RE.pattern)
+    crawl.add_argument("--concurrency", type=int, default=200,
+                       help="Requests in flight across all sites.")
+    crawl.add_argument("--per-site", type=int, default=10,
+                       help="Workers per site.")
+    crawl.add_argument("--sites-at-once", type=int, default=50,
+                       help="Sites crawled at the same time.")
+    crawl.add_argument("--processes", type=int, default=1,
+                       help="Split the sites over this many processes.")
+    crawl.add_argument("--sibling-flood", action="store_true")
+    crawl.add_argument("--sibling-threshold", type=int, default=10)
+    crawl.add_argument("--sibling-keep", type=int, default=3)
+    crawl.add_argument("--link-backend", choices=list(LINK_EXTRACTORS),
+                       default="tokenizer")
+    crawl.add_argument("--parse-mode", choices=list(PARSE_MODES),
+                       default="inline")
+    crawl.add_argument("--max-page-mb", type=int,
+                       default=MAX_PAGE_BYTES // (1024 * 1024))
+    crawl.add_argument("--sitemaps", action="store_true",
+                       help="Seed each crawl from robots.txt sitemaps.")
+    crawl.add_argument("--verify-pdfs", action="store_true",
+                       help="Probe PDF and download links for %%PDF.")
+    crawl.add_argument("--dedupe-pdfs", action="store_true",
+                       help="List PDFs served under several URLs once.")
+    crawl.add_argument("--best-first", action="store_true",
+                       help="Fetch the links likeliest to lead to PDFs "
+                            "first.")
+    crawl.add_argument("--max-pages", type=int, default=None,
+                       help="Stop each site after this many pages.")
+    crawl.add_argument("--max-mb", type=int, default=None,
+                       help="Stop each site after downloading this much.")
+    crawl.add_argument("--max-minutes", type=float, default=None,
+                       help="Stop each site after this long.")
+    crawl.add_argument("--max-pdfs", type=int, default=None,
+                       help="Stop each site after finding this many PDFs.")
+    crawl.add_argument("--compact-urls", action="store_true",
+                       help="Keep URL sets as fingerprints (large sites).")
+    crawl.add_argument("--cache", action="store_true",
+                       help="Use the on-disk HTTP cache.")
+    crawl.add_argument("--checkpoint", action="store_true",
+                       help="Checkpoint each site and resume on restart.")
+    crawl.add_argument("--force", action="store_true",
+                       help="Recrawl sites that already have results.")
+    crawl.set_defaults(func=run_crawl)
+
+    download = commands.add_parser(
+        "download", help="Download the PDFs found by crawls.",
+    )
+    download.add_argument("--input", required=True, nargs="+",
+                          help="Crawl result .json files or URL lists.")
+    download.add_argument("--out", required=True,
+                          help="Directory for the PDFs and manifest.json.")
+    download.add_argument("--concurrency", type=int, default=20,
+                          help="Downloads in flight.")
+    download.add_argument("--per-host", type=int, default=4,
+                          help="Downloads in flight per host.")
+    download.add_argument("--max-mb-per-sec", type=float, default=None,
+                          help="Total bandwidth cap.")
+    download.set_defaults(func=run_download)
+    return parser
+
+
+def main(argv=None) -> int:
+    opts = build_parser().parse_args(argv)
+    return opts.func(opts)
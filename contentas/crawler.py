@@ -0,0 +1,3638 @@
+"""
+Crawler core: URL filters, link extraction, categorisation and the
+async ``crawl_website`` frontier. Nothing here imports Streamlit, so the
+same code backs the web app (``app.py``) and the headless CLI.
+"""
+import aiohttp
+import asyncio
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+from bs4.builder import HTMLTreeBuilder
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse, urlunparse
+import re
+from collections import defaultdict
+import codecs
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import multiprocessing
+import zlib
+import xml.etree.ElementTree as ET
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextvars import ContextVar
+from functools import lru_cache
+from email.utils import parsedate_to_datetime
+from html import unescape as html_unescape  # NEW: for decoding HTML entities
+
+from contentas.urls import (
+    COMPACT_URL_CACHE_SIZE, canonical_host, canonical_url, normalize_url,
+    set_url_cache_size, url_cache_entries, url_cache_size, url_parts,
+)
+
+# ═══════════════════════════════════════════════════════════════
+# CATEGORY DEFINITIONS
+# ═══════════════════════════════════════════════════════════════
+CATEGORIES = [
+    (
+        "⛔ Out of Scope", [
+            r"career", r"job", r"faq", r"question",
+            r"contact.*us", r"privacy", r"sec.*filing",
+            r"term.*of.*use", r"contact", r"cookie",
+            r"stock.*price", r"legal.*term", r"term.*condition",
+            r"stock.*quote", r"linkedin", r"facebook",
+            r"twitter", r"youtube", r"forum", r"chat", r"recipe",
+        ]
+    ),
+    (
+        "Presentation", [
+            r"investor.*day", r"presentation", r"deck", r"\Wir",
+            r"slide", r"earnings", r"poster", r"supplemental",
+            r"supplementary", r"non.*gaap", r"gaap", r"ifrs",
+            r"reconciliation", r"roadshow", r"road.*show",
+        ]
+    ),
+    (
+        "Reports", [
+            r"letter.*to.*shareholder", r"shareholder.*letter",
+            r"letter.*stockholder", r"agm",
+            r"annual.*general.*meeting", r"meeting",
+            r"extra.*ordinary.*meeting", r"egm",
+            r"annual.*report", r"integrated.*report",
+            r"yearly.*report", r"interim.*report",
+            r"quarterly.*report", r"half.*year.*report",
+            r"semi.*annual.*report", r"report",
+            r"management.*report", r"management.*commentary",
+            r"mda", r"management.*discussion", r"proxy",
+            r"proxy.*statement", r"information.*circular",
+            r"agm.*notice", r"egm.*notice", r"meeting.*notice",
+            r"operating.*metric", r"profit.*loss",
+            r"financial.*result", r"operating.*result",
+            r"fixed.*income", r"bond", r"debt", r"prospectus",
+            r"ipo", r"initial.*public.*offering",
+            r"fact.*sheet", r"fact.*book", r"result",
+            r"revenue", r"sales", r"profit", r"financial",
+            r"snapshot", r"funding", r"fund.*raise",
+            r"capital.*raise", r"prescription", r"trial",
+        ]
+    ),
+    (
+        "News", [
+            r"press.*release", r"news", r"media",
+            r"press", r"announcement", r"notices",
+        ]
+    ),
+    (
+        "Filings", [
+            r"board", r"director", r"reorgani", r"restructur",
+            r"agreement", r"material.*contract", r"cancellation",
+            r"filing.*change", r"cancel.*notice", r"delisting",
+            r"suspension", r"bankruptcy", r"trading.*suspension",
+            r"disposal", r"asset.*sale", r"legal.*action",
+            r"litigation", r"lawsuit", r"material.*change",
+            r"late.*filing", r"regulato.*correspondence",
+            r"regulato.*letter", r"exemption",
+            r"securities.*registration", r"listing.*application",
+            r"withdrawal", r"termination", r"debt.*indenture",
+            r"credit.*agreement", r"pre.*ipo",
+            r"private.*offering", r"privately.*held",
+            r"institutional.*ownership", r"institutional.*holding",
+            r"officer.*ownership", r"director.*ownership",
+            r"beneficial.*ownership", r"share.*holding.*pattern",
+            r"major.*shareholder", r"stock.*option",
+            r"employee.*stock", r"esop", r"stock.*split",
+            r"reverse.*split", r"tender.*offer",
+            r"exchange.*offer", r"rights.*offer", r"rights.*issue",
+            r"share.*repurchase", r"buyback",
+            r"securities.*purchase", r"corporate.*action",
+            r"merger", r"takeover", r"m&a", r"acquisition",
+            r"dividend", r"audit", r"fund", r"etf",
+            r"prepared.*remark", r"transcript", r"speech",
+            r"executive.*commentary", r"ceo.*commentary",
+            r"business.*update",
+        ]
+    ),
+    (
+        "ESG", [
+            r"esg", r"sustainabilit", r"csr",
+            r"corporate.*social.*responsibility",
+            r"ehs", r"environmental.*health.*safety",
+            r"carbon.*disclosure", r"carbon.*report",
+            r"cdp.*report", r"green.*report", r"tcfd",
+            r"climate", r"social", r"human.*rights",
+            r"modern.*slavery", r"diversity", r"dei.*report",
+            r"inclusion.*report", r"gri.*report",
+            r"global.*reporting.*initiative", r"sasb.*report",
+            r"sasb.*index", r"cdp", r"estma", r"policy",
+            r"policies", r"charter", r"guideline", r"ethics",
+            r"code.*of.*conduct", r"governance", r"sustainable",
+        ]
+    ),
+    (
+        "Sector Specific", [
+            r"white.*paper", r"case.*stud", r"industry",
+            r"insight", r"thought.*leadership", r"product",
+            r"brochure", r"one.*pager",
+            r"integrated.*resource.*plan", r"resource",
+            r"scientific", r"research.*publication",
+            r"research", r"blog", r"customer.*stor",
+            r"client.*stor", r"success.*stor", r"project",
+            r"r&d", r"r.*and.*d", r"rd.*update",
+            r"research.*development", r"activity",
+            r"infographic", r"catalog", r"safety.*sheet",
+            r"data.*sheet", r"launch", r"specification",
+            r"clinical.*trial", r"sds.*sheet", r"feature",
+            r"service", r"solution", r"model",
+        ]
+    ),
+    (
+        "Company Info", [
+            r"interview", r"about.*us", r"about",
+            r"who.*we.*are", r"our.*company", r"overview",
+            r"company.*history", r"history", r"mission",
+            r"purpose", r"corporate.*info", r"management",
+            r"profile", r"board.*of.*director", r"board.*member",
+            r"executive.*team", r"leadership", r"team",
+            r"supplier", r"vendor", r"partner", r"alliance",
+            r"customer.*list", r"who.*we.*work.*with",
+        ]
+    ),
+]
+
+PDF_EXTENSION_RE = re.compile(
+    r"\.pdf($|\?)|/pdf/|download.*pdf", re.IGNORECASE
+)
+
+# NEW: Regex to find raw URLs (esp. PDFs) in decoded HTML / JS / JSON blobs
+RAW_URL_RE = re.compile(
+    r"""https?://[^\s"'<>{}\\\[\]()|^`]+""",
+    re.IGNORECASE
+)
+# NEW: Also catch protocol-relative or root-relative PDF refs in raw text
+RELATIVE_PDF_RE = re.compile(
+    r"""(?:["'\s>(])(/[^\s"'<>{}\\]+\.pdf(?:\?[^\s"'<>{}\\]*)?)""",
+    re.IGNORECASE
+)
+
+# Links that point at JSON data rather than HTML pages
+JSON_ENDPOINT_RE = re.compile(r"\.json($|\?)", re.IGNORECASE)
+
+CATEGORY_COLOURS = {
+    "Presentation":     "#1f77b4",
+    "Reports":          "#2ca02c",
+    "News":             "#ff7f0e",
+    "Filings":          "#9467bd",
+    "ESG":              "#17becf",
+    "Sector Specific":  "#8c564b",
+    "Company Info":     "#e377c2",
+    "❓ Unclassified":  "#7f7f7f",
+    "⛔ Out of Scope":  "#d62728",
+}
+
+# Order categories are listed in; anything not named sorts before
+# the two catch-alls.
+CATEGORY_ORDER = {
+    "Presentation": 0, "Reports": 1, "News": 2,
+    "Filings": 3, "ESG": 4, "Sector Specific": 5,
+    "Company Info": 6, "❓ Unclassified": 8,
+    "⛔ Out of Scope": 9,
+}
+
+
+def category_sort_key(cat: str) -> int:
+    return CATEGORY_ORDER.get(cat, 7)
+
+
+# ═══════════════════════════════════════════════════════════════
+# CATEGORY ENGINE
+# ═══════════════════════════════════════════════════════════════
+
+_REGEX_META = set("\\.^$*+?{}[]|()")
+
+
+def _trie_regex(words) -> str:
+    """
+    An alternation of ``words`` nested by shared prefixes, e.g.
+    ``invest(?:or)?`` for ``invest`` and ``investor``. ``re`` tries
+    alternatives one by one, so a flat alternation of a few hundred
+    words costs that many attempts at every position; the trie costs
+    about one per character. Longer words are tried first.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [
+            re.escape(ch) + build(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        alt = branches[0] if len(branches) == 1 else (
+            "(?:" + "|".join(branches) + ")"
+        )
+        return f"(?:{alt})?" if "" in node else alt
+
+    return build(trie)
+
+
+class CategoryEngine:
+    """
+    ``CATEGORIES`` compiled into one combined matcher.
+
+    Almost every pattern is literal keywords joined by ``.*``. All of
+    those keywords go into a single trie-shaped regex, so one scan of
+    the lower-cased URL finds every keyword it contains. Only the rules
+    whose keywords all occur, and the few non-literal ones, then run
+    their own regex (which also checks the keywords' order), in
+    ``CATEGORIES`` order, so the first matching category still wins.
+    Results are memoised in a bounded LRU cache keyed by URL.
+    """
+
+    UNCLASSIFIED = "❓ Unclassified"
+
+    def __init__(self, categories, cache_size: int = 200_000):
+        self.rules: list = []
+        for label, patterns in categories:
+            for p in patterns:
+                chunks = p.split(".*")
+                literal = all(
+                    chunk and not _REGEX_META.intersection(chunk)
+                    for chunk in chunks
+                )
+                self.rules.append((
+                    label,
+                    frozenset(c.lower() for c in chunks) if literal else None,
+                    re.compile(p, re.IGNORECASE),
+                ))
+
+        keywords = {k for _, chunks, _ in self.rules if chunks for k in chunks}
+        # A lookahead reports a match at every position, overlapping
+        # ones included; the longest keyword wins at each, so the
+        # keywords that are prefixes of it are added back from here.
+        self._scan = re.compile(f"(?=({_trie_regex(keywords)}))")
+        self._prefixes = {
+            k: frozenset(p for p in keywords if k.startswith(p))
+            for k in keywords
+        }
+        self._rules_by_keyword: dict = defaultdict(list)
+        for i, (_, chunks, _) in enumerate(self.rules):
+            for k in chunks or ():
+                self._rules_by_keyword[k].append(i)
+        self._always = [
+            i for i, (_, chunks, _) in enumerate(self.rules) if chunks is None
+        ]
+        self.set_cache_size(cache_size)
+
+    def set_cache_size(self, size: int) -> None:
+        """Rebound (and empty) the memo of ``categorize``."""
+        self.categorize = lru_cache(maxsize=size)(self._categorize)
+
+    def _categorize(self, url: str) -> str:
+        rules = self.rules
+        # Case-insensitive regex and str.lower() only agree on ASCII.
+        if not url.isascii() or "\n" in url:
+            for label, _, pattern in rules:
+                if pattern.search(url):
+                    return label
+            return self.UNCLASSIFIED
+
+        present: set = set()
+        for keyword in self._scan.findall(url.lower()):
+            present |= self._prefixes[keyword]
+        candidates = set(self._always)
+        for keyword in present:
+            for i in self._rules_by_keyword[keyword]:
+                if rules[i][1] <= present:
+                    candidates.add(i)
+        for i in sorted(candidates):
+            label, _, pattern = rules[i]
+            if pattern.search(url):
+                return label
+        return self.UNCLASSIFIED
+
+    def categorize_many(self, urls) -> list:
+        categorize = self.categorize
+        return [categorize(u) for u in urls]
+
+
+# Built once per process; the module outlives Streamlit reruns, so its
+# LRU cache does too. It is sized like the URL caches.
+CATEGORY_ENGINE = CategoryEngine(CATEGORIES, cache_size=url_cache_size())
+
+
+# ═══════════════════════════════════════════════════════════════
+# EXTERNAL DOMAIN FILTERS
+# ═══════════════════════════════════════════════════════════════
+JUNK_EXTERNAL_DOMAINS = {
+    "doi.org", "dx.doi.org", "ncbi.nlm.nih.gov",
+    "pubmed.ncbi.nlm.nih.gov", "iopscience.iop.org",
+    "link.springer.com", "springer.com", "sciencedirect.com",
+    "pubs.acs.org", "pubs.rsc.org", "onlinelibrary.wiley.com",
+    "nature.com", "wikipedia.org", "en.wikipedia.org",
+    "scitation.aip.org", "opticsinfobase.org",
+    "ingentaconnect.com", "mdpi.com", "jove.com",
+    "hal.inria.fr", "scripts.iucr.org",
+    "nar.oxfordjournals.org", "nass.oxfordjournals.org",
+    "uvx.edpsciences.org", "biophysj.org",
+    "medcraveonline.com", "readcube.com", "rsc.org",
+    "intechopen.com", "photonics.com",
+}
+
+EXTERNAL_KEEP_KEYWORDS = [
+    "investor", "press", "media", "news",
+    "release", "announcement", "publication", "/ir/",
+]
+
+SEC_FILING_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in [
+        r"sec\.gov", r"edgar\.sec\.gov",
+        r"/sec[-_]filings?", r"sec[-_]filing",
+        r"secfiling", r"/edgar/",
+    ]
+]
+
+
+# ═══════════════════════════════════════════════════════════════
+# CORE HELPERS
+# ═══════════════════════════════════════════════════════════════
+
+def is_pdf_url(url: str) -> bool:
+    return bool(PDF_EXTENSION_RE.search(url))
+
+
+def categorize_url(url: str) -> str:
+    return CATEGORY_ENGINE.categorize(url)
+
+
+def categorize_many(urls) -> list:
+    return CATEGORY_ENGINE.categorize_many(urls)
+
+
+def categorize_all_urls(urls: list) -> dict:
+    result = defaultdict(list)
+    for url, label in zip(urls, categorize_many(urls)):
+        result[label].append(url)
+    return dict(result)
+
+
+def strip_query(url: str) -> str:
+    p = urlparse(url)
+    return urlunparse((
+        p.scheme, p.netloc.lower(),
+        p.path.rstrip("/"),
+        "", "", ""
+    ))
+
+
+def is_social_media_url(url: str) -> bool:
+    social = [
+        "instagram.com", "facebook.com", "linkedin.com",
+        "youtube.com", "twitter.com", "x.com", "tiktok.com",
+        "snapchat.com", "pinterest.com", "reddit.com",
+        "tumblr.com", "whatsapp.com", "telegram.org",
+    ]
+    domain = url_parts(url)[1].replace("www.", "")
+    return any(s in domain for s in social)
+
+
+def is_sec_filing_url(url: str) -> bool:
+    return any(pat.search(url) for pat in SEC_FILING_PATTERNS)
+
+
+def _clean_domain(netloc: str) -> str:
+    return netloc.lower().replace("www.", "").split(":")[0]
+
+
+def is_same_domain_or_allowed(url: str, base_domain: str) -> bool:
+    url_dom    = _clean_domain(url_parts(url)[1])
+    base_clean = _clean_domain(base_domain)
+    if url_dom == base_clean or url_dom.endswith("." + base_clean):
+        return True
+    for junk in JUNK_EXTERNAL_DOMAINS:
+        if url_dom == junk or url_dom.endswith("." + junk):
+            return False
+    if any(kw in url.lower() for kw in EXTERNAL_KEEP_KEYWORDS):
+        return True
+    return False
+
+
+def is_investor_or_media_page(url: str) -> bool:
+    kws = ["investor", "press", "media", "news",
+           "release", "announcement", "publication"]
+    return any(k in url.lower() for k in kws)
+
+
+def clean_extracted_url(u: str) -> str:
+    """Trim trailing punctuation that often gets caught by regex."""
+    return u.rstrip('.,);:!?\'"')
+
+
+# ═══════════════════════════════════════════════════════════════
+# DEDUPLICATION
+# ═══════════════════════════════════════════════════════════════
+
+# http(s) URLs (already cut at ? and #) that urlparse would split the
+# same way: ASCII host, no ";" params, no characters urlsplit removes.
+_PLAIN_URL_RE = re.compile(
+    r"(https?)://([!-.0-:<-Z\\^-~]+)(/[^;\t\r\n]*)?"
+)
+
+
+def deduplicate_urls(
+    urls: list,
+    enable_sibling_flood: bool = False,
+    sibling_threshold: int = 10,
+    sibling_keep: int = 3,
+) -> list:
+    """
+    Strip queries, drop pages whose parent page is also listed and,
+    optionally, keep only ``sibling_keep`` pages of any parent with more
+    than ``sibling_threshold`` children.
+
+    Each URL is parsed at most once, and not at all when a URL with
+    the same part before ``?``/``#`` came first. Path segments go into a
+    trie per scheme and host, whose nodes are flagged when a listed page
+    ends there; a page is a child when a node above it is flagged.
+    """
+    bases:   set  = set()
+    seen:    set  = set()
+    roots:   dict = {}
+    records: list = []
+    for url in sorted(urls):
+        # Scheme, host and path all come from before the first ? or #.
+        base = url.split("#", 1)[0].split("?", 1)[0]
+        if base in bases:
+            continue
+        bases.add(base)
+
+        m = _PLAIN_URL_RE.fullmatch(base)
+        if m:
+            scheme = m.group(1)
+            netloc = m.group(2).lower()
+            path   = (m.group(3) or "").rstrip("/")
+            clean  = f"{scheme}://{netloc}{path}"
+        else:
+            # Odd URL: key it on whatever parsing the stripped URL gives.
+            clean  = strip_query(url)
+            p      = urlparse(clean)
+            scheme = p.scheme
+            netloc = p.netloc
+            path   = p.path.rstrip("/")
+        if clean in seen:
+            continue
+        seen.add(clean)
+
+        parts = path.strip("/").split("/")
+        root  = roots.setdefault((scheme, netloc), {})
+        node  = root
+        for part in parts:
+            child = node.get(part)
+            if child is None:
+                child = node[part] = {}
+            node = child
+        if path == "/" + "/".join(parts):
+            node[None] = True   # a listed page ends here
+        records.append((clean, netloc, parts, root))
+
+    survivors: list = []
+    for clean, netloc, parts, root in records:
+        node = root
+        for part in parts[:-1]:
+            node = node[part]
+            if None in node:
+                break
+        else:
+            survivors.append((clean, netloc, parts))
+
+    if not enable_sibling_flood:
+        result = [clean for clean, _, _ in survivors]
+        result.sort()
+        return result
+
+    # Keyed like the parent path "/a/b"; "//x" and "/x" share "/".
+    buckets: dict = defaultdict(list)
+    for clean, netloc, parts in survivors:
+        buckets[(netloc, tuple(parts[:-1]) or ("",))].append(clean)
+
+    result: list = []
+    for bucket_urls in buckets.values():
+        if len(bucket_urls) > sibling_threshold:
+            result.extend(bucket_urls[:sibling_keep])
+        else:
+            result.extend(bucket_urls)
+
+    result.sort()
+    return result
+
+
+# ═══════════════════════════════════════════════════════════════
+# SITEMAP HELPERS
+# ═══════════════════════════════════════════════════════════════
+
+def build_tree_for_lookup(urls: list) -> dict:
+    """
+    Nested ``{label: {"__children__", "__url__", "__pages__"}}`` tree of
+    host and path segments, where ``__pages__`` counts the pages at or
+    below a node. Each URL is parsed once.
+    """
+    tree: dict = {}
+    for url in urls:
+        p     = urlparse(url)
+        parts = [p.netloc] + [
+            s for s in p.path.strip("/").split("/") if s
+        ]
+        children = tree
+        trail:  list = []
+        for part in parts:
+            node = children.get(part)
+            if node is None:
+                node = children[part] = {
+                    "__children__": {}, "__url__": "", "__pages__": 0,
+                }
+            trail.append(node)
+            children = node["__children__"]
+        if not node["__url__"]:
+            for ancestor in trail:
+                ancestor["__pages__"] += 1
+        node["__url__"] = url
+
+    return tree
+
+
+def build_sitemap_text(urls: list, tree=None) -> str:
+    lines = ["SITEMAP", "=" * 60, ""]
+    if tree is None:
+        tree = build_tree_for_lookup(urls)
+
+    def _walk(node_dict, label, depth):
+        url    = node_dict.get("__url__", "")
+        cat    = categorize_url(url) if url else ""
+        indent = "  " * depth
+        icon   = "🌐" if depth == 0 else "📄"
+        lines.append(f"{indent}{icon} {label}")
+        if url:
+            lines.append(f"{indent}   → {url}  [{cat}]")
+        children = node_dict.get("__children__", {})
+        for child_label in sorted(children.keys()):
+            _walk(children[child_label], child_label, depth + 1)
+
+    for root_label in sorted(tree.keys()):
+        _walk(tree[root_label], root_label, 0)
+
+    return "\n".join(lines)
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESULT INDEX
+# ═══════════════════════════════════════════════════════════════
+
+def category_report(categorized: dict, noun: str) -> str:
+    """``{label: urls}`` as text, one banner per category."""
+    lines: list = []
+    for label in sorted(categorized, key=category_sort_key):
+        urls = categorized[label]
+        lines += [
+            f"\n{'='*60}",
+            f"{label}  ({len(urls)} {noun})",
+            f"{'='*60}",
+        ]
+        lines += urls
+    return "\n".join(lines)
+
+
+def pages_with_pdfs_report(pages_pdfs_by_category: dict,
+                           pdf_category: dict) -> str:
+    lines: list = []
+    for cat_label in sorted(pages_pdfs_by_category, key=category_sort_key):
+        pages_dict = pages_pdfs_by_category[cat_label]
+        total_pdfs = sum(len(v) for v in pages_dict.values())
+        lines += [
+            f"\n{'='*60}",
+            f"{cat_label} ({len(pages_dict)} pages, {total_pdfs} PDFs)",
+            f"{'='*60}",
+        ]
+        for page_idx, (page_url, pdfs) in enumerate(
+            sorted(pages_dict.items()), 1
+        ):
+            lines.append(f"  PAGE {page_idx} ({len(pdfs)} PDFs): {page_url}")
+            for pdf_idx, pdf in enumerate(pdfs, 1):
+                lines.append(f"    {pdf_idx}. [{pdf_category[pdf]}] {pdf}")
+    return "\n".join(lines)
+
+
+def build_result_index(res: dict) -> dict:
+    """
+    Lookups and export text derived from a crawl result, built once so
+    a results view can rerun without recategorising or re-walking URLs.
+
+    ``page_category`` and ``pdf_category`` map each URL to its label,
+    ``sitemap_tree`` is the host → path trie of ``all_pages`` and
+    ``exports`` holds the download files. Page → PDFs lookups are the
+    result's own ``pages_with_pdfs``.
+    """
+    pages = res["all_pages"]
+    pdfs  = set(res["all_pdfs"])
+    for page_pdfs in res["pages_with_pdfs"].values():
+        pdfs.update(page_pdfs)
+    pdfs = sorted(pdfs)
+    page_category = dict(zip(pages, categorize_many(pages)))
+    pdf_category  = dict(zip(pdfs, categorize_many(pdfs)))
+    tree = build_tree_for_lookup(pages)
+    return {
+        "page_category":   page_category,
+        "pdf_category":    pdf_category,
+        "page_categories": sorted(set(page_category.values())),
+        "sitemap_tree":    tree,
+        "exports": {
+            "all_pages":         "\n".join(pages),
+            "categorized_pages": category_report(
+                res["categorized_pages"], "pages"
+            ),
+            "categorized_pdfs":  category_report(
+                res["categorized_pdfs"], "PDFs"
+            ),
+            "pages_with_pdfs":   pages_with_pdfs_report(
+                res["pages_pdfs_by_category"], pdf_category
+            ),
+            "sitemap":           build_sitemap_text(pages, tree),
+        },
+    }
+
+
+# ═══════════════════════════════════════════════════════════════
+# LINK EXTRACTION BACKENDS
+# ═══════════════════════════════════════════════════════════════
+# Each backend takes decoded HTML and returns (hrefs, json_scripts,
+# anchor_texts): the href of every <a href> in document order, the body
+# of every non-empty <script type="application/json">, and each link's
+# text in step with hrefs. A link's text is its ``title``, then the
+# strings and image ``alt``s inside it in document order (at most
+# ANCHOR_TEXT_PARTS of them), whitespace collapsed and cut to
+# ANCHOR_TEXT_CHARS. "Inside" follows the tree BeautifulSoup's
+# html.parser builds: an end tag closes every element opened after its
+# start tag, and the strings of <script>, <style> and the like are not
+# text, as in ``get_text``.
+
+ANCHOR_TEXT_CHARS = 120
+ANCHOR_TEXT_PARTS = 20
+
+# bs4's own tables, so both backends nest and hide the same elements.
+_VOID_TAGS   = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS)
+_HIDDEN_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+_KEEP_SPACE_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS)
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+
+def _anchor_text(text: str) -> str:
+    return " ".join(text.split())[:ANCHOR_TEXT_CHARS]
+
+
+def _soup_anchor_text(a) -> str:
+    parts = [a.get("title", "")]
+    for node in a.descendants:
+        if len(parts) >= ANCHOR_TEXT_PARTS:
+            break
+        if isinstance(node, Tag):
+            if node.name == "img" and node.get("alt"):
+                parts.append(node["alt"])
+        elif type(node) in (NavigableString, CData):
+            parts.append(node)
+    return _anchor_text(" ".join(parts))
+
+
+def soup_link_extractor(decoded_html: str):
+    """Reference backend: full BeautifulSoup tree."""
+    soup = BeautifulSoup(decoded_html, "html.parser")
+    anchors = soup.find_all("a", href=True)
+    hrefs = [a["href"] for a in anchors]
+    json_scripts = [
+        s.string for s in soup.find_all("script", type="application/json")
+        if s.string
+    ]
+    texts = [_soup_anchor_text(a) for a in anchors]
+    return hrefs, json_scripts, texts
+
+
+class _LinkTokenizer(HTMLParser):
+    """
+    Event-stream parser that keeps only hrefs, their text and JSON
+    script bodies. It tracks which elements are open and where strings
+    break, as bs4 would, but builds no tree.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs:        list = []
+        self.texts:        list = []
+        self.json_scripts: list = []
+        self._script = None
+        self._open:    list = []    # names of the open elements
+        self._anchors: list = []    # (depth, index, text parts) per open <a href>
+        self._hidden = 0            # open elements whose strings are not text
+        self._keep_space = 0        # open <pre>/<textarea> elements
+        self._data:    list = []    # the string being read, in pieces
+        self._closed_voids: list = []   # bs4's already_closed_empty_element
+
+    def _add_text(self, text: str):
+        for _, _, parts in self._anchors:
+            if len(parts) < ANCHOR_TEXT_PARTS:
+                parts.append(text)
+
+    def _end_string(self):
+        if self._data:
+            if self._anchors and not self._hidden:
+                self._add_text("".join(self._data))
+            self._data = []
+
+    def _close_to(self, depth: int):
+        """Close every element at ``depth`` and above."""
+        for name in self._open[depth:]:
+            if name in _HIDDEN_TAGS:
+                self._hidden -= 1
+            elif name in _KEEP_SPACE_TAGS:
+                self._keep_space -= 1
+        del self._open[depth:]
+        anchors = self._anchors
+        while anchors and anchors[-1][0] >= depth:
+            _, i, parts = anchors.pop()
+            self.texts[i] = _anchor_text(" ".join(parts))
+
+    def _start(self, tag, attrs, push: bool):
+        if self._data:
+            self._end_string()
+        if push:
+            self._open.append(tag)
+            if tag in _HIDDEN_TAGS:
+                self._hidden += 1
+            elif tag in _KEEP_SPACE_TAGS:
+                self._keep_space += 1
+        if tag == "a":
+            # Last duplicate wins and a bare `href` is "", as in bs4.
+            attr_dict = {k: ("" if v is None else v) for k, v in attrs}
+            if "href" in attr_dict:
+                self.hrefs.append(attr_dict["href"])
+                self.texts.append("")
+                self._anchors.append((
+                    len(self._open) - 1, len(self.texts) - 1,
+                    [attr_dict.get("title", "")],
+                ))
+        elif tag == "img" and self._anchors:
+            alt = dict(attrs).get("alt")
+            if alt:
+                self._add_text(alt)
+        elif tag == "script":
+            attr_dict = {k: ("" if v is None else v) for k, v in attrs}
+            if attr_dict.get("type") == "application/json":
+                self._script = []
+
+    def handle_starttag(self, tag, attrs):
+        # A void element is closed straight away, and a stray end tag
+        # for it later on is swallowed.
+        void = tag in _VOID_TAGS
+        self._start(tag, attrs, push=not void)
+        if void:
+            self._closed_voids.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, push=True)
+        self._end(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_voids:
+            self._closed_voids.remove(tag)
+        else:
+            self._end(tag)
+
+    def _end(self, tag):
+        if self._data:
+            self._end_string()
+        if tag == "script" and self._script is not None:
+            body = "".join(self._script)
+            if body and not self._keep_space and not body.strip(_ASCII_SPACES):
+                # bs4 keeps a blank string as one space or newline
+                body = "\n" if "\n" in body else " "
+            if body:
+                self.json_scripts.append(body)
+            self._script = None
+        open_ = self._open
+        for depth in range(len(open_) - 1, -1, -1):
+            if open_[depth] == tag:
+                self._close_to(depth)
+                break
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script.append(data)
+        if self._anchors:
+            # Text outside links is never needed: opening one ends it.
+            self._data.append(data)
+
+    def unknown_decl(self, data):
+        self._end_string()
+        # <![CDATA[...]]> is text to bs4, even where strings are hidden.
+        if data.upper().startswith("CDATA[") and self._anchors:
+            self._add_text(data[6:])
+
+    def handle_comment(self, data):
+        self._end_string()
+
+    def handle_decl(self, decl):
+        self._end_string()
+
+    def handle_pi(self, data):
+        self._end_string()
+
+
+def tokenizer_link_extractor(decoded_html: str):
+    """Fast backend: html.parser token stream, no tree is built."""
+    parser = _LinkTokenizer()
+    parser.feed(decoded_html)
+    parser.close()
+    if parser._script is not None:
+        # Unterminated script at EOF: bs4 still keeps its text.
+        parser.handle_endtag("script")
+    parser._end_string()
+    parser._close_to(0)
+    return parser.hrefs, parser.json_scripts, parser.texts
+
+
+LINK_EXTRACTORS = {
+    "tokenizer": tokenizer_link_extractor,
+    "soup":      soup_link_extractor,
+}
+
+
+def extract_page_links(decoded_html: str, backend: str = "tokenizer"):
+    """Run the chosen backend, falling back to BeautifulSoup on failure."""
+    extractor = LINK_EXTRACTORS.get(backend, soup_link_extractor)
+    if extractor is not soup_link_extractor:
+        try:
+            return extractor(decoded_html)
+        except Exception:
+            pass
+    return soup_link_extractor(decoded_html)
+
+
+def compare_link_backends(docs: dict, backend: str = "tokenizer") -> dict:
+    """
+    Run ``backend`` and BeautifulSoup over ``{name: decoded_html}`` and
+    return ``{name: (only_in_backend, only_in_soup)}`` for every document
+    whose sets of (href, anchor text) pairs or JSON scripts differ. An
+    empty dict means the two backends agree on the whole corpus.
+    """
+    mismatches: dict = {}
+    for name, html in docs.items():
+        fast_hrefs, fast_json, fast_texts = LINK_EXTRACTORS[backend](html)
+        ref_hrefs,  ref_json,  ref_texts  = soup_link_extractor(html)
+        fast = set(zip(["a"] * len(fast_hrefs), fast_hrefs, fast_texts)) | {
+            ("json", j) for j in fast_json
+        }
+        ref = set(zip(["a"] * len(ref_hrefs), ref_hrefs, ref_texts)) | {
+            ("json", j) for j in ref_json
+        }
+        if fast != ref:
+            mismatches[name] = (sorted(fast - ref), sorted(ref - fast))
+    return mismatches
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESPONSE READING
+# ═══════════════════════════════════════════════════════════════
+
+MAX_PAGE_BYTES   = 10 * 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def response_encoding(resp) -> str:
+    """Declared charset of a response, defaulting to UTF-8 like aiohttp."""
+    if resp.charset:
+        try:
+            return codecs.lookup(resp.charset).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def is_attachment(resp) -> bool:
+    disposition = resp.headers.get("Content-Disposition", "").lower()
+    return disposition.startswith("attachment")
+
+
+async def read_capped(resp, max_bytes: int = MAX_PAGE_BYTES):
+    """
+    Read a response body in chunks, stopping once ``max_bytes`` is hit.
+
+    Returns ``(body, truncated)``. A truncated body is cut back to its
+    last ``>`` so the parser never sees half a tag or half a UTF-8
+    character; the unread rest of the response is never buffered.
+    """
+    declared = resp.content_length
+    encoding = resp.headers.get("Content-Encoding", "identity").lower()
+    if declared is not None and declared <= max_bytes and (
+        encoding == "identity"
+    ):
+        # Small enough to take in one go. A compressed body's
+        # Content-Length is its size on the wire, not once decoded,
+        # so those always go through the counted loop below.
+        return await resp.read(), False
+
+    chunks: list = []
+    size = 0
+    async for chunk in resp.content.iter_chunked(READ_CHUNK_BYTES):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_bytes:
+            body = b"".join(chunks)[:max_bytes]
+            cut  = body.rfind(b">")
+            return (body[:cut + 1] if cut >= 0 else body), True
+    return b"".join(chunks), False
+
+
+async def read_prefix(resp, n: int) -> bytes:
+    """The first ``n`` bytes of a body, exactly, without reading on."""
+    chunks: list = []
+    size = 0
+    async for chunk in resp.content.iter_chunked(READ_CHUNK_BYTES):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= n:
+            break
+    return b"".join(chunks)[:n]
+
+
+# ═══════════════════════════════════════════════════════════════
+# JSON EXTRACTION
+# ═══════════════════════════════════════════════════════════════
+
+def extract_script_json_links(json_scripts, base_url, pdf_regex):
+    """Links inside the <script type="application/json"> bodies of a page."""
+    json_links: set = set()
+    json_pdfs:  set = set()
+    for body in json_scripts:
+        try:
+            data = json.loads(body)
+            _extract_from_json(
+                data, base_url, json_links, json_pdfs, pdf_regex
+            )
+        except Exception:
+            pass
+    return json_links, json_pdfs
+
+
+# A page's JSON endpoints are fetched a few at a time, and only the
+# first few of them, so a page listing dozens cannot hold its worker.
+JSON_ENDPOINTS_PER_PAGE = 10
+JSON_FETCHES_AT_ONCE    = 4
+
+
+async def fetch_json_links(
+    session, url, pdf_regex, max_bytes=MAX_PAGE_BYTES,
+) -> dict:
+    """
+    Fetch a JSON endpoint discovered on a page and collect its links.
+
+    Returns ``{"status", "links", "pdfs"}``, the shape ``probe_many``
+    expects, so endpoints go through the crawl's per-host limiters.
+    """
+    result = {"status": None, "links": set(), "pdfs": set()}
+    try:
+        async with session.get(
+            url, timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            result["status"] = response.status
+            if response.status != 200:
+                return result
+            ct = response.headers.get("Content-Type", "").lower()
+            if "json" in ct:
+                started = time.perf_counter()
+                body, truncated = await read_capped(response, max_bytes)
+                metrics = _active_metrics.get()
+                if metrics is not None:
+                    metrics.record_endpoint(
+                        url, time.perf_counter() - started, len(body)
+                    )
+                if truncated:
+                    # Half a JSON document cannot be parsed.
+                    return result
+                data = json.loads(body.decode(response_encoding(response)))
+                _extract_from_json(
+                    data, url, result["links"], result["pdfs"], pdf_regex
+                )
+    except Exception:
+        pass
+    return result
+
+
+def _extract_from_json(data, base_url, links, pdfs, pdf_regex):
+    if isinstance(data, dict):
+        for v in data.values():
+            if isinstance(v, str) and (
+                v.startswith("http") or v.startswith("/")
+            ):
+                abs_url = normalize_url(urljoin(base_url, v))
+                if abs_url.startswith("http"):
+                    links.add(abs_url)
+                    if pdf_regex.search(abs_url):
+                        pdfs.add(abs_url)
+            elif isinstance(v, (dict, list)):
+                _extract_from_json(v, base_url, links, pdfs, pdf_regex)
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, str) and (
+                item.startswith("http") or item.startswith("/")
+            ):
+                abs_url = normalize_url(urljoin(base_url, item))
+                if abs_url.startswith("http"):
+                    links.add(abs_url)
+                    if pdf_regex.search(abs_url):
+                        pdfs.add(abs_url)
+            elif isinstance(item, (dict, list)):
+                _extract_from_json(
+                    item, base_url, links, pdfs, pdf_regex
+                )
+
+
+# ═══════════════════════════════════════════════════════════════
+# SITEMAPS
+# ═══════════════════════════════════════════════════════════════
+
+MAX_SITEMAPS      = 200
+MAX_SITEMAP_URLS  = 200_000
+# The sitemap protocol caps a file at 50 MB uncompressed; anything
+# larger (e.g. a gzip bomb) is cut off there.
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+GZIP_MAGIC        = b"\x1f\x8b"
+
+
+def robots_sitemaps(robots_txt: str) -> list:
+    """The ``Sitemap:`` URLs declared in a robots.txt body."""
+    found: list = []
+    for line in robots_txt.splitlines():
+        key, _, value = line.partition(":")
+        if key.strip().lower() == "sitemap" and value.strip():
+            found.append(value.strip())
+    return found
+
+
+async def iter_sitemap_entries(session, url, max_bytes=MAX_SITEMAP_BYTES):
+    """
+    Stream one sitemap and yield ``(kind, loc)`` per entry, where kind
+    is ``"url"`` for pages and ``"sitemap"`` for sitemap-index children.
+
+    The body is parsed as it arrives, gzip or not, and every finished
+    entry is dropped from the tree, so memory stays flat however many
+    entries the file lists.
+    """
+    async with session.get(
+        url, timeout=aiohttp.ClientTimeout(total=60)
+    ) as resp:
+        if resp.status != 200:
+            return
+        parser = ET.XMLPullParser(events=("start", "end"))
+        inflate = None
+        root    = None
+        loc     = ""
+        size    = 0
+        first   = True
+        async for chunk in resp.content.iter_chunked(READ_CHUNK_BYTES):
+            if first:
+                first = False
+                if chunk.startswith(GZIP_MAGIC):
+                    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if inflate is not None:
+                chunk = inflate.decompress(chunk, max_bytes - size)
+            size += len(chunk)
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if root is None:
+                    root = elem
+                if event != "end":
+                    continue
+                tag = elem.tag.rsplit("}", 1)[-1]
+                if tag == "loc":
+                    loc = (elem.text or "").strip()
+                elif tag in ("url", "sitemap"):
+                    if loc:
+                        yield tag, loc
+                    loc = ""
+                    root.clear()
+            if size >= max_bytes:
+                break
+
+
+async def iter_sitemap_urls(
+    session, start_url,
+    max_urls=MAX_SITEMAP_URLS, max_sitemaps=MAX_SITEMAPS,
+):
+    """
+    Yield the page URLs listed in a site's sitemaps.
+
+    Sitemaps come from the ``Sitemap:`` lines of robots.txt, falling
+    back to ``/sitemap.xml``. Sitemap indexes are followed depth-first
+    up to ``max_sitemaps`` files. A sitemap that fails is skipped.
+    """
+    p      = urlparse(start_url)
+    origin = f"{p.scheme}://{p.netloc}"
+    todo: list = []
+    try:
+        async with session.get(
+            origin + "/robots.txt", timeout=aiohttp.ClientTimeout(total=10)
+        ) as resp:
+            if resp.status == 200:
+                body, _ = await read_capped(resp, 1024 * 1024)
+                todo = [
+                    urljoin(origin, sm) for sm in robots_sitemaps(
+                        body.decode(response_encoding(resp), "replace")
+                    )
+                ]
+    except Exception:
+        pass
+    if not todo:
+        todo = [origin + "/sitemap.xml"]
+    todo.reverse()
+
+    fetched: set = set()
+    yielded = 0
+    while todo and len(fetched) < max_sitemaps:
+        sitemap = todo.pop()
+        if sitemap in fetched:
+            continue
+        fetched.add(sitemap)
+        try:
+            async for kind, loc in iter_sitemap_entries(session, sitemap):
+                if kind == "sitemap":
+                    todo.append(urljoin(sitemap, loc))
+                    continue
+                yield urljoin(sitemap, loc)
+                yielded += 1
+                if yielded >= max_urls:
+                    return
+        except Exception:
+            continue
+
+
+# ═══════════════════════════════════════════════════════════════
+# NEW: RAW-TEXT EXTRACTION FOR ENCODED URLS
+# ═══════════════════════════════════════════════════════════════
+
+def extract_urls_from_raw_text(decoded_text: str, base_url: str) -> set:
+    """
+    Extract any URLs (especially PDFs) from already-decoded HTML/JS/JSON
+    text. This catches URLs that were originally encoded with HTML
+    entities like &quot; (e.g. ${split_text:""} patterns) or wrapped in
+    JS template strings that BeautifulSoup wouldn't follow as <a href>.
+    """
+    found: set = set()
+
+    # Absolute URLs
+    for m in RAW_URL_RE.finditer(decoded_text):
+        candidate = clean_extracted_url(m.group(0))
+        if candidate.startswith("http"):
+            found.add(candidate)
+
+    # Root-relative PDF references (e.g. "/uploads/file.pdf")
+    for m in RELATIVE_PDF_RE.finditer(decoded_text):
+        rel = m.group(1)
+        abs_url = urljoin(base_url, rel)
+        found.add(clean_extracted_url(abs_url))
+
+    return found
+
+
+# ═══════════════════════════════════════════════════════════════
+# PAGE EXTRACTION
+# ═══════════════════════════════════════════════════════════════
+
+EXCLUDED_HREF_PREFIXES = (
+    "javascript:", "mailto:", "tel:",
+    "sms:", "fax:", "data:", "#",
+)
+SKIP_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".css",
+    ".js", ".xml", ".ico", ".svg", ".zip", ".exe",
+)
+
+
+def extract_page(
+    body, encoding, url, base_domain, pdf_pattern,
+    link_backend="tokenizer", compare_backends=False, want_json=False,
+) -> dict:
+    """
+    Turn the raw bytes of one HTML page into link lists.
+
+    Pure and picklable (no network, no crawl state), so it can run on
+    the event loop or in a process/thread pool. ``crawl_website`` merges
+    the result into its shared sets. ``timings`` holds the seconds
+    spent in each stage.
+    """
+    clock = time.perf_counter
+    t0 = clock()
+    # ── NEW: Decode HTML entities (&quot; etc.) ──
+    decoded_html = html_unescape(body.decode(encoding))
+    t1 = clock()
+    hrefs, json_scripts, texts = extract_page_links(
+        decoded_html, link_backend
+    )
+    t2 = clock()
+
+    pdfs:           list = []
+    pages:          list = []
+    follow:         list = []
+    anchors:        dict = {}
+    text_pdfs:      list = []
+    json_endpoints: set  = set()
+
+    # ── 1. Standard <a href> extraction ──
+    for href, text in zip(hrefs, texts):
+        if href.strip().lower().startswith(EXCLUDED_HREF_PREFIXES):
+            continue
+
+        abs_url = normalize_url(urljoin(url, href))
+        if is_social_media_url(abs_url):
+            continue
+        if is_sec_filing_url(abs_url):
+            continue
+
+        scheme, host, path = url_parts(abs_url)
+        if scheme not in ("http", "https"):
+            continue
+        if path.lower().endswith(SKIP_EXTENSIONS):
+            continue
+        if not is_same_domain_or_allowed(abs_url, base_domain):
+            continue
+
+        if is_pdf_url(abs_url):
+            pdfs.append(abs_url)
+        elif JSON_ENDPOINT_RE.search(abs_url):
+            pages.append(abs_url)
+            json_endpoints.add(abs_url)
+        else:
+            pages.append(abs_url)
+            if host == base_domain:
+                follow.append(abs_url)
+                if text and abs_url not in anchors:
+                    anchors[abs_url] = text
+
+    # ── 2. NEW: Raw-text extraction for encoded URLs ──
+    # Catches URLs hidden in &quot;...&quot; encoded
+    # blocks, JS template strings, JSON blobs, etc.
+    t3 = clock()
+    raw_urls = extract_urls_from_raw_text(decoded_html, url)
+    t4 = clock()
+    for cand in raw_urls:
+        try:
+            abs_url = normalize_url(cand)
+        except Exception:
+            continue
+        if not abs_url.startswith("http"):
+            continue
+        scheme, _, path = url_parts(abs_url)
+        if scheme not in ("http", "https"):
+            continue
+        if is_social_media_url(abs_url):
+            continue
+        if is_sec_filing_url(abs_url):
+            continue
+        if not is_same_domain_or_allowed(abs_url, base_domain):
+            continue
+
+        if is_pdf_url(abs_url):
+            text_pdfs.append(abs_url)
+        else:
+            # only add non-PDF if it's plausibly an HTML page
+            if not path.lower().endswith(SKIP_EXTENSIONS):
+                pages.append(abs_url)
+            if JSON_ENDPOINT_RE.search(abs_url):
+                json_endpoints.add(abs_url)
+
+    # ── 3. Embedded JSON (<script type="application/json">) ──
+    t5 = clock()
+    json_links, json_pdfs = set(), set()
+    if want_json:
+        json_links, json_pdfs = extract_script_json_links(
+            json_scripts, url, re.compile(pdf_pattern, re.IGNORECASE)
+        )
+    t6 = clock()
+
+    return {
+        "pdfs":             pdfs,
+        "pages":            pages,
+        "follow":           follow,
+        "anchors":          anchors,
+        "text_pdfs":        text_pdfs,
+        "json_endpoints":   sorted(json_endpoints),
+        "json_links":       sorted(json_links),
+        "json_pdfs":        sorted(json_pdfs),
+        "backend_mismatch": bool(
+            compare_backends
+            and compare_link_backends({url: decoded_html}, link_backend)
+        ),
+        "timings": {
+            "unescape":  t1 - t0,
+            "parse":     t2 - t1,
+            "filter":    (t3 - t2) + (t5 - t4),
+            "raw_regex": t4 - t3,
+            "json":      t6 - t5,
+        },
+    }
+
+
+def _free_threaded() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+PARSE_MODES = ("inline", "process", "thread", "auto")
+
+
+def make_parse_executor(mode: str = "inline", workers=None):
+    """
+    Executor for ``extract_page``, or None to parse on the event loop.
+
+    ``auto`` picks threads on free-threaded builds and processes
+    otherwise. Worker processes come from a fork server where there is
+    one (spawned otherwise), never from forking the caller: that is the
+    web app or a crawl loop, and forking a process with other threads
+    running can deadlock the child. Workers import ``extract_page``
+    from this module.
+
+    Make one executor and pass it to every crawl (``crawl_website``'s
+    ``parse_executor``) rather than a pool per crawl.
+    """
+    if mode == "inline":
+        return None
+    workers = workers or os.cpu_count() or 1
+    if mode == "auto":
+        mode = "thread" if _free_threaded() else "process"
+    if mode == "process":
+        method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        return ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context(method)
+        )
+    return ThreadPoolExecutor(workers)
+
+
+# ═══════════════════════════════════════════════════════════════
+# HTTP CACHE
+# ═══════════════════════════════════════════════════════════════
+
+CACHE_DIR = os.environ.get(
+    "CONTENTAS_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "contentas"),
+)
+
+
+# How long a write waits for another process's write to finish.
+CACHE_BUSY_TIMEOUT = 30.0
+
+
+def open_cache_db(path: str) -> sqlite3.Connection:
+    """
+    A connection for one of the on-disk caches. Every statement commits
+    by itself, so no write lock is held between calls and other crawls
+    (``--processes``, a second app session) can write at the same time.
+    The connection may be used from any thread; callers serialize use
+    through their own lock and run it off the event loop.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(
+        path, timeout=CACHE_BUSY_TIMEOUT, isolation_level=None,
+        check_same_thread=False,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class HttpCache:
+    """
+    On-disk page cache for repeat crawls, keyed by normalized URL.
+
+    Each entry keeps the ETag / Last-Modified validators, the compressed
+    body and the ``extract_page`` result it produced. A crawl sends the
+    validators as ``If-None-Match`` / ``If-Modified-Since``, and on a
+    304 reuses the stored extraction without parsing anything.
+
+    ``get`` and ``put`` block on disk; a crawl calls them through
+    ``asyncio.to_thread``.
+    """
+
+    def __init__(self, path=None):
+        self.path  = path or os.path.join(CACHE_DIR, "http_cache.sqlite")
+        self.conn  = open_cache_db(self.path)
+        self._lock = threading.Lock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,"
+            " encoding TEXT, body BLOB, extract_key TEXT,"
+            " extraction TEXT, fetched_at REAL)"
+        )
+
+    def get(self, url: str):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, encoding, body, extract_key,"
+                " extraction FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, encoding, body, extract_key, extraction = row
+        return {
+            "etag":          etag,
+            "last_modified": last_modified,
+            "encoding":      encoding,
+            "body":          body,
+            "extract_key":   extract_key,
+            "extraction":    extraction,
+        }
+
+    def body(self, entry) -> bytes:
+        return zlib.decompress(entry["body"])
+
+    def extraction(self, entry, extract_key: str):
+        """The stored extract_page() result, if made with the same key."""
+        if entry["extraction"] and entry["extract_key"] == extract_key:
+            extraction = json.loads(entry["extraction"])
+            extraction["backend_mismatch"] = False
+            return extraction
+        return None
+
+    @staticmethod
+    def conditional_headers(entry) -> dict:
+        headers: dict = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(
+        self, url, etag, last_modified, encoding, body,
+        extract_key, extraction,
+    ):
+        if not etag and not last_modified:
+            # Nothing to revalidate with next time.
+            return
+        row = (
+            url, etag, last_modified, encoding, zlib.compress(body),
+            extract_key, json.dumps(extraction), time.time(),
+        )
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# ═══════════════════════════════════════════════════════════════
+# RESULT HISTORY
+# ═══════════════════════════════════════════════════════════════
+
+def site_key(start_url: str) -> str:
+    """Domain a crawl result is filed under, e.g. ``example.com``."""
+    if not start_url.startswith(("http://", "https://")):
+        start_url = "https://" + start_url
+    return _clean_domain(urlparse(start_url).netloc)
+
+
+def result_snapshot(res: dict) -> dict:
+    """The parts of a crawl result worth comparing between runs."""
+    return {
+        "all_pages":       list(res.get("all_pages", [])),
+        "all_pdfs":        list(res.get("all_pdfs", [])),
+        "pages_with_pdfs": dict(res.get("pages_with_pdfs", {})),
+    }
+
+
+def diff_results(previous: dict, current: dict, refetched=None) -> dict:
+    """
+    PDFs and pages that appeared or disappeared between two snapshots.
+
+    With ``refetched`` (a quick re-check of selected pages) only PDFs
+    that vanished from those pages count as removed, and no page is
+    reported as removed, since the rest of the site was not looked at.
+    """
+    prev_pdfs  = set(previous["all_pdfs"])
+    cur_pdfs   = set(current["all_pdfs"])
+    prev_pages = set(previous["all_pages"])
+    cur_pages  = set(current["all_pages"])
+    if refetched is None:
+        removed_pdfs  = prev_pdfs - cur_pdfs
+        removed_pages = prev_pages - cur_pages
+    else:
+        removed_pdfs = set()
+        for page in refetched:
+            removed_pdfs.update(
+                set(previous["pages_with_pdfs"].get(page, []))
+                - set(current["pages_with_pdfs"].get(page, []))
+            )
+        removed_pdfs -= cur_pdfs
+        removed_pages = set()
+    return {
+        "new_pdfs":      sorted(cur_pdfs - prev_pdfs),
+        "removed_pdfs":  sorted(removed_pdfs),
+        "new_pages":     sorted(cur_pages - prev_pages),
+        "removed_pages": sorted(removed_pages),
+    }
+
+
+def merge_snapshot(previous: dict, current: dict, delta: dict,
+                   refetched=()) -> dict:
+    """Fold a quick re-check of the ``refetched`` pages into the baseline."""
+    pages_with_pdfs = dict(previous["pages_with_pdfs"])
+    for page in refetched:
+        # A re-checked page that lost all its PDFs keeps none.
+        pages_with_pdfs.pop(page, None)
+    pages_with_pdfs.update(current["pages_with_pdfs"])
+    removed = set(delta["removed_pdfs"])
+    return {
+        "all_pages": sorted(
+            set(previous["all_pages"]) | set(current["all_pages"])
+        ),
+        "all_pdfs": sorted(
+            (set(previous["all_pdfs"]) - removed) | set(current["all_pdfs"])
+        ),
+        "pages_with_pdfs": pages_with_pdfs,
+    }
+
+
+class ResultStore:
+    """
+    Per-domain history of crawl results, so runs can be compared.
+
+    Kept in SQLite next to the HTTP cache. Only the latest few
+    snapshots per domain are retained.
+    """
+
+    KEEP_PER_DOMAIN = 10
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, "results.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS crawls ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, domain TEXT,"
+            " finished_at REAL, quick INTEGER, snapshot TEXT)"
+        )
+
+    def latest(self, domain: str):
+        row = self.conn.execute(
+            "SELECT snapshot, finished_at FROM crawls WHERE domain = ?"
+            " ORDER BY id DESC LIMIT 1", (domain,)
+        ).fetchone()
+        if row is None:
+            return None
+        snapshot = json.loads(row[0])
+        snapshot["finished_at"] = row[1]
+        return snapshot
+
+    def save(self, domain: str, snapshot: dict, quick: bool = False):
+        self.conn.execute(
+            "INSERT INTO crawls (domain, finished_at, quick, snapshot)"
+            " VALUES (?, ?, ?, ?)",
+            (domain, time.time(), int(quick), json.dumps(snapshot)),
+        )
+        self.conn.execute(
+            "DELETE FROM crawls WHERE domain = ? AND id NOT IN ("
+            " SELECT id FROM crawls WHERE domain = ?"
+            " ORDER BY id DESC LIMIT ?)",
+            (domain, domain, self.KEEP_PER_DOMAIN),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def record_crawl(store, domain, previous, res, quick=False):
+    """
+    Store ``res`` for ``domain`` and return its delta against
+    ``previous`` (None on the first crawl of a domain).
+    """
+    current = result_snapshot(res)
+    if previous is None:
+        store.save(domain, current)
+        return None
+    refetched = None
+    if quick:
+        # Only pages that were really fetched again; a seed that timed
+        # out or failed says nothing about its PDFs.
+        refetched = set(previous["pages_with_pdfs"]).intersection(
+            res.get("fetched_pages", ())
+        )
+    delta = diff_results(previous, current, refetched)
+    store.save(
+        domain,
+        merge_snapshot(previous, current, delta, refetched)
+        if quick else current,
+        quick,
+    )
+    delta["previous_crawl_at"] = previous.get("finished_at")
+    return delta
+
+
+# ═══════════════════════════════════════════════════════════════
+# COMPACT URL STORE
+# ═══════════════════════════════════════════════════════════════
+
+# Table slot markers; real fingerprints are always >= 2.
+_EMPTY     = 0
+_TOMBSTONE = 1
+
+
+def url_fingerprint(url: str) -> int:
+    """64-bit BLAKE2b fingerprint of a URL."""
+    fp = int.from_bytes(
+        hashlib.blake2b(
+            url.encode("utf-8", "surrogatepass"), digest_size=8
+        ).digest(),
+        "little",
+    )
+    return fp if fp > _TOMBSTONE else fp + 2
+
+
+class UrlFingerprintSet:
+    """
+    Membership-only URL set, for ``visited`` and ``seen``.
+
+    Each URL is kept as a 64-bit fingerprint in one open-addressing
+    table (``array('Q')``, linear probing), about 12 bytes per URL
+    where a ``set`` of ``str`` needs well over 100. The URLs themselves
+    are not kept. Two different URLs collide with probability about
+    n²/2⁶⁵, roughly 3e-6 at ten million URLs.
+    """
+
+    MAX_LOAD = 0.7
+
+    def __init__(self, urls=(), capacity: int = 1024):
+        self._table = array("Q", bytes(8 * capacity))
+        self._mask  = capacity - 1
+        self._used  = 0   # live entries plus tombstones
+        self._len   = 0
+        self.update(urls)
+
+    @classmethod
+    def from_fingerprints(cls, fingerprints) -> "UrlFingerprintSet":
+        store = cls()
+        for fp in fingerprints:
+            store._add_fingerprint(fp)
+        return store
+
+    def _find(self, fp: int):
+        """``(slot, found)``: where ``fp`` is, or where it would go."""
+        table, mask = self._table, self._mask
+        i    = fp & mask
+        free = -1
+        while True:
+            v = table[i]
+            if v == fp:
+                return i, True
+            if v == _EMPTY:
+                return (i if free < 0 else free), False
+            if v == _TOMBSTONE and free < 0:
+                free = i
+            i = (i + 1) & mask
+
+    def _add_fingerprint(self, fp: int) -> bool:
+        i, found = self._find(fp)
+        if found:
+            return False
+        if self._table[i] == _EMPTY:
+            self._used += 1
+        self._table[i] = fp
+        self._len += 1
+        if self._used > self.MAX_LOAD * len(self._table):
+            self._rehash()
+        return True
+
+    def _rehash(self):
+        old  = self._table
+        size = len(old)
+        if self._len > size * self.MAX_LOAD / 2:
+            size *= 2   # otherwise mostly tombstones: same size, swept
+        self._table = array("Q", bytes(8 * size))
+        self._mask  = size - 1
+        self._used  = self._len = 0
+        for v in old:
+            if v > _TOMBSTONE:
+                self._add_fingerprint(v)
+
+    def add(self, url: str) -> bool:
+        """Add ``url``; True if it was not already present."""
+        return self._add_fingerprint(url_fingerprint(url))
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def discard(self, url: str):
+        i, found = self._find(url_fingerprint(url))
+        if found:
+            self._table[i] = _TOMBSTONE
+            self._len -= 1
+
+    def __contains__(self, url) -> bool:
+        return self._find(url_fingerprint(url))[1]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def fingerprints(self) -> list:
+        return [v for v in self._table if v > _TOMBSTONE]
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._table)
+
+
+class CompactUrlSet(UrlFingerprintSet):
+    """
+    Append-only ``UrlFingerprintSet`` that also keeps its URLs, for
+    ``raw_pages`` and ``raw_pdfs``. The URLs are stored UTF-8 encoded,
+    back to back in one ``bytearray``, with their end offsets in an
+    ``array('Q')``, and iterate in insertion order.
+    """
+
+    def __init__(self, urls=(), capacity: int = 1024):
+        self._blob = bytearray()
+        self._ends = array("Q")
+        super().__init__(urls, capacity)
+
+    def add(self, url: str) -> bool:
+        if not super().add(url):
+            return False
+        self._blob += url.encode("utf-8", "surrogatepass")
+        self._ends.append(len(self._blob))
+        return True
+
+    def discard(self, url: str):
+        raise TypeError("CompactUrlSet is append-only")
+
+    def __iter__(self):
+        blob  = self._blob
+        start = 0
+        for end in self._ends:
+            yield blob[start:end].decode("utf-8", "surrogatepass")
+            start = end
+
+    def memory_bytes(self) -> int:
+        return (
+            super().memory_bytes()
+            + sys.getsizeof(self._blob) + sys.getsizeof(self._ends)
+        )
+
+
+def url_store_bytes(store) -> int:
+    """Bytes held by a URL store, counting every ``str`` in a plain set."""
+    if isinstance(store, UrlFingerprintSet):
+        return store.memory_bytes()
+    return sys.getsizeof(store) + sum(sys.getsizeof(u) for u in store)
+
+
+# The memo caches of normalize_url, canonical_url and CATEGORY_ENGINE
+# cannot be walked, so their footprint is estimated per entry: the LRU
+# link, its dict slot and a result string of a typical URL's length.
+MEMO_ENTRY_BYTES = 300
+
+
+def memo_cache_bytes() -> int:
+    """Estimated bytes held by the per-process URL memo caches."""
+    entries = (url_cache_entries()
+               + CATEGORY_ENGINE.categorize.cache_info().currsize)
+    return entries * MEMO_ENTRY_BYTES
+
+
+def limit_memo_caches(size: int) -> None:
+    """
+    Lower the URL memo caches to ``size`` entries each, if larger.
+
+    The caches are shared by every crawl in the process, so they are
+    only ever lowered here: a compact crawl keeps them small for the
+    crawls after it too.
+    """
+    if url_cache_size() > size:
+        set_url_cache_size(size)
+    if CATEGORY_ENGINE.categorize.cache_parameters()["maxsize"] > size:
+        CATEGORY_ENGINE.set_cache_size(size)
+
+
+# ═══════════════════════════════════════════════════════════════
+# CHECKPOINTS
+# ═══════════════════════════════════════════════════════════════
+
+def empty_crawl_state(params: dict) -> dict:
+    """In-memory crawl state, as kept by a checkpoint."""
+    compact = params.get("compact_urls", False)
+    return {
+        "params":             params,
+        "visited":            UrlFingerprintSet() if compact else set(),
+        "seen":               UrlFingerprintSet() if compact else set(),
+        "pending":            {},   # normalized URL -> [url, depth]
+        "raw_pages":          CompactUrlSet() if compact else set(),
+        "raw_pdfs":           CompactUrlSet() if compact else set(),
+        "pages_with_pdfs":    {},
+        "json_link_count":    0,
+        "encoded_pdf_count":  0,
+        "fetched_json":       set(),
+        # pages that were fetched and parsed, not just attempted
+        "fetched_pages":      CompactUrlSet() if compact else set(),
+        "truncated_pages":    [],
+        "backend_mismatches": [],
+        "sitemaps_seeded":    False,
+        # canonical URL -> depth, for sitemap pages queued at the last
+        # level; a link to one from higher up moves it up
+        "sitemap_leaves":     {},
+        "sitemap_url_count":  0,
+        "sitemap_pdf_count":  0,
+    }
+
+
+class CrawlCheckpoint:
+    """
+    On-disk crawl state, so an interrupted crawl can be resumed.
+
+    Every finished page is appended to a JSON-lines log. Every
+    ``SNAPSHOT_EVERY`` pages the whole state is written to a snapshot
+    and a new log is started. Loading replays the current log on top of
+    the snapshot; pages that were still in flight are fetched again.
+    The directory is only created once something is written to it.
+    """
+
+    SNAPSHOT_EVERY = 500
+
+    def __init__(self, directory):
+        self.dir        = directory
+        self.generation = 0
+        self._log       = None
+        self._since     = 0
+
+    @staticmethod
+    def site_dir(start_url: str) -> str:
+        return os.path.join(CACHE_DIR, "checkpoints", site_key(start_url))
+
+    @classmethod
+    def for_site(cls, start_url: str) -> "CrawlCheckpoint":
+        return cls(cls.site_dir(start_url))
+
+    @classmethod
+    def saved_for_site(cls, start_url: str) -> bool:
+        """Whether ``start_url`` has a checkpoint, touching nothing on disk."""
+        return os.path.exists(
+            os.path.join(cls.site_dir(start_url), "snapshot.json")
+        )
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.dir, "snapshot.json")
+
+    def log_path(self, generation: int) -> str:
+        return os.path.join(self.dir, f"log-{generation}.jsonl")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path)
+
+    def params(self) -> dict:
+        """The settings the checkpointed crawl was started with."""
+        with open(os.path.join(self.dir, "params.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self):
+        """The saved state with its log replayed, or None."""
+        if not self.exists():
+            return None
+        with open(self.snapshot_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        self.generation = saved.pop("generation")
+        state = empty_crawl_state(saved["params"])
+        for key in ("visited", "seen", "raw_pages", "raw_pdfs",
+                    "fetched_json"):
+            if isinstance(saved[key], dict):
+                state[key] = UrlFingerprintSet.from_fingerprints(
+                    saved[key]["fingerprints"]
+                )
+            else:
+                state[key].update(saved[key])
+        for key in ("pending", "json_link_count", "encoded_pdf_count",
+                    "truncated_pages", "backend_mismatches",
+                    "sitemaps_seeded", "sitemap_url_count",
+                    "sitemap_pdf_count"):
+            state[key] = saved[key]
+        state["sitemap_leaves"] = saved.get("sitemap_leaves", {})
+        state["fetched_pages"].update(saved.get("fetched_pages", ()))
+        state["pages_with_pdfs"] = {
+            page: set(pdfs) for page, pdfs in saved["pages_with_pdfs"].items()
+        }
+        try:
+            with open(self.log_path(self.generation), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break   # torn final line from a crash
+                    self._apply(state, record)
+        except FileNotFoundError:
+            pass
+        return state
+
+    @staticmethod
+    def _apply(state: dict, record: dict):
+        url = record["url"]
+        if record["t"] == "page":
+            state["fetched_pages"].add(url)
+            state["raw_pages"].update(record["pages"])
+            state["raw_pdfs"].update(record["pdfs"])
+            if record["pdfs"]:
+                state["pages_with_pdfs"].setdefault(url, set()).update(
+                    record["pdfs"]
+                )
+            state["json_link_count"]   += record["json_links"]
+            state["encoded_pdf_count"] += record["encoded"]
+            state["fetched_json"].update(record["json_fetched"])
+            if record["truncated"]:
+                state["truncated_pages"].append(record["truncated"])
+            if record["mismatch"]:
+                state["backend_mismatches"].append(record["mismatch"])
+        else:  # "done"
+            state["visited"].add(url)
+            state["pending"].pop(url, None)
+            leaves = state["sitemap_leaves"]
+            for nu, nd in record["queued"]:
+                nn = canonical_url(nu)
+                if nd < leaves.get(nn, nd):
+                    leaves[nn] = nd
+                    state["visited"].discard(nn)
+                state["seen"].add(nn)
+                state["pending"][nn] = [nu, nd]
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (set, CompactUrlSet)):
+            return sorted(value)
+        if isinstance(value, UrlFingerprintSet):
+            # Only fingerprints are known; they are restored as such.
+            return {"fingerprints": value.fingerprints()}
+        return value
+
+    def snapshot(self, state: dict):
+        """Write the full state atomically and start a new log."""
+        # Pages still pending are in flight: fetch them again on resume.
+        visited   = state["visited"]
+        in_flight = [u for u in state["pending"] if u in visited]
+        for u in in_flight:
+            visited.discard(u)
+        saved = {
+            key: self._dump(value)
+            for key, value in state.items()
+            if key != "pages_with_pdfs"
+        }
+        for u in in_flight:
+            visited.add(u)
+        saved["pages_with_pdfs"] = {
+            page: sorted(pdfs)
+            for page, pdfs in state["pages_with_pdfs"].items()
+        }
+        saved["generation"] = self.generation + 1
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, "params.json"), "w",
+                  encoding="utf-8") as f:
+            json.dump(state["params"], f)
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        os.replace(tmp, self.snapshot_path)
+        if self._log:
+            self._log.close()
+            self._log = None
+        old_log = self.log_path(self.generation)
+        self.generation += 1
+        if os.path.exists(old_log):
+            os.remove(old_log)
+        self._since = 0
+
+    def log(self, record: dict):
+        if self._log is None:
+            os.makedirs(self.dir, exist_ok=True)
+            self._log = open(
+                self.log_path(self.generation), "a", encoding="utf-8"
+            )
+        self._log.write(json.dumps(record) + "\n")
+        self._log.flush()
+
+    def log_page(self, url, pages, pdfs, json_links, encoded,
+                 json_fetched, truncated, mismatch):
+        self.log({
+            "t": "page", "url": url, "pages": pages, "pdfs": pdfs,
+            "json_links": json_links, "encoded": encoded,
+            "json_fetched": json_fetched, "truncated": truncated,
+            "mismatch": mismatch,
+        })
+
+    def log_done(self, url, queued, state_fn):
+        """Record a finished URL; snapshot via ``state_fn`` when due."""
+        self.log({"t": "done", "url": url, "queued": queued})
+        self._since += 1
+        if self._since >= self.SNAPSHOT_EVERY:
+            self.snapshot(state_fn())
+
+    def close(self):
+        if self._log:
+            self._log.close()
+            self._log = None
+
+    def clear(self):
+        """Forget the checkpoint once its crawl has finished."""
+        self.close()
+        if not os.path.isdir(self.dir):
+            return
+        for name in os.listdir(self.dir):
+            os.remove(os.path.join(self.dir, name))
+
+
+# ═══════════════════════════════════════════════════════════════
+# PDF VERIFICATION
+# ═══════════════════════════════════════════════════════════════
+
+PDF_MAGIC        = b"%PDF-"
+PROBE_BYTES      = 1024
+MISSING_STATUSES = {404, 410}
+HTML_TYPES       = ("text/html", "application/xhtml+xml")
+
+# Pages that may be documents behind a download handler, e.g.
+# ``/GetFile.aspx?id=123``; only these are probed besides the PDFs.
+DOCUMENT_CANDIDATE_RE = re.compile(
+    r"download|attachment|getfile|get-file|viewfile|showfile|\.ashx"
+    r"|[?&](?:id|file|fileid|doc|docid|document|documentid)=",
+    re.IGNORECASE,
+)
+
+# Verdicts that take a URL out of the PDF list.
+REJECTED_VERDICTS = {"not_pdf", "missing"}
+
+
+def _content_size(resp):
+    """Full size of the resource, also when only a range was sent."""
+    total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+    if total.isdigit():
+        return int(total)
+    if resp.status == 200:
+        return resp.content_length
+    return None
+
+
+async def probe_pdf(session, url: str) -> dict:
+    """
+    Check whether ``url`` serves a PDF without downloading it.
+
+    A HEAD request settles missing files and HTML landing pages. Any
+    other answer, or a server that mishandles HEAD, is followed by a
+    GET of the first ``PROBE_BYTES`` bytes, and only a body carrying
+    the ``%PDF-`` magic counts as a PDF. The verdict is one of
+    ``pdf``, ``not_pdf``, ``missing`` or ``unknown``.
+    """
+    timeout = aiohttp.ClientTimeout(total=10)
+    check   = {"verdict": "unknown", "content_type": "", "size": None,
+               "status": None}
+    try:
+        async with session.head(
+            url, timeout=timeout, allow_redirects=True,
+        ) as resp:
+            check["status"] = resp.status
+            ctype = resp.headers.get("Content-Type", "")
+            ctype = ctype.split(";")[0].strip().lower()
+            if resp.status in MISSING_STATUSES:
+                check["verdict"] = "missing"
+                return check
+            if resp.status == 200 and ctype in HTML_TYPES:
+                check.update(verdict="not_pdf", content_type=ctype)
+                return check
+    except (asyncio.TimeoutError, aiohttp.ClientError):
+        pass
+
+    try:
+        async with session.get(
+            url, timeout=timeout,
+            headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"},
+        ) as resp:
+            check["status"] = resp.status
+            if resp.status in MISSING_STATUSES:
+                check["verdict"] = "missing"
+                return check
+            if resp.status not in (200, 206):
+                return check
+            ctype = resp.headers.get("Content-Type", "")
+            check["content_type"] = ctype.split(";")[0].strip().lower()
+            check["size"] = _content_size(resp)
+            # A server that ignores Range sends everything; stop early.
+            head = await read_prefix(resp, PROBE_BYTES)
+            check["verdict"] = "pdf" if PDF_MAGIC in head else "not_pdf"
+    except (asyncio.TimeoutError, aiohttp.ClientError):
+        check["status"] = None
+    return check
+
+
+class PdfVerdictCache:
+    """
+    On-disk ``probe_pdf`` verdicts and duplicate-detection fingerprints
+    keyed by normalized URL, so repeat crawls only probe what they have
+    not checked in ``MAX_AGE`` seconds. ``unknown`` verdicts are never
+    stored. Like ``HttpCache``, it blocks on disk and is called through
+    ``asyncio.to_thread``.
+    """
+
+    MAX_AGE = 7 * 24 * 3600
+
+    def __init__(self, path=None):
+        self.path  = path or os.path.join(CACHE_DIR, "pdf_verdicts.sqlite")
+        self.conn  = open_cache_db(self.path)
+        self._lock = threading.Lock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " url TEXT PRIMARY KEY, verdict TEXT, content_type TEXT,"
+            " size INTEGER, status INTEGER, checked_at REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " url TEXT PRIMARY KEY, size INTEGER, prefix TEXT,"
+            " sha256 TEXT, checked_at REAL)"
+        )
+        self.hits = 0
+
+    def get(self, url: str):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT verdict, content_type, size, status FROM verdicts"
+                " WHERE url = ? AND checked_at > ?",
+                (url, time.time() - self.MAX_AGE),
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+        verdict, content_type, size, status = row
+        return {
+            "verdict":      verdict,
+            "content_type": content_type,
+            "size":         size,
+            "status":       status,
+        }
+
+    def put(self, url: str, check: dict):
+        if check["verdict"] == "unknown":
+            return
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url, check["verdict"], check["content_type"],
+                    check["size"], check["status"], time.time(),
+                ),
+            )
+
+    def get_many(self, urls) -> dict:
+        """``{url: verdict}`` for those of ``urls`` with a fresh one."""
+        found: dict = {}
+        for url in urls:
+            cached = self.get(url)
+            if cached:
+                found[url] = cached
+        return found
+
+    def put_many(self, checks: dict):
+        for url, check in checks.items():
+            self.put(url, check)
+
+    def get_fingerprint(self, url: str):
+        """Size, prefix hash and (if known) SHA-256 of ``url``."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT size, prefix, sha256 FROM fingerprints"
+                " WHERE url = ? AND checked_at > ?",
+                (url, time.time() - self.MAX_AGE),
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+        size, prefix, sha256 = row
+        return {"size": size, "prefix": prefix, "sha256": sha256}
+
+    def put_fingerprint(self, url: str, fp: dict):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)",
+                (url, fp["size"], fp["prefix"], fp["sha256"], time.time()),
+            )
+
+    def get_fingerprints(self, urls) -> dict:
+        found: dict = {}
+        for url in urls:
+            cached = self.get_fingerprint(url)
+            if cached:
+                found[url] = cached
+        return found
+
+    def put_fingerprints(self, prints: dict):
+        for url, fp in prints.items():
+            self.put_fingerprint(url, fp)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+async def probe_many(
+    session, urls, probe, host_throttle, max_concurrent=10,
+    request_slots=None,
+) -> dict:
+    """
+    ``{url: await probe(session, url)}`` for every URL in ``urls``.
+
+    Up to ``max_concurrent`` probes run at once, through the same
+    per-host limiters and request slots as the crawl itself. Each
+    result carries the HTTP ``status`` (None if the request failed),
+    which is fed back to the host's limiter.
+    """
+    results: dict = {}
+    gate = asyncio.Semaphore(max_concurrent)
+
+    async def run(url):
+        limiter = host_throttle.for_url(url)
+        async with gate:
+            await limiter.acquire()
+            if request_slots is not None:
+                await request_slots.acquire()
+            try:
+                started = time.monotonic()
+                result  = await probe(session, url)
+            finally:
+                if request_slots is not None:
+                    request_slots.release()
+                await limiter.release()
+        status = result["status"]
+        if status in THROTTLE_STATUSES:
+            limiter.on_throttled()
+        elif status is None or status >= 500:
+            limiter.on_error()
+        else:
+            limiter.on_success(time.monotonic() - started)
+        results[url] = result
+
+    await asyncio.gather(*(run(u) for u in urls))
+    return results
+
+
+async def verify_pdf_urls(
+    session, urls, host_throttle, max_concurrent=10,
+    request_slots=None, verdicts=None,
+) -> dict:
+    """
+    ``{url: check}`` from ``probe_pdf`` for every URL in ``urls``,
+    reusing cached verdicts and probing the rest with ``probe_many``.
+    """
+    checks: dict = {}
+    todo:   list = []
+    cached: dict = {}
+    if verdicts:
+        cached = await asyncio.to_thread(verdicts.get_many, urls)
+    for url in urls:
+        if url in cached:
+            checks[url] = cached[url]
+        else:
+            todo.append(url)
+
+    probed = await probe_many(
+        session, todo, probe_pdf, host_throttle, max_concurrent,
+        request_slots,
+    )
+    checks.update(probed)
+    if verdicts:
+        await asyncio.to_thread(verdicts.put_many, probed)
+    return checks
+
+
+# ═══════════════════════════════════════════════════════════════
+# PDF DEDUPLICATION
+# ═══════════════════════════════════════════════════════════════
+# The same report is often published under several URLs (/files/ and
+# /static/ copies, CDN hosts, ?download=1). Every candidate gets a
+# cheap fingerprint: its size and a hash of its first PREFIX_BYTES.
+# Only URLs whose fingerprints collide are downloaded in full and
+# compared by SHA-256.
+
+PREFIX_BYTES = 64 * 1024
+HASH_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10,
+                                     sock_read=30)
+
+
+async def fetch_prefix_fingerprint(session, url: str) -> dict:
+    """Size and prefix hash of ``url``, from one Range GET."""
+    result = {"status": None, "size": None, "prefix": None}
+    try:
+        async with session.get(
+            url, timeout=aiohttp.ClientTimeout(total=20),
+            headers={"Range": f"bytes=0-{PREFIX_BYTES - 1}"},
+        ) as resp:
+            result["status"] = resp.status
+            if resp.status in (200, 206):
+                result["size"] = _content_size(resp)
+                head = await read_prefix(resp, PREFIX_BYTES)
+                result["prefix"] = hashlib.sha256(head).hexdigest()
+    except (asyncio.TimeoutError, aiohttp.ClientError):
+        result["status"] = None
+    return result
+
+
+async def fetch_content_hash(session, url: str) -> dict:
+    """SHA-256 of the whole body of ``url``, streamed in chunks."""
+    result = {"status": None, "sha256": None}
+    try:
+        async with session.get(url, timeout=HASH_TIMEOUT) as resp:
+            result["status"] = resp.status
+            if resp.status == 200:
+                sha = hashlib.sha256()
+                async for chunk in resp.content.iter_chunked(
+                    READ_CHUNK_BYTES
+                ):
+                    sha.update(chunk)
+                result["sha256"] = sha.hexdigest()
+    except (asyncio.TimeoutError, aiohttp.ClientError):
+        result["status"] = None
+    return result
+
+
+def canonical_pdf_key(url: str, base_domain: str):
+    """Sort key preferring the site's own host, no query, short URLs."""
+    p = urlparse(url)
+    return (
+        canonical_host(p.netloc) != canonical_host(base_domain),
+        bool(p.query), len(url), url,
+    )
+
+
+async def find_duplicate_pdfs(
+    session, urls, base_domain, host_throttle, max_concurrent=10,
+    request_slots=None, verdicts=None,
+) -> dict:
+    """
+    ``{canonical_url: [alias, ...]}`` for PDFs in ``urls`` that serve
+    identical bytes. Fingerprints are cached in ``verdicts``.
+    """
+    prints: dict = {}
+    todo:   list = []
+    cached: dict = {}
+    if verdicts:
+        cached = await asyncio.to_thread(verdicts.get_fingerprints, urls)
+    for url in urls:
+        if url in cached:
+            prints[url] = cached[url]
+        else:
+            todo.append(url)
+    probed = await probe_many(
+        session, todo, fetch_prefix_fingerprint, host_throttle,
+        max_concurrent, request_slots,
+    )
+    for url, result in probed.items():
+        if result["prefix"]:
+            fp = {"size": result["size"], "prefix": result["prefix"],
+                  "sha256": None}
+            if fp["size"] is not None and fp["size"] <= PREFIX_BYTES:
+                fp["sha256"] = fp["prefix"]     # the prefix was all of it
+            prints[url] = fp
+
+    by_prefix: dict = defaultdict(list)
+    for url, fp in prints.items():
+        by_prefix[(fp["size"], fp["prefix"])].append(url)
+    colliding = [u for group in by_prefix.values() if len(group) > 1
+                 for u in group]
+
+    hashed = await probe_many(
+        session, [u for u in colliding if not prints[u]["sha256"]],
+        fetch_content_hash, host_throttle, max_concurrent, request_slots,
+    )
+    for url, result in hashed.items():
+        prints[url]["sha256"] = result["sha256"]
+    if verdicts:
+        await asyncio.to_thread(verdicts.put_fingerprints, {
+            url: prints[url]
+            for url in set(todo) | set(hashed) if url in prints
+        })
+
+    by_hash: dict = defaultdict(list)
+    for url in colliding:
+        if prints[url]["sha256"]:
+            by_hash[prints[url]["sha256"]].append(url)
+    aliases: dict = {}
+    for group in by_hash.values():
+        if len(group) > 1:
+            group.sort(key=lambda u: canonical_pdf_key(u, base_domain))
+            aliases[group[0]] = group[1:]
+    return aliases
+
+
+# ═══════════════════════════════════════════════════════════════
+# PER-HOST THROTTLING
+# ═══════════════════════════════════════════════════════════════
+
+# Statuses that mean "slow down": the URL is requeued, not dropped.
+THROTTLE_STATUSES    = {429, 503}
+MAX_THROTTLE_RETRIES = 3
+MAX_RETRY_AFTER      = 60.0
+
+
+class HostThrottled(Exception):
+    """Raised by a fetch when the host answered 429/503."""
+
+
+def parse_retry_after(value, now=None) -> float:
+    """Seconds to wait from a Retry-After header (delta or HTTP-date)."""
+    if not value:
+        return 0.0
+    value = value.strip()
+    if value.isdigit():
+        return min(float(value), MAX_RETRY_AFTER)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+    now = time.time() if now is None else now
+    return min(max(when - now, 0.0), MAX_RETRY_AFTER)
+
+
+class HostLimiter:
+    """
+    AIMD concurrency window for a single host.
+
+    The window starts small and grows by one per success (slow start)
+    until the first sign of congestion, then by roughly one per window
+    of successes. Throttling, errors and responses that have grown slow
+    shrink it multiplicatively. "Slow" is relative to the host: more
+    than ``latency_factor`` times, and ``latency_slack`` seconds over,
+    its fastest answer so far, so a host that is merely slow keeps its
+    window. A Retry-After from the server blocks new requests to the
+    host until it expires.
+    """
+
+    def __init__(self, ceiling, initial=4, latency_factor=3.0,
+                 latency_slack=0.5):
+        self.ceiling        = max(1, ceiling)
+        self.limit          = float(min(initial, self.ceiling))
+        self.latency_factor = latency_factor
+        self.latency_slack  = latency_slack
+        self.base_latency   = None     # fastest answer from the host
+        self.active         = 0
+        self.blocked_until  = 0.0
+        self.slow_start     = True
+        self.throttled      = 0
+        self.errors         = 0
+        self._cond          = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            while True:
+                wait = self.blocked_until - time.monotonic()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.active < int(self.limit):
+                    self.active += 1
+                    return
+                await self._cond.wait()
+
+    async def release(self):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float):
+        base = self.base_latency
+        if base is None or latency < base:
+            self.base_latency = latency
+        elif latency > max(base * self.latency_factor,
+                           base + self.latency_slack):
+            self._decrease(0.75)
+            return
+        if self.slow_start:
+            self.limit = min(self.ceiling, self.limit + 1)
+        else:
+            self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+
+    def on_error(self):
+        self.errors += 1
+        self._decrease(0.5)
+
+    def on_throttled(self, retry_after: float = 0.0):
+        self.throttled += 1
+        self._decrease(0.5)
+        if retry_after > 0:
+            self.blocked_until = max(
+                self.blocked_until, time.monotonic() + retry_after
+            )
+
+    def _decrease(self, factor: float):
+        self.slow_start = False
+        self.limit      = max(1.0, self.limit * factor)
+
+
+class HostThrottle:
+    """Registry of one ``HostLimiter`` per host, shareable across crawls."""
+
+    def __init__(self, max_per_host, initial=4, latency_factor=3.0,
+                 latency_slack=0.5):
+        self.max_per_host   = max_per_host
+        self.initial        = initial
+        self.latency_factor = latency_factor
+        self.latency_slack  = latency_slack
+        self.hosts: dict    = {}
+
+    def for_url(self, url: str) -> HostLimiter:
+        host = urlparse(url).netloc.lower()
+        if host not in self.hosts:
+            self.hosts[host] = HostLimiter(
+                self.max_per_host, self.initial,
+                self.latency_factor, self.latency_slack,
+            )
+        return self.hosts[host]
+
+    @property
+    def throttled_count(self) -> int:
+        return sum(h.throttled for h in self.hosts.values())
+
+
+# ═══════════════════════════════════════════════════════════════
+# CRAWL TELEMETRY
+# ═══════════════════════════════════════════════════════════════
+
+MAX_SAMPLES = 5000      # values kept per series for percentiles
+
+# The metrics of the crawl running in the current task. Sessions can be
+# shared between crawls, so their trace hooks look the crawl up here.
+_active_metrics: ContextVar = ContextVar("crawl_metrics", default=None)
+
+
+class Samples:
+    """
+    Count, total and maximum of a series of durations, plus a uniform
+    reservoir of at most ``MAX_SAMPLES`` values for percentiles.
+    """
+
+    __slots__ = ("count", "total", "max", "values")
+
+    def __init__(self):
+        self.count  = 0
+        self.total  = 0.0
+        self.max    = 0.0
+        self.values: list = []
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max    = max(self.max, value)
+        if len(self.values) < MAX_SAMPLES:
+            self.values.append(value)
+        else:
+            i = random.randrange(self.count)
+            if i < MAX_SAMPLES:
+                self.values[i] = value
+
+    def summary(self) -> dict:
+        ordered = sorted(self.values)
+
+        def pct(q):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        return {
+            "count":   self.count,
+            "total_s": round(self.total, 3),
+            "p50_ms":  round(pct(0.50) * 1000, 1),
+            "p90_ms":  round(pct(0.90) * 1000, 1),
+            "p99_ms":  round(pct(0.99) * 1000, 1),
+            "max_ms":  round(self.max * 1000, 1),
+        }
+
+
+class CrawlMetrics:
+    """
+    Where the time of one crawl went.
+
+    ``trace_config()`` instruments a ``ClientSession``: per host it
+    records time waiting for a pooled connection (``queued``), DNS,
+    connecting (TCP and TLS together; aiohttp does not time them
+    apart) and time to first byte, plus status codes and request
+    exceptions. Requests are credited to the metrics ``activate()``d
+    in the task that makes them. The crawler adds body download times
+    and bytes, ``extract_page`` stage timings and errors it would
+    otherwise swallow. ``report()`` turns it all into plain JSON.
+    """
+
+    def __init__(self):
+        self.started  = time.monotonic()
+        self.hosts:    dict = {}
+        self.stages:   dict = defaultdict(Samples)
+        self.errors:   dict = defaultdict(int)
+        self.statuses: dict = defaultdict(int)
+        self.bytes     = 0
+        self.pages     = 0
+        self.endpoints = 0
+
+    def _host(self, host: str) -> dict:
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = {
+                "requests": 0, "errors": 0, "bytes": 0,
+                "phases": defaultdict(Samples),
+            }
+        return stats
+
+    def activate(self):
+        """Credit requests made from this task (and tasks it starts)."""
+        return _active_metrics.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _active_metrics.reset(token)
+
+    @staticmethod
+    def trace_config() -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+        clock = time.monotonic
+
+        def mark(name):
+            async def on_signal(session, ctx, params):
+                ctx.marks[name] = clock()
+            return on_signal
+
+        async def on_request_start(session, ctx, params):
+            ctx.marks = {"start": clock()}
+
+        async def on_request_end(session, ctx, params):
+            metrics = _active_metrics.get()
+            if metrics is None:
+                return
+            end, m = clock(), ctx.marks
+            stats  = metrics._host(params.url.host or "")
+            phases = stats["phases"]
+            stats["requests"] += 1
+            metrics.statuses[params.response.status] += 1
+            for phase, first, last in (
+                ("queued",  "queued_start",  "queued_end"),
+                ("dns",     "dns_start",     "dns_end"),
+                ("connect", "connect_start", "connect_end"),
+            ):
+                if first in m and last in m:
+                    phases[phase].add(m[last] - m[first])
+            phases["ttfb"].add(end - m.get("headers_sent", m["start"]))
+
+        async def on_request_exception(session, ctx, params):
+            metrics = _active_metrics.get()
+            if metrics is not None:
+                metrics.record_error(params.url.host or "", params.exception)
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_queued_start.append(mark("queued_start"))
+        trace.on_connection_queued_end.append(mark("queued_end"))
+        trace.on_dns_resolvehost_start.append(mark("dns_start"))
+        trace.on_dns_resolvehost_end.append(mark("dns_end"))
+        trace.on_connection_create_start.append(mark("connect_start"))
+        trace.on_connection_create_end.append(mark("connect_end"))
+        trace.on_request_headers_sent.append(mark("headers_sent"))
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        return trace
+
+    def record_download(self, url: str, seconds: float, nbytes: int):
+        stats = self._host(urlparse(url).hostname or "")
+        stats["phases"]["download"].add(seconds)
+        stats["bytes"] += nbytes
+        self.bytes     += nbytes
+        self.pages     += 1
+
+    def record_endpoint(self, url: str, seconds: float, nbytes: int):
+        """A JSON endpoint's body: its bytes count, it is not a page."""
+        stats = self._host(urlparse(url).hostname or "")
+        stats["phases"]["json"].add(seconds)
+        stats["bytes"] += nbytes
+        self.bytes     += nbytes
+        self.endpoints += 1
+
+    def record_stages(self, timings: dict):
+        for stage, seconds in timings.items():
+            self.stages[stage].add(seconds)
+
+    def record_error(self, host: str, error):
+        kind = error if isinstance(error, str) else type(error).__name__
+        self.errors[kind] += 1
+        self._host(host)["errors"] += 1
+
+    def report(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        return {
+            "elapsed_s":   round(elapsed, 3),
+            "pages":       self.pages,
+            "pages_per_s": round(self.pages / elapsed, 2) if elapsed else 0,
+            "endpoints":   self.endpoints,
+            "requests":    sum(h["requests"] for h in self.hosts.values()),
+            "bytes":       self.bytes,
+            "statuses":    {
+                str(code): n for code, n in sorted(self.statuses.items())
+            },
+            "errors":      dict(sorted(self.errors.items())),
+            "stages":      {
+                name: samples.summary()
+                for name, samples in self.stages.items()
+            },
+            "hosts":       {
+                host: {
+                    "requests": stats["requests"],
+                    "errors":   stats["errors"],
+                    "bytes":    stats["bytes"],
+                    "phases":   {
+                        name: samples.summary()
+                        for name, samples in stats["phases"].items()
+                    },
+                }
+                for host, stats in sorted(self.hosts.items())
+            },
+        }
+
+
+# ═══════════════════════════════════════════════════════════════
+# CONNECTION POOL
+# ═══════════════════════════════════════════════════════════════
+
+CRAWL_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36"
+    )
+}
+
+CONNECTION_LIMIT  = 200     # open sockets per session
+LIMIT_PER_HOST    = 20      # open sockets per host
+DNS_CACHE_TTL     = 300     # seconds a resolved address is reused
+KEEPALIVE_TIMEOUT = 30      # seconds an idle socket is kept open
+
+
+def make_session(
+    limit=CONNECTION_LIMIT, limit_per_host=LIMIT_PER_HOST,
+    dns_cache_ttl=DNS_CACHE_TTL, keepalive_timeout=KEEPALIVE_TIMEOUT,
+) -> aiohttp.ClientSession:
+    """
+    A session on a tuned connector: DNS answers are cached, idle
+    sockets are kept for reuse and at most ``limit_per_host`` sockets
+    are open to one host. aiohttp asks for gzip and deflate, and for
+    brotli when the Brotli package is installed, and decodes the
+    response itself. Must be called with the event loop running.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        ttl_dns_cache=dns_cache_ttl,
+        keepalive_timeout=keepalive_timeout,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers=CRAWL_HEADERS,
+        trace_configs=[CrawlMetrics.trace_config()],
+    )
+
+
+def session_scope(session=None, **kwargs):
+    """
+    ``async with`` the caller's ``session``, left open afterwards, or
+    a new one from ``make_session(**kwargs)`` that is closed.
+    """
+    if session is not None:
+        return contextlib.nullcontext(session)
+    return make_session(**kwargs)
+
+
+class CrawlLoop:
+    """
+    An event loop on a background thread with one pooled session that
+    every crawl run on it shares, so DNS answers and keep-alive
+    connections carry over from one crawl to the next. For callers such
+    as the web app that would otherwise start a new loop per crawl.
+
+    ``run(fn)`` awaits ``fn(session)`` on the loop and blocks until it
+    is done, calling ``on_tick()`` in the caller's thread meanwhile.
+    Progress callbacks fire on the loop's thread, so a UI should note
+    progress there and draw it from ``on_tick``. ``submit`` and ``wait``
+    are the two halves of ``run``, for a caller that decides itself
+    what happens to the work when it is interrupted.
+    """
+
+    def __init__(self, **session_kwargs):
+        self.session_kwargs = session_kwargs
+        self.loop     = asyncio.new_event_loop()
+        self._session = None
+        self._thread  = threading.Thread(
+            target=self.loop.run_forever, name="crawl-loop", daemon=True,
+        )
+        self._thread.start()
+
+    async def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = make_session(**self.session_kwargs)
+        return self._session
+
+    def submit(self, fn):
+        """Start ``fn(session)`` on the loop; returns its future."""
+        async def call():
+            return await fn(await self.session())
+
+        return asyncio.run_coroutine_threadsafe(call(), self.loop)
+
+    @staticmethod
+    def wait(future, on_tick=None, tick=0.1):
+        while True:
+            try:
+                return future.result(timeout=tick)
+            except FutureTimeout:
+                if on_tick:
+                    on_tick()
+
+    def run(self, fn, on_tick=None, tick=0.1):
+        future = self.submit(fn)
+        try:
+            return self.wait(future, on_tick, tick)
+        except BaseException:
+            # e.g. the caller was interrupted; stop the work too.
+            future.cancel()
+            raise
+
+    def close(self):
+        async def shutdown():
+            if self._session is not None:
+                await self._session.close()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+# ═══════════════════════════════════════════════════════════════
+# BEST-FIRST FRONTIER
+# ═══════════════════════════════════════════════════════════════
+# With best_first, the crawl fetches the links most likely to lead to
+# PDFs first, so a crawl cut short (depth or page budget) has already
+# covered the reports and filings sections.
+
+# How promising a page in each category is.
+CATEGORY_PRIORITY = {
+    "Reports":          3.0,
+    "Presentation":     3.0,
+    "Filings":          2.5,
+    "News":             1.5,
+    "ESG":              1.5,
+    "Sector Specific":  0.5,
+    "Company Info":     0.0,
+    "❓ Unclassified":  0.0,
+    "⛔ Out of Scope": -3.0,
+}
+
+ANCHOR_HINT_RE = re.compile(
+    r"\b(?:annual|interim|quarterly|report|results|presentation|"
+    r"filings?|financials?|prospectus|circular|earnings|agm|webcast|"
+    r"download|pdf|documents?|publications?|investors?)\b",
+    re.IGNORECASE,
+)
+ANCHOR_SKIP_RE = re.compile(
+    r"\b(?:careers?|jobs?|vacanc\w*|log ?in|sign ?in|cookies?|privacy|"
+    r"terms|shop|cart|contact)\b",
+    re.IGNORECASE,
+)
+
+
+def link_priority(url: str, anchor: str = "", parent_pdfs: int = 0,
+                  depth: int = 0) -> float:
+    """
+    Score for ``url`` in the best-first frontier; higher is fetched
+    sooner. Adds up the URL's category, whether it looks like an
+    investor or media page, the link text, and how many PDFs the page
+    linking to it had. A small penalty per level keeps equal scores in
+    breadth-first order.
+    """
+    score = CATEGORY_PRIORITY.get(categorize_url(url), 0.0)
+    if is_investor_or_media_page(url):
+        score += 1.0
+    if anchor:
+        if ANCHOR_HINT_RE.search(anchor):
+            score += 1.0
+        if ANCHOR_SKIP_RE.search(anchor):
+            score -= 2.0
+    if parent_pdfs:
+        score += min(2.0, 0.5 + parent_pdfs / 10)
+    return score - 0.25 * depth
+
+
+# ═══════════════════════════════════════════════════════════════
+# MAIN CRAWLER
+# ═══════════════════════════════════════════════════════════════
+
+# Once a crawl is told to stop, pages in flight get this long to finish
+# before they are cut off; budgets are checked at least this often.
+STOP_GRACE_SECONDS = 5.0
+BUDGET_POLL_SECONDS = 0.25
+
+async def crawl_website(
+    start_url, pdf_pattern, max_depth,
+    max_concurrent, progress_callback,
+    enable_sibling_flood, sibling_threshold, sibling_keep,
+    host_throttle=None,
+    link_backend="tokenizer",
+    compare_backends=False,
+    parse_mode="inline",
+    max_page_bytes=MAX_PAGE_BYTES,
+    http_cache=None,
+    seed_urls=None,
+    checkpoint=None,
+    request_slots=None,
+    use_sitemaps=False,
+    compact_urls=False,
+    verify_pdfs=False,
+    dedupe_pdfs=False,
+    pdf_verdicts=None,
+    metrics=None,
+    session=None,
+    best_first=False,
+    max_pages=None,
+    max_bytes=None,
+    max_seconds=None,
+    max_pdfs=None,
+    stop_event=None,
+    parse_executor=None,
+):
+    # An executor passed in (shared across crawls) is left running.
+    own_executor = parse_executor is None
+    metrics = metrics or CrawlMetrics()
+    metrics_token = metrics.activate()
+    try:
+        if not start_url.startswith(("http://", "https://")):
+            start_url = "https://" + start_url
+
+        start_url   = normalize_url(start_url)
+        base_domain = urlparse(start_url).netloc
+        pdf_regex   = re.compile(pdf_pattern, re.IGNORECASE)
+        if own_executor:
+            parse_executor = make_parse_executor(parse_mode)
+
+        # Everything a resume needs lives in one state dict, either
+        # restored from the checkpoint or started fresh.
+        state = checkpoint.load() if checkpoint else None
+        resumed = state is not None
+        if not resumed:
+            state = empty_crawl_state({
+                "start_url":            start_url,
+                "pdf_pattern":          pdf_pattern,
+                "max_depth":            max_depth,
+                "enable_sibling_flood": enable_sibling_flood,
+                "sibling_threshold":    sibling_threshold,
+                "sibling_keep":         sibling_keep,
+                "compact_urls":         compact_urls,
+            })
+
+        visited:         set  = state["visited"]
+        raw_pages:       set  = state["raw_pages"]
+        raw_pdfs:        set  = state["raw_pdfs"]
+        pages_with_pdfs: dict = state["pages_with_pdfs"]
+        json_link_count: int  = state["json_link_count"]
+        encoded_pdf_count: int = state["encoded_pdf_count"]  # NEW: track encoded extractions
+        # Per crawl: one HttpCache may serve a whole batch of sites.
+        cache_hits: int = 0
+        if state["params"].get("compact_urls"):
+            # At full size the memo caches would hold more URL strings
+            # than the compact stores save.
+            limit_memo_caches(COMPACT_URL_CACHE_SIZE)
+
+        # Frontier shared by the worker pool: (url, depth) pairs in
+        # FIFO order, or with best_first (-priority, n, url, depth)
+        # entries taken highest score first, in insertion order among
+        # equals. URLs are marked as seen by their canonical_url when
+        # enqueued, so a link discovered on many pages, or spelt several
+        # ways, is only ever queued once.
+        queue:   asyncio.Queue = (
+            asyncio.PriorityQueue() if best_first else asyncio.Queue()
+        )
+        order   = itertools.count()
+        seen:    set           = state["seen"]
+        pending: dict          = state["pending"]
+        sitemap_leaves: dict   = state["sitemap_leaves"]
+
+        def put(u, d, priority=None):
+            if not best_first:
+                queue.put_nowait((u, d))
+                return
+            if priority is None:
+                # Seeds, sitemap entries and resumed entries: the URL
+                # alone decides, as no link text or parent is known.
+                priority = link_priority(u, depth=d)
+            queue.put_nowait((-priority, next(order), u, d))
+
+        def enqueue(u, d, nn, priority=None):
+            seen.add(nn)
+            if checkpoint:
+                # Only a snapshot needs the frontier spelled out.
+                pending[nn] = [u, d]
+            put(u, d, priority)
+
+        if resumed:
+            for u, d in list(pending.values()):
+                put(u, d)
+        else:
+            enqueue(start_url, 0, canonical_url(start_url))
+            for seed in seed_urls or ():
+                # e.g. pages that yielded PDFs last time, fetched up front
+                seed = normalize_url(seed)
+                key  = canonical_url(seed)
+                if key not in seen:
+                    enqueue(seed, 0, key)
+        retries:   dict          = defaultdict(int)
+        fetched_json: set        = state["fetched_json"]
+        fetched_pages: set       = state["fetched_pages"]
+        backend_mismatches: list = state["backend_mismatches"]
+        truncated_pages:    list = state["truncated_pages"]
+
+        def current_state() -> dict:
+            state["json_link_count"]   = json_link_count
+            state["encoded_pdf_count"] = encoded_pdf_count
+            return state
+
+        if checkpoint and not resumed:
+            checkpoint.snapshot(current_state())
+
+        if host_throttle is None:
+            host_throttle = HostThrottle(max_concurrent)
+
+        # Budgets. The first one exhausted (or stop_event, which may be
+        # set from any thread) stops the crawl early: no new pages are
+        # fetched, and the result covers what was crawled, with the
+        # reason in "stopped". Budgets count this run's work only, so a
+        # resumed crawl gets a fresh allowance of each.
+        stopping    = asyncio.Event()
+        stop_reason = None
+        crawl_start = time.monotonic()
+        pages_start = len(visited)
+        pdfs_start  = len(raw_pdfs)
+
+        def check_budget():
+            nonlocal stop_reason
+            if stop_reason is None:
+                if stop_event is not None and stop_event.is_set():
+                    stop_reason = "cancelled"
+                elif max_seconds and (
+                    time.monotonic() - crawl_start >= max_seconds
+                ):
+                    stop_reason = "time"
+                elif max_pages and len(visited) - pages_start >= max_pages:
+                    stop_reason = "pages"
+                elif max_bytes and metrics.bytes >= max_bytes:
+                    stop_reason = "bytes"
+                elif max_pdfs and len(raw_pdfs) - pdfs_start >= max_pdfs:
+                    stop_reason = "pdfs"
+                else:
+                    return None
+                stopping.set()
+            return stop_reason
+
+        async def fetch_and_parse(session, url, depth):
+            nonlocal json_link_count, encoded_pdf_count, cache_hits
+
+            norm = normalize_url(url)
+            key  = canonical_url(norm)
+            if key in visited or depth >= max_depth:
+                return []
+            visited.add(key)
+            progress_callback(len(visited), queue.qsize())
+
+            new_urls:  list = []
+            page_pdfs: list = []
+
+            want_json   = is_investor_or_media_page(norm)
+            extract_key = f"{base_domain}|{pdf_pattern}|{int(want_json)}"
+            host        = urlparse(norm).hostname or ""
+            cached      = None
+            if http_cache:
+                try:
+                    cached = await asyncio.to_thread(http_cache.get, norm)
+                except sqlite3.Error as e:
+                    # Fetched as if it had never been cached.
+                    metrics.record_error(host, f"cache {type(e).__name__}")
+            page        = None
+            truncated   = False
+
+            limiter = host_throttle.for_url(url)
+            await limiter.acquire()
+            if request_slots is not None:
+                # Shared by every crawl in a batch; waiters are served
+                # in arrival order, so sites take turns.
+                await request_slots.acquire()
+            answered = False    # failed requests are counted by the trace
+            try:
+                started = time.monotonic()
+                async with session.get(
+                    url, timeout=aiohttp.ClientTimeout(total=10),
+                    headers=HttpCache.conditional_headers(cached),
+                ) as resp:
+                    answered = True
+                    if resp.status in THROTTLE_STATUSES:
+                        limiter.on_throttled(parse_retry_after(
+                            resp.headers.get("Retry-After")
+                        ))
+                        visited.discard(key)
+                        raise HostThrottled(url)
+                    if resp.status >= 500:
+                        limiter.on_error()
+                        return []
+                    limiter.on_success(time.monotonic() - started)
+                    if resp.status == 304 and cached:
+                        cache_hits += 1
+                        body     = http_cache.body(cached)
+                        encoding = cached["encoding"]
+                        page     = http_cache.extraction(cached, extract_key)
+                        validators = (cached["etag"], cached["last_modified"])
+                    elif resp.status != 200:
+                        return []
+                    else:
+                        # Decide from the headers alone before reading
+                        # any of the body.
+                        ct = resp.headers.get("Content-Type", "").lower()
+                        if "text/html" not in ct or is_attachment(resp):
+                            return []
+
+                        read_started    = time.perf_counter()
+                        body, truncated = await read_capped(
+                            resp, max_page_bytes
+                        )
+                        metrics.record_download(
+                            url, time.perf_counter() - read_started,
+                            len(body),
+                        )
+                        encoding = response_encoding(resp)
+                        if truncated:
+                            truncated_pages.append(url)
+                        validators = (
+                            resp.headers.get("ETag"),
+                            resp.headers.get("Last-Modified"),
+                        )
+            except HostThrottled:
+                raise
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                limiter.on_error()
+                if answered:
+                    metrics.record_error(host, e)
+                return []
+            except Exception as e:
+                if answered:
+                    metrics.record_error(host, e)
+                return []
+            finally:
+                if request_slots is not None:
+                    request_slots.release()
+                await limiter.release()
+
+            fresh = page is None
+            try:
+                # page is already set on a 304 with a reusable extraction.
+                if fresh:
+                    args = (
+                        body, encoding, url, base_domain, pdf_pattern,
+                        link_backend, compare_backends, want_json,
+                    )
+                    if parse_executor is None:
+                        page = extract_page(*args)
+                    else:
+                        loop = asyncio.get_running_loop()
+                        page = await loop.run_in_executor(
+                            parse_executor, extract_page, *args
+                        )
+                    metrics.record_stages(page["timings"])
+            except Exception as e:
+                metrics.record_error(host, f"parse {type(e).__name__}")
+                return []
+
+            if http_cache and fresh:
+                try:
+                    await asyncio.to_thread(
+                        http_cache.put, norm, *validators, encoding, body,
+                        extract_key, page,
+                    )
+                except sqlite3.Error as e:
+                    # The page is fine, it just won't be revalidated.
+                    metrics.record_error(host, f"cache {type(e).__name__}")
+
+            if page["backend_mismatch"]:
+                backend_mismatches.append(url)
+
+            # ── 1. Standard <a href> links ──
+            raw_pages.update(page["pages"])
+            for pdf in page["pdfs"]:
+                raw_pdfs.add(pdf)
+                page_pdfs.append(pdf)
+            if depth + 1 < max_depth:
+                for link in page["follow"]:
+                    link_key = canonical_url(link)
+                    if link_key not in visited or (
+                        depth + 1 < sitemap_leaves.get(link_key, depth + 1)
+                    ):
+                        new_urls.append(link)
+
+            # ── 2. NEW: URLs recovered from encoded raw text ──
+            encoded_here = 0
+            for pdf in page["text_pdfs"]:
+                if pdf not in raw_pdfs:
+                    encoded_here += 1
+                raw_pdfs.add(pdf)
+                if pdf not in page_pdfs:
+                    page_pdfs.append(pdf)
+            encoded_pdf_count += encoded_here
+
+            # ── 3. JSON extraction ──
+            # Embedded JSON comes from the page we already parsed;
+            # only real JSON endpoints seen on the page are fetched.
+            json_pages:   list = []
+            json_fetched: list = []
+            jlinks:       set  = set()
+            if want_json:
+                jlinks = set(page["json_links"])
+                jpdfs  = set(page["json_pdfs"])
+                json_fetched = [
+                    e for e in dict.fromkeys(page["json_endpoints"])
+                    if e not in fetched_json
+                ][:JSON_ENDPOINTS_PER_PAGE]
+                fetched_json.update(json_fetched)
+                endpoints = await probe_many(
+                    session, json_fetched,
+                    lambda s, u: fetch_json_links(
+                        s, u, pdf_regex, max_page_bytes
+                    ),
+                    host_throttle, JSON_FETCHES_AT_ONCE, request_slots,
+                )
+                for result in endpoints.values():
+                    jlinks |= result["links"]
+                    jpdfs  |= result["pdfs"]
+                json_link_count += len(jlinks)
+                for lnk in jlinks:
+                    if (
+                        not is_social_media_url(lnk)
+                        and is_same_domain_or_allowed(lnk, base_domain)
+                    ):
+                        if is_pdf_url(lnk):
+                            raw_pdfs.add(lnk)
+                            page_pdfs.append(lnk)
+                        else:
+                            raw_pages.add(lnk)
+                            json_pages.append(lnk)
+                for lnk in jpdfs:
+                    if (
+                        not is_social_media_url(lnk)
+                        and is_same_domain_or_allowed(lnk, base_domain)
+                    ):
+                        raw_pdfs.add(lnk)
+                        page_pdfs.append(lnk)
+
+            if page_pdfs:
+                if norm not in pages_with_pdfs:
+                    pages_with_pdfs[norm] = set()
+                pages_with_pdfs[norm].update(page_pdfs)
+            fetched_pages.add(norm)
+
+            if checkpoint:
+                checkpoint.log_page(
+                    norm, page["pages"] + json_pages, page_pdfs,
+                    len(jlinks), encoded_here, json_fetched,
+                    url if truncated else None,
+                    url if page["backend_mismatch"] else None,
+                )
+            if not best_first:
+                return [(link, depth + 1, None) for link in new_urls]
+            # Older cached extractions have no link text.
+            anchors = page.get("anchors", {})
+            return [
+                (link, depth + 1, link_priority(
+                    link, anchors.get(link, ""), len(page_pdfs), depth + 1,
+                ))
+                for link in new_urls
+            ]
+
+        idle: set = set()
+
+        async def worker(session):
+            # Each worker pulls the next URL as soon as it is free, so one
+            # slow page only ever occupies a single slot.
+            me = asyncio.current_task()
+            while not stopping.is_set():
+                idle.add(me)
+                entry = await queue.get()
+                idle.discard(me)
+                u, d  = entry[-2:]
+                if sitemap_leaves:
+                    # A link may since have found it higher up.
+                    d = min(d, sitemap_leaves.get(canonical_url(u), d))
+                try:
+                    if check_budget():
+                        # Still in `pending`, so a resume fetches it.
+                        break
+                    try:
+                        new_urls = await fetch_and_parse(session, u, d)
+                    except asyncio.CancelledError:
+                        # Cut off by a stop; not crawled after all.
+                        visited.discard(canonical_url(u))
+                        raise
+                    except HostThrottled:
+                        # Put it back; the host's limiter holds further
+                        # requests until any Retry-After has passed.
+                        new_urls = []
+                        retries[u] += 1
+                        if retries[u] <= MAX_THROTTLE_RETRIES:
+                            queue.put_nowait(entry)
+                            continue
+                    queued = []
+                    for nu, nd, priority in new_urls:
+                        nn = canonical_url(nu)
+                        if nn not in seen:
+                            enqueue(nu, nd, nn, priority)
+                            queued.append([nu, nd])
+                        elif nd < sitemap_leaves.get(nn, nd):
+                            # A sitemap page, queued where its links are
+                            # not followed, linked from higher up: crawl
+                            # it (again, if already fetched) from here.
+                            sitemap_leaves[nn] = nd
+                            visited.discard(nn)
+                            enqueue(nu, nd, nn, priority)
+                            queued.append([nu, nd])
+                    un = canonical_url(u)
+                    pending.pop(un, None)
+                    if checkpoint:
+                        checkpoint.log_done(un, queued, current_state)
+                finally:
+                    queue.task_done()
+
+        async def seed_from_sitemaps(session):
+            # Sitemap pages are fetched for their PDFs but not expanded
+            # further: they sit one level above the depth limit, until
+            # link-following reaches one at a shallower depth.
+            sitemap_depth = max(max_depth - 1, 0)
+            try:
+                async for loc in iter_sitemap_urls(session, start_url):
+                    abs_url = normalize_url(loc)
+                    scheme, host, path = url_parts(abs_url)
+                    if scheme not in ("http", "https"):
+                        continue
+                    if is_social_media_url(abs_url):
+                        continue
+                    if is_sec_filing_url(abs_url):
+                        continue
+                    if not is_same_domain_or_allowed(abs_url, base_domain):
+                        continue
+                    state["sitemap_url_count"] += 1
+                    if is_pdf_url(abs_url):
+                        if abs_url not in raw_pdfs:
+                            state["sitemap_pdf_count"] += 1
+                        raw_pdfs.add(abs_url)
+                    elif not path.lower().endswith(SKIP_EXTENSIONS):
+                        raw_pages.add(abs_url)
+                        key = canonical_url(abs_url)
+                        if host == base_domain and key not in seen:
+                            sitemap_leaves[key] = sitemap_depth
+                            enqueue(abs_url, sitemap_depth, key)
+            except Exception:
+                pass
+            state["sitemaps_seeded"] = True
+            if checkpoint:
+                checkpoint.snapshot(current_state())
+
+        async def run_frontier(session):
+            if use_sitemaps and not state["sitemaps_seeded"]:
+                # Workers start on the start page meanwhile.
+                await seed_from_sitemaps(session)
+            await queue.join()
+
+        async def watch_clock():
+            # Time and cancel are checked even while every worker is
+            # stuck on a slow page.
+            while not check_budget():
+                await asyncio.sleep(BUDGET_POLL_SECONDS)
+
+        # A session passed in (shared across crawls) is left open.
+        async with session_scope(
+            session, limit_per_host=max_concurrent,
+        ) as session:
+            workers = [
+                asyncio.create_task(worker(session))
+                for _ in range(max_concurrent)
+            ]
+            frontier = asyncio.create_task(run_frontier(session))
+            stopped  = asyncio.create_task(stopping.wait())
+            helpers  = [frontier, stopped,
+                        asyncio.create_task(watch_clock())]
+            try:
+                # Done when the frontier drains, a stop is called or a
+                # worker dies.
+                await asyncio.wait(
+                    [frontier, stopped, *workers],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for w in workers:
+                    if w.done() and not w.cancelled() and w.exception():
+                        # A worker died; keep what the crawl has so far.
+                        if stop_reason is None:
+                            stop_reason = f"error: {w.exception()!r}"
+                        stopping.set()
+                if stopping.is_set():
+                    for w in idle:
+                        w.cancel()
+                    await asyncio.wait(workers, timeout=STOP_GRACE_SECONDS)
+            finally:
+                for t in workers + helpers:
+                    t.cancel()
+                await asyncio.gather(*workers, *helpers,
+                                     return_exceptions=True)
+
+            # Out of time or cancelled: skip the follow-up requests.
+            if stop_reason in ("time", "cancelled"):
+                verify_pdfs = dedupe_pdfs = False
+
+            # The follow-up stages only refine the result; if one fails
+            # (a broken verdict cache, say) the crawl's findings stand.
+            stage_errors: dict = {}
+
+            def stage_failed(stage: str, e: Exception):
+                stage_errors[stage] = f"{type(e).__name__}: {e}"
+                metrics.record_error(base_domain, f"{stage} {type(e).__name__}")
+
+            pdf_checks: dict = {}
+            if verify_pdfs:
+                # PDFs by extension, plus pages that may be documents
+                # behind a download handler.
+                candidates = list(raw_pdfs) + [
+                    u for u in raw_pages if DOCUMENT_CANDIDATE_RE.search(u)
+                ]
+                try:
+                    pdf_checks = await verify_pdf_urls(
+                        session, candidates, host_throttle, max_concurrent,
+                        request_slots, pdf_verdicts,
+                    )
+                except Exception as e:
+                    stage_failed("verify", e)
+                    verify_pdfs = False
+
+            # Verdicts and aliases only shape the result; the crawl
+            # state is untouched.
+            rejected_pdfs = {
+                u: c["verdict"] for u, c in pdf_checks.items()
+                if c["verdict"] in REJECTED_VERDICTS and u in raw_pdfs
+            }
+            found_pdfs = {
+                u for u, c in pdf_checks.items()
+                if c["verdict"] == "pdf" and u not in raw_pdfs
+            }
+            pdf_aliases: dict = {}
+            if dedupe_pdfs:
+                try:
+                    pdf_aliases = await find_duplicate_pdfs(
+                        session,
+                        found_pdfs.union(
+                            u for u in raw_pdfs if u not in rejected_pdfs
+                        ),
+                        base_domain, host_throttle, max_concurrent,
+                        request_slots, pdf_verdicts,
+                    )
+                except Exception as e:
+                    stage_failed("dedupe", e)
+
+        if checkpoint:
+            if stop_reason:
+                # Stopped early: keep the frontier for a resume.
+                checkpoint.snapshot(current_state())
+            else:
+                # Finished: nothing left to resume.
+                checkpoint.clear()
+
+        alias_of = {
+            alias: canonical
+            for canonical, aliases in pdf_aliases.items()
+            for alias in aliases
+        }
+
+        deduped_pages = deduplicate_urls(
+            sorted(u for u in raw_pages if u not in found_pdfs),
+            enable_sibling_flood=enable_sibling_flood,
+            sibling_threshold=sibling_threshold,
+            sibling_keep=sibling_keep,
+        )
+        all_pdfs = sorted(
+            u for u in found_pdfs.union(raw_pdfs)
+            if u not in rejected_pdfs and u not in alias_of
+        )
+
+        pages_with_pdfs_clean: dict = {}
+        for page, pdfs in pages_with_pdfs.items():
+            kept = sorted({
+                alias_of.get(p, p) for p in pdfs if p not in rejected_pdfs
+            })
+            if kept:
+                pages_with_pdfs_clean[page] = kept
+
+        categorized_pages = categorize_all_urls(deduped_pages)
+        categorized_pdfs  = categorize_all_urls(all_pdfs)
+
+        pages_pdfs_by_category: dict = defaultdict(dict)
+        for page_url, pdfs in pages_with_pdfs_clean.items():
+            page_cat = categorize_url(page_url)
+            pages_pdfs_by_category[page_cat][page_url] = pdfs
+
+        res = {
+            "crawl_id":                uuid.uuid4().hex,
+            "all_pages":               deduped_pages,
+            "raw_page_count":          len(raw_pages),
+            "all_pdfs":                all_pdfs,
+            "raw_pdf_count":           len(raw_pdfs),
+            "categorized_pages":       categorized_pages,
+            "categorized_pdfs":        categorized_pdfs,
+            "pages_pdfs_by_category":  dict(pages_pdfs_by_category),
+            "pages_with_pdfs":         pages_with_pdfs_clean,
+            "pages_crawled":           len(visited),
+            "fetched_pages":           sorted(fetched_pages),
+            "json_links_count":        json_link_count,
+            "encoded_pdf_count":       encoded_pdf_count,  # NEW
+            "throttled_count":         host_throttle.throttled_count,
+            "backend_mismatches":      sorted(backend_mismatches),
+            "backends_compared":       compare_backends,
+            "truncated_pages":         sorted(truncated_pages),
+            "cache_hits":              cache_hits,
+            "sitemap_url_count":       state["sitemap_url_count"],
+            "sitemap_pdf_count":       state["sitemap_pdf_count"],
+            "pdfs_verified":           verify_pdfs,
+            "pdf_checks":              pdf_checks,
+            "rejected_pdfs":           dict(sorted(rejected_pdfs.items())),
+            "found_pdfs":              sorted(found_pdfs),
+            "pdf_aliases":             dict(sorted(pdf_aliases.items())),
+            "url_store_bytes":         {
+                name: url_store_bytes(store) for name, store in (
+                    ("visited", visited), ("seen", seen),
+                    ("raw_pages", raw_pages), ("raw_pdfs", raw_pdfs),
+                )
+            } | {"memo_caches": memo_cache_bytes()},
+            "metrics":                 metrics.report(),
+            "stopped":                 stop_reason,
+            "stage_errors":            stage_errors,
+        }
+        try:
+            res["index"] = build_result_index(res)
+        except Exception as e:
+            stage_failed("index", e)
+            res["index"] = None
+        return res
+
+    except Exception as e:
+        return {"error": str(e)}
+    finally:
+        CrawlMetrics.deactivate(metrics_token)
+        if checkpoint:
+            checkpoint.close()
+        if own_executor and parse_executor is not None:
+            parse_executor.shutdown(cancel_futures=True)
+
+
+async def resume_crawl(checkpoint, max_concurrent, progress_callback,
+                       **kwargs):
+    """
+    Continue the crawl saved in ``checkpoint`` with the settings it was
+    started with. Visited URLs are not fetched again. Extra keyword
+    arguments (parse mode, cache, ...) go to ``crawl_website``.
+    """
+    params = checkpoint.params()
+    return await crawl_website(
+        params["start_url"], params["pdf_pattern"], params["max_depth"],
+        max_concurrent, progress_callback,
+        params["enable_sibling_flood"], params["sibling_threshold"],
+        params["sibling_keep"],
+        checkpoint=checkpoint, **kwargs,
+    )
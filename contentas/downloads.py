@@ -0,0 +1,293 @@
+"""
+Bulk PDF downloader for the PDFs a crawl found.
+
+    python -m contentas download --input results/example.com.json --out pdfs/
+
+Files are fetched concurrently and streamed to disk in chunks, hashed
+on the way, so no PDF is ever held in memory. Each one is written to
+``<out>/<host>/<name>-<hash>.pdf`` via a ``.part`` file; an interrupted
+download is resumed from where the ``.part`` file ends with a Range
+request. ``<out>/manifest.json`` records the path, size and SHA-256 of
+every file, and finished files are skipped when the same list is
+downloaded again.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from urllib.parse import unquote, urlparse
+
+import aiohttp
+
+from contentas.crawler import (
+    MAX_THROTTLE_RETRIES,
+    PDF_MAGIC,
+    PROBE_BYTES,
+    READ_CHUNK_BYTES,
+    THROTTLE_STATUSES,
+    HostThrottle,
+    HostThrottled,
+    parse_retry_after,
+    session_scope,
+)
+
+MANIFEST_NAME  = "manifest.json"
+MANIFEST_EVERY = 20     # finished files between manifest writes
+MAX_ATTEMPTS   = 3      # tries per file after network errors
+DOWNLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10,
+                                         sock_read=30)
+
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def pdf_filename(url: str) -> str:
+    """Path a PDF is saved under, relative to the output directory."""
+    p    = urlparse(url)
+    name = unquote(p.path.rstrip("/").rsplit("/", 1)[-1])
+    if name.lower().endswith(".pdf"):
+        name = name[:-4]
+    stem   = _UNSAFE_RE.sub("_", name).strip("._")[:80] or "document"
+    host   = _UNSAFE_RE.sub("_", p.netloc.lower()) or "unknown"
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:10]
+    return f"{host}/{stem}-{digest}.pdf"
+
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by every download, holding the total to
+    ``rate`` bytes per second with bursts of at most one second's worth.
+    A chunk is always written; the download that overdraws the bucket
+    then sleeps off the debt.
+    """
+
+    def __init__(self, rate: float):
+        self.rate    = float(rate)
+        self.tokens  = 0.0
+        self.updated = time.monotonic()
+
+    async def consume(self, n: int):
+        now = time.monotonic()
+        self.tokens  = min(self.rate,
+                           self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= n
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+def load_manifest(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME),
+                  encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"files": {}}
+
+
+def write_manifest(out_dir: str, manifest: dict):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp  = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _hash_file(path: str, sha):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+
+
+async def fetch_to_file(session, url, out_dir, entry, limiter,
+                        bandwidth=None) -> dict:
+    """
+    Stream ``url`` into its file and update ``entry`` with the outcome.
+
+    An existing ``.part`` file is continued with a Range request,
+    guarded by If-Range when a validator from the earlier response is
+    known; a server that answers with the whole file starts it over.
+    Raises ``HostThrottled`` on 429/503 and lets network errors
+    through, leaving the ``.part`` file for the next attempt.
+    """
+    path = os.path.join(out_dir, entry["path"])
+    part = path + ".part"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    offset  = os.path.getsize(part) if os.path.exists(part) else 0
+    headers: dict = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        validator = entry.get("etag") or entry.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+
+    started = time.monotonic()
+    async with session.get(
+        url, headers=headers, timeout=DOWNLOAD_TIMEOUT,
+    ) as resp:
+        if resp.status in THROTTLE_STATUSES:
+            limiter.on_throttled(parse_retry_after(
+                resp.headers.get("Retry-After")
+            ))
+            raise HostThrottled(url)
+        content_range = resp.headers.get("Content-Range", "")
+        if resp.status == 206 and content_range.startswith(
+            f"bytes {offset}-"
+        ):
+            mode = "ab"
+        elif resp.status == 200:
+            offset, mode = 0, "wb"
+        elif resp.status == 416 and offset:
+            # The .part file no longer fits the resource; start over.
+            os.remove(part)
+            raise aiohttp.ClientPayloadError("stale partial download")
+        else:
+            if resp.status >= 500:
+                limiter.on_error()
+            entry.update(status="failed", error=f"HTTP {resp.status}")
+            return entry
+        limiter.on_success(time.monotonic() - started)
+        entry.update(
+            status="partial",
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+        )
+
+        sha = hashlib.sha256()
+        if offset:
+            _hash_file(part, sha)
+        size = offset
+        # The first bytes of a fresh download must look like a PDF.
+        head = bytearray() if offset == 0 else None
+        with open(part, mode) as f:
+            async for chunk in resp.content.iter_chunked(READ_CHUNK_BYTES):
+                if head is not None:
+                    head += chunk
+                    if len(head) >= PROBE_BYTES:
+                        if PDF_MAGIC not in head:
+                            break
+                        head = None
+                f.write(chunk)
+                sha.update(chunk)
+                size += len(chunk)
+                if bandwidth:
+                    await bandwidth.consume(len(chunk))
+
+    if head is not None and PDF_MAGIC not in head:
+        os.remove(part)
+        entry.update(status="not_pdf", error="no %PDF signature")
+        return entry
+    os.replace(part, path)
+    entry.update(
+        status="done", size=size, sha256=sha.hexdigest(), error=None,
+        downloaded_at=time.time(),
+    )
+    return entry
+
+
+async def download_pdfs(
+    urls, out_dir, max_concurrent=20, per_host=4,
+    max_bytes_per_sec=None, progress_callback=None, session=None,
+) -> dict:
+    """
+    Download ``urls`` into ``out_dir`` and return the manifest.
+
+    ``max_concurrent`` downloads run at once, at most ``per_host`` of
+    them against one host (fewer while the host is slow or throttling),
+    and together they stay under ``max_bytes_per_sec`` if given.
+    ``progress_callback(done, total)`` is called after each file. A
+    shared session can be passed in to reuse its connections.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    files    = manifest["files"]
+    queue: asyncio.Queue = asyncio.Queue()
+    for url in dict.fromkeys(urls):
+        entry = files.setdefault(url, {
+            "url": url, "path": pdf_filename(url), "status": "pending",
+        })
+        if entry["status"] == "not_pdf" or (
+            entry["status"] == "done"
+            and os.path.exists(os.path.join(out_dir, entry["path"]))
+        ):
+            continue
+        queue.put_nowait(url)
+
+    total         = queue.qsize()
+    done          = 0
+    host_throttle = HostThrottle(per_host)
+    bandwidth     = (
+        BandwidthLimiter(max_bytes_per_sec) if max_bytes_per_sec else None
+    )
+    attempts: dict = {}
+
+    async def worker(session):
+        nonlocal done
+        while True:
+            url = await queue.get()
+            try:
+                entry   = files[url]
+                limiter = host_throttle.for_url(url)
+                await limiter.acquire()
+                try:
+                    await fetch_to_file(
+                        session, url, out_dir, entry, limiter, bandwidth
+                    )
+                except HostThrottled:
+                    attempts[url] = attempts.get(url, 0) + 1
+                    if attempts[url] <= MAX_THROTTLE_RETRIES:
+                        queue.put_nowait(url)
+                        continue
+                    entry.update(status="failed", error="throttled")
+                except (asyncio.TimeoutError, aiohttp.ClientError,
+                        OSError) as e:
+                    limiter.on_error()
+                    attempts[url] = attempts.get(url, 0) + 1
+                    if attempts[url] < MAX_ATTEMPTS:
+                        # Resumes from the .part file.
+                        queue.put_nowait(url)
+                        continue
+                    entry.update(status="failed", error=str(e) or repr(e))
+                finally:
+                    await limiter.release()
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+                if done % MANIFEST_EVERY == 0:
+                    write_manifest(out_dir, manifest)
+            finally:
+                queue.task_done()
+
+    async def run(session):
+        workers = [
+            asyncio.create_task(worker(session))
+            for _ in range(max(1, min(max_concurrent, total)))
+        ]
+        try:
+            await queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    try:
+        async with session_scope(session, limit_per_host=per_host) as session:
+            await run(session)
+    finally:
+        # Also on interruption, so a rerun resumes the .part files.
+        write_manifest(out_dir, manifest)
+    return manifest
+
+
+def manifest_summary(manifest: dict, urls=None) -> dict:
+    """Count and byte totals per status, for ``urls`` or every file."""
+    entries = manifest["files"]
+    if urls is not None:
+        entries = {u: entries[u] for u in urls if u in entries}
+    summary: dict = {"bytes": 0}
+    for entry in entries.values():
+        summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+        if entry["status"] == "done":
+            summary["bytes"] += entry["size"]
+    return summary
@@ -0,0 +1,146 @@
+"""
+URL canonicalisation shared by the crawler's filters and frontier.
+
+``normalize_url`` gives the form a URL is fetched and reported under:
+lower-cased host, no default port, no fragment or trailing slash, no
+tracking or session parameters, and upper-case percent-escapes with
+unreserved characters decoded. ``canonical_url`` goes one step further
+for identity checks only, folding ``www.`` hosts and index pages into
+their bare forms, which not every server would answer to.
+
+Both are memoised in bounded LRU caches, since the same link turns up
+on many pages and each lookup would otherwise be a full parse.
+``url_parts`` reads scheme, host and path back off the memoised
+normal form, so filters need not parse a link again. The caches are
+per process; ``set_url_cache_size`` rebounds them (and empties them).
+"""
+import os
+import re
+from functools import lru_cache
+from urllib.parse import urlparse, urlunparse
+
+URL_CACHE_SIZE = int(os.environ.get("CONTENTAS_URL_CACHE_SIZE", 200_000))
+COMPACT_URL_CACHE_SIZE = 20_000
+
+DEFAULT_PORTS = {"http": ":80", "https": ":443"}
+
+# Query parameters that never change what a page serves.
+TRACKING_PARAM_PREFIXES = ("utm_",)
+TRACKING_PARAMS = frozenset({
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi",
+    "jsessionid", "phpsessid", "aspsessionid", "sessionid",
+    "session_id", "cfid", "cftoken",
+})
+
+INDEX_PAGES = frozenset({
+    "index.html", "index.htm", "index.php", "default.aspx", "default.asp",
+})
+
+_ESCAPE_RE  = re.compile(r"%([0-9A-Fa-f]{2})")
+# Scheme, host and path of a normalised URL: urlunparse writes
+# ``scheme://netloc/path;params?query``, so each part ends at a fixed set
+# of delimiters.
+_PARTS_RE   = re.compile(r"(?:([^:/?#;]+):)?(?://([^/?#;]*))?([^?#;]*)")
+_UNRESERVED = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+)
+
+
+def _fix_escape(m) -> str:
+    ch = chr(int(m.group(1), 16))
+    return ch if ch in _UNRESERVED else "%" + m.group(1).upper()
+
+
+def _normalize_escapes(s: str) -> str:
+    return _ESCAPE_RE.sub(_fix_escape, s) if "%" in s else s
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def strip_tracking_params(query: str) -> str:
+    """``query`` without tracking or session parameters, order kept."""
+    if not query:
+        return query
+    return "&".join(
+        pair for pair in query.split("&")
+        if pair and not is_tracking_param(pair.split("=", 1)[0])
+    )
+
+
+def _normalize_url(url: str) -> str:
+    p = urlparse(url)
+    netloc = p.netloc.lower()
+    port = DEFAULT_PORTS.get(p.scheme)
+    if port and netloc.endswith(port):
+        netloc = netloc[:-len(port)]
+    params = p.params
+    if params and is_tracking_param(params.split("=", 1)[0]):
+        params = ""     # e.g. /page;jsessionid=...
+    norm = urlunparse((
+        p.scheme, netloc,
+        _normalize_escapes(p.path).rstrip("/"),
+        params,
+        _normalize_escapes(strip_tracking_params(p.query)),
+        "",
+    ))
+    # Already-normal URLs are looked up too; keep one string, not two.
+    return url if norm == url else norm
+
+
+def canonical_host(netloc: str) -> str:
+    netloc = netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def _canonical_url(url: str) -> str:
+    p = urlparse(normalize_url(url))
+    path = p.path
+    head, _, last = path.rpartition("/")
+    if last.lower() in INDEX_PAGES:
+        path = head.rstrip("/")
+    return urlunparse((
+        p.scheme, canonical_host(p.netloc), path, p.params, p.query, "",
+    ))
+
+
+def set_url_cache_size(size: int) -> None:
+    """Bound the ``normalize_url`` and ``canonical_url`` caches at ``size`` each."""
+    global _normalize_cached, _canonical_cached
+    _normalize_cached = lru_cache(maxsize=size)(_normalize_url)
+    _canonical_cached = lru_cache(maxsize=size)(_canonical_url)
+
+
+set_url_cache_size(URL_CACHE_SIZE)
+
+
+def url_cache_size() -> int:
+    return _normalize_cached.cache_parameters()["maxsize"]
+
+
+def url_cache_entries() -> int:
+    """URLs currently memoised across both caches."""
+    return (_normalize_cached.cache_info().currsize
+            + _canonical_cached.cache_info().currsize)
+
+
+def normalize_url(url: str) -> str:
+    return _normalize_cached(url)
+
+
+def canonical_url(url: str) -> str:
+    """
+    Key under which the crawler decides whether it has seen ``url``.
+
+    Variants that differ only by ``www.``, a trailing index page or
+    anything ``normalize_url`` removes share one key.
+    """
+    return _canonical_cached(url)
+
+
+def url_parts(url: str) -> tuple:
+    """``(scheme, host, path)`` of ``normalize_url(url)``, host lower-cased."""
+    return _PARTS_RE.match(normalize_url(url)).groups("")